@@ -73,7 +73,6 @@ def build_with_nuitka():
         "--include-package=win32con",
         "--include-package=win32ui",
         "--include-package=win32timezone",
-        "--include-package=ppadb",
         "--include-package=mss",
 
         # ===== 插件 =====
@@ -0,0 +1,301 @@
+"""ClickZen 命令行入口 - 无界面运行监控方案和录制脚本
+
+用法:
+    python -m clickzen run scheme.json --serial SERIAL [--serial SERIAL ...]
+    python -m clickzen run scheme.json --replay frames/ --resolution 1080x2400 [--fps 10]
+    python -m clickzen play recording.json --serial SERIAL [--speed 1.0] [--repeat 1]
+
+只加载 QtCore，不创建任何窗口；收到 Ctrl+C / SIGTERM 时停止监控后退出。
+指定多个设备时每台设备使用一个独立的监控进程（见 core.multi_device_host）。
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+log = logging.getLogger("clickzen")
+
+
+def setup_logging(log_file=None, verbose=False):
+    """日志输出到标准输出，可选同时写入文件"""
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%H:%M:%S",
+                        handlers=handlers)
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+
+def install_stop_handler():
+    """Ctrl+C / SIGTERM 时设置停止事件（不直接抛出KeyboardInterrupt，保证监控线程正常收尾）"""
+    stop_event = threading.Event()
+
+    def handler(signum, frame):
+        if stop_event.is_set():
+            log.info("再次收到退出信号，立即退出")
+            os._exit(1)
+        log.info("收到退出信号，正在停止...")
+        stop_event.set()
+
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
+    return stop_event
+
+
+def load_performance_settings(settings_file):
+    """读取设置文件中的性能选项（文件不存在时使用默认值）"""
+    if settings_file and os.path.exists(settings_file):
+        try:
+            with open(settings_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("performance", {})
+        except Exception as e:
+            log.warning(f"读取设置失败: {e}")
+    return {}
+
+
+def default_adb_path():
+    """界面版配置中的ADB路径"""
+    from utils.config import config
+    return config.get("adb_path")
+
+
+def connect_device(adb_path, serial):
+    """连接设备并创建控制器，失败时返回None"""
+    from core.adb_manager import ADBManager
+    from core.device_controller import DeviceController
+
+    adb = ADBManager(adb_path)
+    if not adb.connect_device(serial):
+        log.error(f"设备连接失败: {serial}")
+        return None
+
+    controller = DeviceController(adb, None)
+    controller.window_capture_enabled = False  # 无界面运行时没有Scrcpy窗口，直接使用ADB截图
+    return controller
+
+
+class DryRunDevice:
+    """没有连接设备时（回放/屏幕截图）代替控制器和ADB，只记录动作不执行"""
+
+    playing = False
+    batch_input = False
+
+    def click(self, x, y, use_random=True, batch=None):
+        log.info(f"[模拟] 点击 ({x}, {y})")
+
+    def swipe(self, x1, y1, x2, y2, duration=300, use_random=True, batch=None):
+        log.info(f"[模拟] 滑动 ({x1}, {y1}) -> ({x2}, {y2}) {duration}ms")
+
+    def input_text(self, text, batch=None):
+        log.info(f"[模拟] 输入文本 {text}")
+
+    def keyevent(self, keycode, batch=None):
+        log.info(f"[模拟] 按键 {keycode}")
+
+    def shell(self, command, root=False, timeout=None):
+        log.info(f"[模拟] shell {command}")
+        return ""
+
+    def input_batch(self):
+        return None  # 逐个记录动作，不合并
+
+    def set_touch_backend(self, backend):
+        pass
+
+    def play_recording(self, actions, speed=1.0, use_random=True):
+        log.info(f"[模拟] 播放录制 {len(actions)} 个操作")
+        return True
+
+    def stop_playing(self):
+        pass
+
+
+def parse_size(text):
+    """解析 "宽x高" 格式的尺寸"""
+    if not text:
+        return None
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def build_frame_source(args, adb):
+    """根据命令行选项创建截图来源，None表示使用控制器默认的截图方式"""
+    from core import frame_source
+
+    resolution = parse_size(args.resolution)
+    if args.replay:
+        return frame_source.ReplayFrameSource(args.replay, args.fps, not args.no_loop, resolution)
+    if args.source == 'mss':
+        region = tuple(int(value) for value in args.region.split(',')) if args.region else None
+        return frame_source.MssFrameSource(region, resolution=resolution)
+    if args.source == 'window':
+        return frame_source.WindowFrameSource(title=args.window, resolution=resolution)
+    if args.source == 'adb':
+        return frame_source.AdbScreencapFrameSource(adb, resolution)
+    if args.source == 'adb-raw':
+        return frame_source.AdbRawFrameSource(adb, args.capture_scale, resolution)
+    return None
+
+
+def run_scheme(args, stop_event):
+    """运行监控方案"""
+    from PyQt6.QtCore import Qt
+
+    performance = load_performance_settings(args.settings)
+    serials = args.serial or []
+    device_free = args.replay or args.source in ('mss', 'window')
+    if not serials and not device_free:
+        log.error("请指定 --serial，或使用 --replay / --source mss|window 在没有设备时运行")
+        return 2
+
+    if len(serials) > 1:
+        from core.multi_device_host import MultiDeviceHost
+
+        if args.replay:
+            log.error("--replay 不能与多个 --serial 同时使用")
+            return 2
+        try:
+            host = MultiDeviceHost(args.adb, performance, args.source, args.capture_scale,
+                                   parse_size(args.resolution))
+        except ValueError as e:
+            log.error(str(e))
+            return 2
+        host.log_message.connect(log.info, Qt.ConnectionType.DirectConnection)
+        host.match_found.connect(lambda serial, data: log.info(f"[{serial}] 触发: {data['name']}"),
+                                 Qt.ConnectionType.DirectConnection)
+        if not host.start(args.scheme, serials):
+            return 1
+        while not stop_event.wait(0.5) and host.devices:
+            pass
+        host.stop()
+        return 0
+
+    from core.auto_monitor import AutoMonitor
+
+    if serials:
+        controller = connect_device(args.adb, serials[0])
+        if controller is None:
+            return 1
+        adb = controller.adb
+    else:
+        controller = adb = DryRunDevice()
+
+    try:
+        source = build_frame_source(args, adb)
+    except (ValueError, ImportError) as e:
+        log.error(f"无法创建截图来源: {e}")
+        return 1
+
+    monitor = AutoMonitor(adb, controller, source)
+    # 监控线程中发出的信号直接输出（命令行没有Qt事件循环）
+    monitor.log_message.connect(log.info, Qt.ConnectionType.DirectConnection)
+    monitor.match_found.connect(lambda data: log.debug(f"触发: {data['config'].get('name', '')}"),
+                                Qt.ConnectionType.DirectConnection)
+    monitor.apply_performance_settings(performance)
+
+    if not monitor.load_scheme(args.scheme):
+        return 1
+    if args.interval:
+        monitor.set_check_interval(args.interval)
+    if not monitor.start_monitoring():
+        return 1
+
+    started = time.time()
+    while monitor.monitoring and not stop_event.wait(0.5):
+        pass
+    monitor.stop_monitoring()
+    elapsed = time.time() - started
+    log.info(f"共处理 {monitor.frames_captured} 帧，耗时 {elapsed:.1f} 秒"
+             f"（{monitor.frames_captured / max(elapsed, 1e-6):.1f} 帧/秒）")
+    if source is not None:
+        source.close()
+    return 0
+
+
+def play_recording(args, stop_event):
+    """播放录制脚本"""
+    if len(args.serial) > 1:
+        log.error("播放录制只支持一台设备")
+        return 2
+
+    controller = connect_device(args.adb, args.serial[0])
+    if controller is None:
+        return 1
+
+    actions = controller.load_recording(args.recording)
+
+    def interrupt():
+        # 收到退出信号时中断当前播放
+        stop_event.wait()
+        controller.stop_playing()
+
+    threading.Thread(target=interrupt, daemon=True).start()
+
+    for i in range(args.repeat):
+        if stop_event.is_set():
+            break
+        log.info(f"播放录制 {i + 1}/{args.repeat}: {args.recording}")
+        if not controller.play_recording(actions, args.speed, not args.no_random):
+            return 0 if stop_event.is_set() else 1
+    return 0
+
+
+def build_parser():
+    # 各子命令共用的选项
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--adb", default=None, help="adb 可执行文件路径（默认使用界面版配置）")
+    common.add_argument("--log-file", default=None, help="同时将日志写入文件")
+    common.add_argument("-v", "--verbose", action="store_true", help="输出每次触发的详细日志")
+
+    parser = argparse.ArgumentParser(prog="clickzen", description="ClickZen 命令行（无界面运行）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", parents=[common], help="运行监控方案")
+    run_parser.add_argument("scheme", help="监控方案文件（界面中保存的 .json）")
+    run_parser.add_argument("--serial", action="append",
+                            help="设备序列号，可重复指定以同时监控多台设备")
+    run_parser.add_argument("--source", choices=["adb-raw", "adb", "controller", "window", "mss"], default="adb-raw",
+                            help="截图来源：adb-raw 原始帧缓冲（默认，最快）、adb PNG截图、"
+                                 "controller 与界面版相同（模拟器窗口 → ADB）、window 窗口、mss 屏幕区域")
+    run_parser.add_argument("--capture-scale", type=float, default=1.0,
+                            help="adb-raw 截图在本地缩小的比例（如0.5，监控区域坐标不受影响）")
+    run_parser.add_argument("--window", default="scrcpy", help="--source window 时截图的窗口标题")
+    run_parser.add_argument("--region", default=None, help="--source mss 时截图的屏幕区域 left,top,width,height")
+    run_parser.add_argument("--replay", default=None, help="回放图片目录或视频文件（不需要设备，动作只记录不执行）")
+    run_parser.add_argument("--fps", type=float, default=0, help="回放帧率，0表示逐帧回放（基准测试）")
+    run_parser.add_argument("--no-loop", action="store_true", help="回放结束后停止（默认循环）")
+    run_parser.add_argument("--resolution", default=None,
+                            help="监控区域坐标对应的设备分辨率，如 1080x2400（默认为画面尺寸）")
+    run_parser.add_argument("--settings", default="settings.json", help="读取性能选项的设置文件")
+    run_parser.add_argument("--interval", type=float, default=None, help="覆盖方案中的检查间隔（秒）")
+    run_parser.set_defaults(handler=run_scheme)
+
+    play_parser = commands.add_parser("play", parents=[common], help="播放录制脚本")
+    play_parser.add_argument("recording", help="录制文件（.json）")
+    play_parser.add_argument("--serial", action="append", required=True, help="设备序列号")
+    play_parser.add_argument("--speed", type=float, default=1.0, help="播放速度")
+    play_parser.add_argument("--repeat", type=int, default=1, help="重复次数")
+    play_parser.add_argument("--no-random", action="store_true", help="关闭坐标/延迟随机化")
+    play_parser.set_defaults(handler=play_recording)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_file, args.verbose)
+    if args.adb is None:
+        args.adb = default_adb_path()
+    stop_event = install_stop_handler()
+    return args.handler(args, stop_event)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
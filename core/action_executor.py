@@ -0,0 +1,112 @@
+"""动作执行器 - 在独立线程中执行触发的动作，检测不会被长动作序列阻塞"""
+
+import queue
+import threading
+import time
+import traceback
+
+
+# 所有串行任务共用的执行通道
+MAIN_LANE = 'main'
+
+
+class _Lane:
+    """执行通道：一个工作线程 + 一个任务队列，按提交顺序逐个执行动作序列"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = set()  # 等待或正在执行的任务
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"ActionLane-{name}", daemon=True)
+        self._thread.start()
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            key, func, args = job
+            try:
+                func(*args)
+            except Exception:
+                print(f"[ActionExecutor] 通道 {self.name} 执行失败:")
+                print(traceback.format_exc())
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def put(self, key, func, args):
+        """加入队列，同一任务已在排队或执行时返回False"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._queue.put((key, func, args))
+        return True
+
+    def close(self):
+        """通知线程退出：丢弃尚未开始的动作，正在执行的动作执行完后线程结束（不等待）"""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                with self._lock:
+                    self._pending.discard(job[0])
+        self._queue.put(None)
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+
+class ActionExecutor:
+    """动作执行器
+
+    串行任务共用 MAIN_LANE，按触发顺序逐个执行动作；并行任务各自拥有独立通道，与其他任务互不等待。
+    同一任务在通道中最多有一个等待或正在执行的动作序列（队列长度不超过通道中的任务数），
+    通道忙碌时其他任务照常检测并排队，不会被持续触发的任务一直抢占。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lanes = {}
+
+    def submit(self, lane, key, func, *args):
+        """
+        提交任务到指定通道（在通道线程中调用 func(*args)）
+        :param key: 任务标识，同一任务已在该通道排队或执行时不再提交，返回False
+        """
+        with self._lock:
+            worker = self._lanes.get(lane)
+            if worker is None:
+                worker = _Lane(lane)
+                self._lanes[lane] = worker
+        return worker.put(key, func, args)
+
+    def is_pending(self, lane, key):
+        """任务是否已在通道中排队或正在执行"""
+        worker = self._lanes.get(lane)
+        return worker is not None and worker.is_pending(key)
+
+    def prune(self, keep):
+        """关闭不在keep中的通道（并行任务被删除或替换后调用），不等待正在执行的动作"""
+        with self._lock:
+            stale = [self._lanes.pop(lane) for lane in list(self._lanes) if lane not in keep]
+        for worker in stale:
+            worker.close()
+
+    def stop(self, timeout=2):
+        """停止所有通道（丢弃排队的动作，所有通道共用timeout秒等待正在执行的动作结束）"""
+        with self._lock:
+            lanes = list(self._lanes.values())
+            self._lanes.clear()
+        for worker in lanes:
+            worker.close()
+        deadline = time.monotonic() + timeout
+        for worker in lanes:
+            worker.join(max(0, deadline - time.monotonic()))
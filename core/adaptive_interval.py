@@ -0,0 +1,78 @@
+"""自适应检测间隔 - 空闲时逐步放慢检测，有触发或画面变化时立即恢复"""
+
+import numpy as np
+from core.change_detector import RegionChangeDetector
+
+
+class AdaptiveInterval:
+    """自适应检测间隔
+
+    连续 idle_ticks 帧既没有任务触发、画面也没有变化时，
+    检测间隔按 backoff 倍数逐步放大，最多放大到 max_factor 倍；
+    任一任务触发或整帧画面发生变化时立即恢复原间隔。
+    检测耗时接近间隔时，间隔至少拉长到检测耗时的 load_margin 倍，避免检测堆积。
+    """
+
+    def __init__(self, enabled=False, max_factor=8.0, idle_ticks=10, backoff=1.5,
+                 tolerance=4.0, load_margin=1.25):
+        self.enabled = enabled
+        self.max_factor = max_factor  # 最大放大倍数
+        self.idle_ticks = idle_ticks  # 连续空闲多少帧后开始放大
+        self.backoff = backoff  # 每次放大的倍数
+        self.tolerance = tolerance  # 整帧签名允许的最大变化（0-255）
+        self.load_margin = load_margin  # 间隔至少为检测耗时的倍数
+        self.factor = 1.0  # 当前放大倍数
+        self.eval_time = 0.0  # 检测耗时（指数平均）
+        self._idle = 0
+        self._signature = None
+
+    def configure(self, enabled=None, max_factor=None):
+        """修改配置（None表示保持不变）"""
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if max_factor is not None:
+            self.max_factor = max(1.0, float(max_factor))
+        self.reset()
+
+    def reset(self):
+        """恢复初始状态（开始监控时调用）"""
+        self.factor = 1.0
+        self.eval_time = 0.0
+        self._idle = 0
+        self._signature = None
+
+    def frame_changed(self, frame):
+        """整帧画面是否与上一帧不同"""
+        signature = RegionChangeDetector.signature(frame, (0, 0, frame.width, frame.height))
+        previous, self._signature = self._signature, signature
+        if previous is None or previous.shape != signature.shape:
+            return True
+        return np.abs(signature - previous).max() > self.tolerance
+
+    def update(self, frame, hit, eval_time):
+        """
+        每帧检测完成后调用
+        :param hit: 本帧是否有任务触发
+        :param eval_time: 本帧检测耗时（秒）
+        :return: True表示间隔恢复为原值（需要让已排队的任务提前）
+        """
+        self.eval_time = eval_time if self.eval_time == 0 else self.eval_time * 0.8 + eval_time * 0.2
+        if not self.enabled:
+            return False
+
+        if hit or self.frame_changed(frame):
+            snapped = self.factor > 1.0
+            self.factor = 1.0
+            self._idle = 0
+            return snapped
+
+        self._idle += 1
+        if self._idle >= self.idle_ticks:
+            self.factor = min(self.factor * self.backoff, self.max_factor)
+        return False
+
+    def apply(self, interval):
+        """返回调整后的检测间隔"""
+        if not self.enabled:
+            return interval
+        return max(interval * self.factor, self.eval_time * self.load_margin)
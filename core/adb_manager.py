@@ -1,29 +1,258 @@
 import subprocess
+import struct
+import threading
 import time
 import os
+import re
 from pathlib import Path
-from ppadb.client import Client as AdbClient
+import numpy as np
+from core.adb_shell_session import AdbShellPool
+from core.adb_transport import AdbTransportError, adb_transport
+from core.device_tracker import INFO_COMMAND, device_tracker, parse_device_info
+from core.touch_injector import SendeventTouchInjector
+
+
+# screencap 原始输出的像素格式（Android PixelFormat）: 每像素字节数
+RAW_PIXEL_FORMATS = {
+    1: 4,  # RGBA_8888
+    2: 4,  # RGBX_8888
+    3: 3,  # RGB_888
+    4: 2,  # RGB_565
+    5: 4,  # BGRA_8888
+}
+
+
+def parse_raw_screencap(data):
+    """
+    解析 screencap（不带 -p）的原始输出
+    头部为 宽、高、像素格式（Android 8 以后多一个色彩空间字段，共16字节），之后是逐行像素数据
+    :return: (像素数组视图 高x宽x通道（RGB_565为高x宽x2）, 像素格式)，数据无效时返回None
+    """
+    if not data or len(data) < 12:
+        return None
+
+    width, height, pixel_format = struct.unpack_from('<3I', data)
+    bpp = RAW_PIXEL_FORMATS.get(pixel_format)
+    if bpp is None or width == 0 or height == 0:
+        return None
+
+    size = width * height * bpp
+    header = len(data) - size
+    if header not in (12, 16):
+        return None
+
+    # 直接映射为数组，不复制像素
+    pixels = np.frombuffer(data, np.uint8, count=size, offset=header).reshape(height, width, bpp)
+    return pixels, pixel_format
+
+
+# 显示状态：分辨率（wm size，有覆盖时以覆盖为准）和屏幕旋转，一次shell调用
+DISPLAY_STATE_COMMAND = "wm size; dumpsys input | grep SurfaceOrientation"
+
+
+def parse_display_state(output):
+    """
+    解析 DISPLAY_STATE_COMMAND 的输出
+    :return: (自然方向宽, 自然方向高, 旋转 0-3)，无法获取分辨率时返回None
+    """
+    match = (re.search(r'Override size:\s*(\d+)x(\d+)', output) or
+             re.search(r'Physical size:\s*(\d+)x(\d+)', output))
+    if not match:
+        return None
+    rotation = re.search(r'SurfaceOrientation:\s*(\d)', output)
+    return int(match.group(1)), int(match.group(2)), int(rotation.group(1)) if rotation else 0
+
+
+def input_text_command(text):
+    """生成 input text 命令（转义空格和引号）"""
+    text = text.replace(" ", "%s")
+    text = text.replace("'", "\\'")
+    text = text.replace('"', '\\"')
+    return f'input text "{text}"'
+
+
+class InputBatch:
+    """输入命令批处理
+
+    连续的点击、滑动、按键、文本输入和等待先收集起来，flush() 时拼成一个shell脚本
+    （input tap ..; sleep 0.05; input swipe ..）一次发送，在设备上按脚本顺序执行，
+    不再每个动作等待一次往返。方法与 ADBManager 的输入方法同名，可以直接替换使用。
+    超过 max_wait 的等待会先发送已收集的命令，再在本地等待；收集的命令达到预计执行 max_wait 秒、
+    max_commands 条或 max_bytes 字节时自动发送，每个脚本都较短，调用方可以在两次发送之间中途停止。
+    每次发送后按实际执行时间估计每条输入命令的启动耗时（command_latency），
+    按时间排布动作的调用方（如回放录制）可以据此缩短脚本中的等待。
+    """
+
+    def __init__(self, adb, max_wait=1.0, max_commands=50, max_bytes=8000):
+        """
+        :param max_wait: 在设备端执行的最长等待，也是一个脚本的最长预计执行时间（秒）
+        :param max_commands: 一个脚本最多包含的命令数
+        :param max_bytes: 脚本最大长度（字节，远小于ADB请求长度上限和Windows命令行长度上限）
+        """
+        self.adb = adb
+        self.max_wait = max_wait
+        self.max_commands = max_commands
+        self.max_bytes = max_bytes
+        self._commands = []
+        self._bytes = 0
+        self._duration = 0.0  # 脚本中的等待和滑动时间（秒）
+        self._inputs = 0  # 脚本中的输入命令数（不含等待）
+        self.started = None  # 当前脚本第一条命令加入的时间（perf_counter，脚本收集完后立即发送）
+        self.command_latency = 0.0  # 每条输入命令的启动耗时估计（秒）
+
+    @property
+    def pending(self):
+        """尚未发送的命令数"""
+        return len(self._commands)
+
+    @property
+    def expected_duration(self):
+        """已收集的命令在设备上的预计执行时间（等待、滑动时间加上输入命令的启动耗时，秒）"""
+        return self._duration + self._inputs * self.command_latency
+
+    def _add(self, command, duration=0.0, is_input=True):
+        size = len(command.encode('utf-8')) + 2  # 加上分隔符 "; "
+        if self._commands and self._bytes + size > self.max_bytes:
+            self.flush()
+        if not self._commands:
+            self.started = time.perf_counter()
+        self._commands.append(command)
+        self._bytes += size
+        self._duration += duration
+        self._inputs += is_input
+        if len(self._commands) >= self.max_commands or self._duration >= self.max_wait:
+            return self.flush()
+        return True
+
+    def tap(self, x, y):
+        injector = self.adb.get_touch_injector()
+        if injector is not None:
+            return self._add(injector.tap_script(x, y))
+        return self._add(f"input tap {x} {y}")
+
+    def swipe(self, x1, y1, x2, y2, duration=300):
+        injector = self.adb.get_touch_injector()
+        if injector is not None:
+            return self._add(*injector.swipe_script(x1, y1, x2, y2, duration))
+        return self._add(f"input swipe {x1} {y1} {x2} {y2} {duration}", duration / 1000)
+
+    def swipe_path(self, points):
+        """连续手势（见 ADBManager.swipe_path），不支持时返回False"""
+        injector = self.adb.get_touch_injector()
+        if injector is None:
+            return False
+        return self._add(*injector.path_script(points))
+
+    def text(self, text):
+        return self._add(input_text_command(text))
+
+    def keyevent(self, keycode):
+        return self._add(f"input keyevent {keycode}")
+
+    def sleep(self, seconds):
+        """等待（短等待在设备端执行，长等待先发送已收集的命令再在本地等待）"""
+        if seconds <= 0:
+            return
+        if self._commands and self._commands[-1].startswith("sleep "):
+            # 合并相邻的等待
+            command = self._commands.pop()
+            previous = float(command[6:])
+            self._bytes -= len(command) + 2
+            self._duration -= previous
+            seconds += previous
+        if seconds > self.max_wait:
+            self.flush()
+            time.sleep(seconds)
+            return
+        self._add(f"sleep {seconds:.3f}", seconds, is_input=False)
+
+    def flush(self):
+        """发送已收集的命令并等待执行完成，返回是否成功"""
+        if not self._commands:
+            return True
+        script = "; ".join(self._commands)
+        duration, inputs = self._duration, self._inputs
+        # 按脚本中的等待、滑动时间和每条命令的启动时间放宽超时
+        timeout = duration + len(self._commands) + 5
+        self._commands = []
+        self._bytes = 0
+        self._duration = 0.0
+        self._inputs = 0
+
+        started = time.perf_counter()
+        if self.adb.shell(script, timeout=timeout) is None:
+            return False
+        if inputs:
+            # 实际执行时间超出等待和滑动时间的部分平摊到每条输入命令
+            latency = max(0.0, (time.perf_counter() - started - duration) / inputs)
+            self.command_latency = latency if not self.command_latency else (self.command_latency + latency) / 2
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
 
 
 class ADBManager:
     def __init__(self, adb_path):
         self.adb_path = Path(adb_path)
-        self.client = None
+        self.transport = adb_transport  # 直接与ADB服务通信，失败时使用命令行
+        self.tracker = device_tracker  # 设备列表和属性缓存，ADB服务不可用时执行命令查询
         self.device = None
         self.device_serial = None
         self.wireless_devices = []  # 存储无线设备信息
+        self._shell_pool = None  # 当前设备的持久shell会话
+        self._shell_serial = None
+        self._shell_lock = threading.Lock()  # 检测线程和执行通道可能同时首次创建会话池
+        self.touch_backend = 'input'  # 触摸注入方式: 'input' 或 'sendevent'
+        self._touch_injector = None
+        self._injector_serial = None
+        self._injector_lock = threading.Lock()
+        self._display_state = None  # (序列号, 显示状态, 获取时间)
 
     # 在 ADBManager 类中添加以下方法
 
     def check_device_ready(self):
         """检查设备是否就绪"""
+        return self.is_device_online()
+
+    def is_device_online(self, timeout=0):
+        """当前设备是否在线：设备跟踪可用时直接查询（最多等待timeout秒），否则执行 echo test"""
         if not self.device_serial:
             return False
+        if self.tracker.start():
+            return self.tracker.is_online(self.device_serial, timeout)
 
-        # 测试设备连接
         result = self.shell("echo test")
         return result is not None and "test" in result
 
+    def get_display_state(self, max_age=0.5):
+        """当前设备的 (自然方向宽, 自然方向高, 旋转)，缓存max_age秒，获取失败返回None"""
+        if not self.device_serial:
+            return None
+        cached = self._display_state
+        if cached and cached[0] == self.device_serial and time.time() - cached[2] <= max_age:
+            return cached[1]
+        state = parse_display_state(self.shell(DISPLAY_STATE_COMMAND) or "")
+        if state:
+            self._display_state = (self.device_serial, state, time.time())
+        return state
+
+    def get_physical_size(self):
+        """当前设备的物理分辨率 (宽, 高)，获取失败返回None"""
+        if not self.device_serial:
+            return None
+        if self.tracker.start():
+            info = self.tracker.info(self.device_serial)
+            if info and info['size']:
+                return info['size']
+
+        match = re.search(r'Physical size:\s*(\d+)x(\d+)', self.shell("wm size") or "")
+        return (int(match.group(1)), int(match.group(2))) if match else None
+
     def wake_screen(self):
         """唤醒屏幕"""
         if self.device_serial:
@@ -89,16 +318,13 @@ class ADBManager:
 
             time.sleep(2)
 
-            # 尝试连接ADB
+            # 测试服务连接（失败时各命令使用命令行方式）
             try:
-                self.client = AdbClient(host="127.0.0.1", port=5037)
-                # 测试连接
-                self.client.version()
-                return True
-            except:
-                # 如果连接失败，使用命令行方式
+                self.transport.version()
+                self.tracker.start()
+            except AdbTransportError:
                 print("使用命令行模式运行ADB")
-                return True
+            return True
 
         except subprocess.TimeoutExpired:
             print("ADB启动超时")
@@ -107,21 +333,33 @@ class ADBManager:
             print(f"启动ADB失败: {e}")
             return False
 
+    def list_devices(self):
+        """设备列表 [(序列号, 状态)]（ADB服务不可用时使用命令行）"""
+        try:
+            return self.transport.devices()
+        except AdbTransportError:
+            pass
+
+        result = subprocess.run([str(self.adb_path), "devices"],
+                                capture_output=True, text=True, timeout=5)
+        lines = result.stdout.strip().split('\n')
+        # 跳过第一行 "List of devices attached"
+        return [tuple(line.split('\t', 1)) for line in lines[1:] if '\t' in line]
+
     def get_devices(self):
-        """获取设备列表（使用命令行）"""
+        """获取设备列表（设备跟踪可用时使用缓存的设备列表和属性）"""
         try:
-            result = subprocess.run([str(self.adb_path), "devices"],
-                                    capture_output=True, text=True, timeout=5)
+            if self.tracker.start():
+                device_list = self.tracker.devices()
+            else:
+                device_list = self.list_devices()
 
             devices = []
-            lines = result.stdout.strip().split('\n')
-
-            for line in lines[1:]:  # 跳过第一行 "List of devices attached"
-                if '\t' in line:
-                    serial, status = line.split('\t')
-                    if status == 'device':
-                        info = self.get_device_info_cmd(serial)
-                        devices.append((serial, info))
+            for serial, status in device_list:
+                if status == 'device':
+                    info = self.tracker.info(serial) if self.tracker.available else None
+                    devices.append((serial, self.format_device_info(info) if info
+                                    else self.get_device_info_cmd(serial)))
 
             return devices
 
@@ -129,26 +367,39 @@ class ADBManager:
             print(f"获取设备列表失败: {e}")
             return []
 
+    @staticmethod
+    def format_device_info(info):
+        return f"{info['brand']} {info['model']} (Android {info['android']})"
+
     def get_device_info_cmd(self, serial):
-        """通过命令行获取设备信息"""
+        """通过命令行获取设备信息（一次shell调用）"""
         try:
-            brand = self.shell_cmd(serial, "getprop ro.product.brand").strip()
-            model = self.shell_cmd(serial, "getprop ro.product.model").strip()
-            android = self.shell_cmd(serial, "getprop ro.build.version.release").strip()
-            return f"{brand} {model} (Android {android})"
+            return self.format_device_info(parse_device_info(self.shell_cmd(serial, INFO_COMMAND)))
         except:
             return "Unknown Device"
 
     def shell_cmd(self, serial, command):
-        """执行shell命令（命令行方式）"""
+        """执行单条shell命令，失败时返回空字符串"""
+        return self._shell_once(serial, command) or ""
+
+    def _shell_once(self, serial, command, timeout=None):
+        """执行单条shell命令（优先通过ADB服务socket，服务不可用时使用命令行），失败或超时返回None"""
+        timeout = timeout or 5
+        try:
+            return self.transport.shell(serial, command, timeout)
+        except AdbTransportError:
+            pass
+        except OSError:
+            return None  # 命令已发出但超时，不再重复执行
+
         try:
             result = subprocess.run(
                 [str(self.adb_path), "-s", serial, "shell", command],
-                capture_output=True, text=True, timeout=5
+                capture_output=True, text=True, timeout=timeout
             )
             return result.stdout
         except:
-            return ""
+            return None
 
     def pair_wireless_device(self, ip_port, pairing_code):
         """配对无线设备（Android 11+）"""
@@ -313,69 +564,148 @@ class ADBManager:
             else:
                 return False
 
-        # 测试连接
-        result = self.shell(f"echo test")
-        return result is not None
+        # 测试连接（无线设备刚连接时，设备列表的更新可能稍晚到达）
+        return self.is_device_online(timeout=2)
 
-    def shell(self, command, root=False):
-        """执行shell命令"""
+    def shell(self, command, root=False, timeout=None):
+        """执行shell命令（timeout 默认5秒）"""
         if not self.device_serial:
             return None
 
         if root:
             command = f"su -c '{command}'"
 
+        # 优先使用持久shell会话，会话不可用时单独执行
         try:
-            result = subprocess.run(
-                [str(self.adb_path), "-s", self.device_serial, "shell", command],
-                capture_output=True, text=True, timeout=5
-            )
-            return result.stdout
-        except:
+            return self._session_pool().run(command, timeout)
+        except ConnectionError as e:
+            print(f"[ADB] {e}，改用单次连接执行")
+
+        return self._shell_once(self.device_serial, command, timeout)
+
+    def input_batch(self, max_wait=1.0):
+        """创建输入命令批处理（见 InputBatch）"""
+        return InputBatch(self, max_wait)
+
+    def _session_pool(self):
+        """当前设备的shell会话池（切换设备时重建）"""
+        with self._shell_lock:
+            if self._shell_pool is None or self._shell_serial != self.device_serial:
+                if self._shell_pool is not None:
+                    self._shell_pool.close()
+                self._shell_pool = AdbShellPool([self.adb_path, "-s", self.device_serial, "shell"],
+                                                name=self.device_serial)
+                self._shell_serial = self.device_serial
+            return self._shell_pool
+
+    def close_shell_sessions(self):
+        """关闭持久shell会话"""
+        with self._shell_lock:
+            pool, self._shell_pool = self._shell_pool, None
+        if pool is not None:
+            pool.close()
+
+    def set_touch_backend(self, backend):
+        """设置触摸注入方式: 'input'（input 命令）或 'sendevent'（直接写入触摸事件，设备不支持时仍使用input）"""
+        with self._injector_lock:
+            self.touch_backend = backend if backend in ('input', 'sendevent') else 'input'
+            self._touch_injector = None
+            self._injector_serial = None
+
+    def get_touch_injector(self):
+        """当前设备的sendevent注入器（每台设备首次使用时查找触摸设备），未启用或不支持时返回None"""
+        if self.touch_backend != 'sendevent' or not self.device_serial:
             return None
+        with self._injector_lock:
+            if self._injector_serial != self.device_serial:
+                self._injector_serial = self.device_serial
+                injector = SendeventTouchInjector(self)
+                self._touch_injector = injector if injector.prepare() else None
+                if self._touch_injector is None:
+                    print("[ADB] 设备不支持sendevent注入，使用input命令")
+            return self._touch_injector
 
     def tap(self, x, y):
         """点击屏幕"""
         if self.device_serial:
-            self.shell(f"input tap {x} {y}")
+            injector = self.get_touch_injector()
+            self.shell(injector.tap_script(x, y) if injector else f"input tap {x} {y}")
 
     def swipe(self, x1, y1, x2, y2, duration=300):
-        """滑动屏幕"""
+        """滑动屏幕（起点和终点相同时为长按）"""
         if self.device_serial:
-            return self.shell(f"input swipe {x1} {y1} {x2} {y2} {duration}")
+            injector = self.get_touch_injector()
+            if injector is not None:
+                script, seconds = injector.swipe_script(x1, y1, x2, y2, duration)
+                return self.shell(script, timeout=seconds + 5)
+            return self.shell(f"input swipe {x1} {y1} {x2} {y2} {duration}", timeout=duration / 1000 + 5)
         return None
 
+    def swipe_path(self, points):
+        """
+        沿轨迹连续滑动（一次按下、逐点移动、一次抬起）
+        :param points: [(x, y, 相对时间ms), ...]
+        :return: 是否已执行（只有sendevent注入支持，否则返回False，由调用方分段滑动）
+        """
+        injector = self.get_touch_injector() if self.device_serial else None
+        if injector is None:
+            return False
+        script, seconds = injector.path_script(points)
+        return self.shell(script, timeout=seconds + 5) is not None
+
     def text(self, text):
         """输入文本"""
         if self.device_serial:
-            # 转义特殊字符
-            text = text.replace(" ", "%s")
-            text = text.replace("'", "\\'")
-            text = text.replace('"', '\\"')
-            self.shell(f'input text "{text}"')
+            self.shell(input_text_command(text))
 
     def keyevent(self, keycode):
         """发送按键事件"""
         if self.device_serial:
             self.shell(f"input keyevent {keycode}")
 
+    def screencap_raw(self):
+        """
+        原始帧缓冲截图（不经过设备端PNG编码和本地PNG解码）
+        :return: (像素数组视图, 像素格式)，失败时返回None
+        """
+        if not self.device_serial:
+            return None
+
+        try:
+            return parse_raw_screencap(self.exec_out("screencap"))
+        except Exception as e:
+            print(f"[ADB] 原始截图异常: {e}")
+            return None
+
+    def exec_out(self, command, timeout=5):
+        """
+        执行命令并返回原始输出（优先通过ADB服务socket，服务不可用时使用 adb exec-out）
+        :return: 输出字节，命令失败时返回None
+        """
+        try:
+            return self.transport.exec_out(self.device_serial, command, timeout)
+        except AdbTransportError:
+            pass
+
+        result = subprocess.run(
+            [str(self.adb_path), "-s", self.device_serial, "exec-out", *command.split()],
+            capture_output=True, timeout=timeout
+        )
+        return result.stdout if result.returncode == 0 else None
+
     def screenshot(self):
         """截图 """
         if not self.device_serial:
             return None
 
         try:
-            # 方法1: 使用exec-out（推荐）
-            result = subprocess.run(
-                [str(self.adb_path), "-s", self.device_serial, "exec-out", "screencap", "-p"],
-                capture_output=True, timeout=5
-            )
+            data = self.exec_out("screencap -p")
 
-            if result.returncode == 0 and result.stdout:
+            if data:
                 # 检查数据是否为PNG格式
-                if result.stdout[:8] == b'\x89PNG\r\n\x1a\n':
+                if data[:8] == b'\x89PNG\r\n\x1a\n':
                     print("[ADB] 截图成功 (exec-out)")
-                    return result.stdout
+                    return data
 
             print("[ADB] 截图失败")
             return None
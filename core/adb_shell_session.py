@@ -0,0 +1,210 @@
+"""持久ADB shell会话 - 所有shell命令通过一个长驻的 adb shell 进程执行，不再每条命令启动一个adb进程"""
+
+import itertools
+import os
+import secrets
+import subprocess
+import threading
+import time
+
+
+class AdbShellSession:
+    """持久shell会话
+
+    启动一个 adb shell 进程（不分配终端，从标准输入读取命令），每条命令包装为
+        ( 命令
+        ) </dev/null 2>/dev/null; __s=$?; echo; echo 标记 $__s
+    命令在子shell中执行，cd、export 等不会影响之后的命令（与单次 adb shell 一致）。
+    读取线程持续收集输出，遇到本条命令的标记即得到完整输出和退出码。
+    命令超时时会话被重置（残留输出无法与下一条命令区分），进程退出时下次执行前自动重连。
+    command 可以是任意从标准输入读取命令的shell（如 ['sh']），便于在没有设备时测试。
+    """
+
+    def __init__(self, command, timeout=5.0, name="shell"):
+        self.command = [str(part) for part in command]
+        self.timeout = timeout
+        self.name = name
+        self.last_status = None  # 最近一条命令的退出码
+        self._process = None
+        self._buffer = bytearray()
+        self._closed = True
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()  # 同一时间只执行一条命令
+        self._counter = itertools.count(1)
+        self._prefix = f"__CZ_{secrets.token_hex(8)}_"  # 随机前缀，命令输出中不会出现本条命令的标记
+
+    @property
+    def alive(self):
+        """会话进程是否在运行"""
+        return self._process is not None and self._process.poll() is None and not self._closed
+
+    def _start(self):
+        """启动shell进程和读取线程"""
+        self._close()
+        try:
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+                creationflags=0x08000000 if os.name == 'nt' else 0  # CREATE_NO_WINDOW
+            )
+        except OSError as e:
+            print(f"[AdbShell] {self.name} 启动失败: {e}")
+            self._process = None
+            return False
+
+        with self._cond:
+            self._buffer.clear()
+            self._closed = False
+        threading.Thread(target=self._read_loop, args=(self._process,),
+                         name=f"AdbShell-{self.name}", daemon=True).start()
+        return True
+
+    def _read_loop(self, process):
+        """持续读取shell输出"""
+        stream = process.stdout
+        while True:
+            try:
+                chunk = stream.read(65536)
+            except (OSError, ValueError):
+                chunk = b''
+            with self._cond:
+                if process is not self._process:
+                    return  # 会话已重置，旧进程的输出直接丢弃
+                if not chunk:
+                    self._closed = True
+                    self._cond.notify_all()
+                    return
+                self._buffer += chunk
+                self._cond.notify_all()
+
+    def _close(self):
+        """结束shell进程"""
+        process, self._process = self._process, None
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        if process.poll() is None:
+            process.kill()
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def _wait(self, marker, timeout):
+        """等待本条命令的标记，返回输出；超时或会话断开时返回None"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                index = self._buffer.find(marker)
+                if index >= 0:
+                    end = self._buffer.find(b"\n", index + len(marker))
+                    if end >= 0:
+                        output = bytes(self._buffer[:index])
+                        status = bytes(self._buffer[index + len(marker):end]).strip()
+                        del self._buffer[:end + 1]
+                        self.last_status = int(status) if status.isdigit() else None
+                        return output.decode('utf-8', errors='replace')
+                if self._closed:
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def run(self, command, timeout=None):
+        """
+        执行命令
+        :return: 标准输出（与 adb shell 命令的输出相同），命令已发出但超时或会话断开时返回None
+        :raises ConnectionError: 会话无法启动或命令无法发出（命令未执行，调用方可以改用其他方式）
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            # 会话断开时重连一次；命令已发出后断开则不重试，避免重复执行
+            for _ in range(2):
+                if not self.alive and not self._start():
+                    raise ConnectionError(f"{self.name} 无法启动shell会话")
+
+                token = f"{self._prefix}{next(self._counter)}"
+                script = f"( {command}\n) </dev/null 2>/dev/null; __s=$?; echo; echo {token} $__s\n"
+                with self._cond:
+                    self._buffer.clear()
+                try:
+                    self._process.stdin.write(script.encode('utf-8'))
+                    self._process.stdin.flush()
+                except (OSError, ValueError):
+                    self._close()
+                    continue
+
+                output = self._wait(f"\n{token} ".encode(), timeout)
+                if output is None:
+                    if self.alive:
+                        print(f"[AdbShell] {self.name} 命令超时，重置会话: {command}")
+                    self._close()
+                return output
+            raise ConnectionError(f"{self.name} shell会话已断开")
+
+    def close(self):
+        """关闭会话"""
+        with self._lock:
+            self._close()
+
+
+class AdbShellPool:
+    """shell会话池
+
+    并行任务可能同时发送命令（如一个任务长按时另一个任务点击），
+    每条命令使用一个空闲会话，没有空闲会话且未达到上限时新建。
+    """
+
+    def __init__(self, command, size=4, timeout=5.0, name="shell"):
+        self.command = command
+        self.size = size
+        self.timeout = timeout
+        self.name = name
+        self._lock = threading.Lock()
+        self._idle = []
+        self._count = 0
+        self._closed = False
+        self._available = threading.Condition(self._lock)
+
+    def _acquire(self):
+        with self._available:
+            while not self._idle and self._count >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+            return AdbShellSession(self.command, self.timeout, f"{self.name}-{self._count}")
+
+    def _release(self, session):
+        with self._available:
+            if not self._closed:
+                self._idle.append(session)
+                self._available.notify()
+                return
+        session.close()  # 会话池已关闭
+
+    def run(self, command, timeout=None):
+        """在空闲会话中执行命令（返回值和异常同 AdbShellSession.run）"""
+        session = self._acquire()
+        try:
+            return session.run(command, timeout)
+        finally:
+            self._release(session)
+
+    def close(self):
+        """关闭所有会话（正在执行的会话在命令结束后关闭）"""
+        with self._available:
+            self._closed = True
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            session.close()
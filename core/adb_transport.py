@@ -0,0 +1,232 @@
+"""ADB服务socket传输 - 直接按ADB主机协议与 adb server 通信，执行命令不再启动adb进程
+
+协议：客户端发送 4位十六进制长度 + 请求，服务返回 OKAY，或 FAIL + 4位十六进制长度 + 错误信息。
+设备命令先发送 host:transport:序列号 把连接切换到设备，再发送 shell:命令 / exec:命令，
+之后连接上的数据即为命令输出，命令结束时服务关闭连接（每个连接只能执行一条命令）。
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+
+
+class AdbTransportError(ConnectionError):
+    """无法通过ADB服务执行命令（服务未运行、设备不存在、连接断开等），命令未执行"""
+
+
+class AdbTransport:
+    """ADB服务socket传输
+
+    每条命令使用一个新连接；为减少等待，每台设备预先准备若干已完成 host:transport 的空闲连接，
+    取走后由后台线程补充。空闲连接可能已被服务关闭（设备断开等），使用失败时换新连接重试一次。
+    """
+
+    def __init__(self, host="127.0.0.1", port=None, pool_size=2, timeout=5.0):
+        self.host = host
+        self.port = port or int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}  # {序列号: [已切换到设备的空闲连接]}
+        self._refill_queue = queue.Queue()
+        self._refill_thread = None
+        self._closed = False
+
+    # ---------- 协议 ----------
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise AdbTransportError(f"无法连接ADB服务 {self.host}:{self.port}: {e}") from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _read_exact(sock, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbTransportError("ADB服务关闭了连接")
+            data += chunk
+        return bytes(data)
+
+    def _request(self, sock, payload):
+        """发送请求并检查响应状态"""
+        data = payload.encode('utf-8')
+        if len(data) > 0xffff:
+            raise AdbTransportError(f"请求过长（{len(data)} 字节）")
+        try:
+            sock.sendall(b"%04x" % len(data) + data)
+            status = self._read_exact(sock, 4)
+            if status == b"OKAY":
+                return
+            if status == b"FAIL":
+                length = int(self._read_exact(sock, 4), 16)
+                message = self._read_exact(sock, length).decode('utf-8', errors='replace')
+                raise AdbTransportError(f"{payload}: {message}")
+        except AdbTransportError:
+            raise
+        except OSError as e:
+            raise AdbTransportError(f"{payload}: {e}") from e
+        raise AdbTransportError(f"{payload}: 无效响应 {status!r}")
+
+    def _read_block(self, sock):
+        """读取 4位十六进制长度 + 数据 格式的响应"""
+        try:
+            length = int(self._read_exact(sock, 4), 16)
+            return self._read_exact(sock, length)
+        except OSError as e:
+            raise AdbTransportError(str(e)) from e
+
+    def _read_all(self, sock, timeout):
+        """读取命令输出直到服务关闭连接，超时抛出 TimeoutError（命令已执行）"""
+        deadline = time.monotonic() + timeout
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("ADB命令超时")
+            sock.settimeout(remaining)
+            chunk = sock.recv(1 << 20)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _host_request(self, payload):
+        """执行 host: 请求，返回响应数据"""
+        sock = self._connect()
+        try:
+            self._request(sock, payload)
+            return self._read_block(sock)
+        finally:
+            sock.close()
+
+    # ---------- 连接池 ----------
+
+    def _transport_socket(self, serial):
+        """新建切换到设备的连接"""
+        sock = self._connect()
+        try:
+            self._request(sock, f"host:transport:{serial}")
+        except AdbTransportError:
+            sock.close()
+            raise
+        return sock
+
+    def _take_idle(self, serial):
+        with self._lock:
+            idle = self._idle.get(serial)
+            sock = idle.pop() if idle else None
+        self._request_refill(serial)
+        return sock
+
+    def _request_refill(self, serial):
+        """让后台线程补充空闲连接"""
+        with self._lock:
+            if self._closed or self.pool_size <= 0:
+                return
+            if self._refill_thread is None or not self._refill_thread.is_alive():
+                self._refill_thread = threading.Thread(target=self._refill_loop, name="AdbTransport",
+                                                       daemon=True)
+                self._refill_thread.start()
+        self._refill_queue.put(serial)
+
+    def _refill_loop(self):
+        while True:
+            serial = self._refill_queue.get()
+            if serial is None:
+                return
+            try:
+                while True:
+                    with self._lock:
+                        if self._closed or len(self._idle.get(serial, ())) >= self.pool_size:
+                            break
+                    sock = self._transport_socket(serial)
+                    with self._lock:
+                        if self._closed:
+                            sock.close()
+                            break
+                        self._idle.setdefault(serial, []).append(sock)
+            except AdbTransportError:
+                pass  # 服务或设备不可用，下次使用时再补充
+
+    def _open_service(self, serial, service):
+        """打开设备服务连接（之后的数据即为命令输出）"""
+        sock = self._take_idle(serial)
+        if sock is not None:
+            try:
+                self._request(sock, service)
+                return sock
+            except AdbTransportError:
+                sock.close()  # 空闲连接已失效，换新连接重试
+
+        sock = self._transport_socket(serial)
+        try:
+            self._request(sock, service)
+        except AdbTransportError:
+            sock.close()
+            raise
+        return sock
+
+    def _run_service(self, serial, service, timeout):
+        sock = self._open_service(serial, service)
+        try:
+            return self._read_all(sock, self.timeout if timeout is None else timeout)
+        finally:
+            sock.close()
+
+    # ---------- 公开接口 ----------
+
+    def version(self):
+        """ADB服务版本号"""
+        return int(self._host_request("host:version"), 16)
+
+    @staticmethod
+    def _parse_devices(data):
+        output = data.decode('utf-8', errors='replace')
+        return [tuple(line.split('\t', 1)) for line in output.splitlines() if '\t' in line]
+
+    def devices(self):
+        """设备列表 [(序列号, 状态)]"""
+        return self._parse_devices(self._host_request("host:devices"))
+
+    def open_track_devices(self):
+        """订阅设备变化（host:track-devices），返回连接；之后每次设备变化服务都会发送一份完整的设备列表"""
+        sock = self._connect()
+        try:
+            self._request(sock, "host:track-devices")
+        except AdbTransportError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return sock
+
+    def read_device_list(self, sock):
+        """读取订阅连接上的下一份设备列表 [(序列号, 状态)]，连接断开时抛出 AdbTransportError"""
+        return self._parse_devices(self._read_block(sock))
+
+    def shell(self, serial, command, timeout=None):
+        """执行shell命令，返回输出文本"""
+        return self._run_service(serial, f"shell:{command}", timeout).decode('utf-8', errors='replace')
+
+    def exec_out(self, serial, command, timeout=None):
+        """执行命令并返回原始输出（不经过终端，适合二进制数据）"""
+        return self._run_service(serial, f"exec:{command}", timeout)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, {}
+        self._refill_queue.put(None)
+        for sockets in idle.values():
+            for sock in sockets:
+                sock.close()
+
+
+# 全局传输实例（按设备序列号区分连接，所有ADBManager共用）
+adb_transport = AdbTransport()
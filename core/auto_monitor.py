@@ -1,11 +1,19 @@
 import time
 import threading
 from PIL import Image
-import numpy as np
 import cv2
 from PyQt6.QtCore import QObject, pyqtSignal
 from datetime import datetime
-from core.window_capture import WindowCapture
+from concurrent.futures import ThreadPoolExecutor
+from core.frame import Frame
+from core.frame_source import ControllerFrameSource
+from core.template_cache import template_cache, iter_config_templates
+from core.image_matcher import match_best
+from core.change_detector import RegionChangeDetector
+from core.action_executor import ActionExecutor, MAIN_LANE
+from core.task_scheduler import TaskScheduler
+from core.adaptive_interval import AdaptiveInterval
+from core.scheme_plan import compile_task, compile_screen_state, MODE_IF, MODE_RANDOM
 import json
 import base64
 from io import BytesIO
@@ -20,13 +28,20 @@ class AutoMonitor(QObject):
     status_update = pyqtSignal(str)
     log_message = pyqtSignal(str)
 
-    def __init__(self, adb_manager, controller):
+    def __init__(self, adb_manager, controller, source=None):
         super().__init__()
         self.adb = adb_manager
         self.controller = controller
+        # 截图来源（默认使用控制器截图：模拟器窗口 → Scrcpy窗口 → ADB）
+        self.frame_source = source if source is not None else ControllerFrameSource(controller)
         self.monitoring = False
         self.monitor_thread = None
+        self.capture_thread = None
         self.monitor_configs = []
+        self.plans = {}  # {id(config): TaskPlan}，检测循环只执行编译好的计划
+        self.variable_index = {}  # {变量名: [依赖该变量的任务配置]}
+        self.screen_states = []  # 画面状态定义 [{'name', 'conditions', 'logic'}]
+        self.state_plans = []  # 编译后的画面状态（按定义顺序匹配）
         self.check_interval = 0.5
         self.use_window_capture = True  # 强制使用窗口截图
         self.global_variables = {}  # 公共变量存储
@@ -35,11 +50,25 @@ class AutoMonitor(QObject):
         self.sync_interval = 1.0  # 同步间隔
         self.last_sync_time = 0  # 上次同步时间
         self.last_variable_values = {}  # 上次的变量值，用于检测变化
+        self.templates = template_cache  # 模板缓存（加载时预转换）
+        self.change_detector = RegionChangeDetector()  # 区域未变化时复用匹配结果（默认关闭）
+        self.executor = ActionExecutor()  # 动作在独立通道中执行，不阻塞检测
+        self.adaptive = AdaptiveInterval()  # 自适应检测间隔（默认关闭）
+        self.scheduler = TaskScheduler(self.check_interval, self.adaptive)  # 按任务检测间隔和优先级调度
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None  # 截图线程产出的最新一帧
+        self._frame_seq = 0  # 最新帧的序号
+        self._reevaluate = False  # 变量变化后需要基于最新帧立即重新检测
+        self.eval_workers = 0  # 并行匹配线程数（0或1表示在检测线程中逐个匹配）
+        self._eval_pool = None
+        self._eval_pool_size = 0
 
     def add_monitor_config(self, config):
         """添加监控配置"""
         config['last_executed'] = 0
+        self._compile_plan(config).index = len(self.monitor_configs)
         self.monitor_configs.append(config)
+        self.scheduler.add(config)
         self.log_message.emit(f"添加监控任务: {config['name']}")
         return len(self.monitor_configs) - 1
 
@@ -54,7 +83,15 @@ class AutoMonitor(QObject):
             return False
 
         self.monitoring = True
+        self.change_detector.reset()
+        self.adaptive.reset()
+        self.scheduler.reset(self.monitor_configs)
+        with self._frame_cond:
+            self._latest_frame = None
+            self._frame_seq = 0
         
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitor_thread.start()
         self.status_update.emit("监控中...")
@@ -76,10 +113,18 @@ class AutoMonitor(QObject):
         """停止监控"""
         self.monitoring = False
         # 停止正在播放的动作
-        if self.controller.playing:
+        if self.controller is not None and self.controller.playing:
             self.controller.stop_playing()
+        self.scheduler.wake()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        if self.capture_thread:
+            self.capture_thread.join(timeout=2)
         if self.monitor_thread:
             self.monitor_thread.join(timeout=2)
+        self.executor.stop(timeout=2)
+        self._shutdown_eval_pool()
+        self._latest_frame = None
         
         # 注意：不断开网络连接，因为可能需要继续同步变量
         # 网络连接由高级监控对话框管理
@@ -89,93 +134,153 @@ class AutoMonitor(QObject):
         self.log_message.emit("已清空所有变量")
         self.status_update.emit("已停止")
 
-    def _monitor_loop(self):
-        """监控循环 - 从Scrcpy窗口截图"""
+    def _capture_loop(self):
+        """截图线程 - 有任务到期时截图（频率不超过最短检测间隔），只保留最新一帧（不积压）"""
+        last_capture = 0
         while self.monitoring:
             try:
-                # 处理变量同步
-                self._sync_network_variables()
-                
-                # 从控制器获取截图（支持Scrcpy和模拟器）
-                screenshot = self.controller.screenshot()
-
-                if not screenshot:
-                    self.log_message.emit("无法获取屏幕截图(Scrcpy/模拟器)")
-                    time.sleep(self.check_interval)
+                # 没有到期的任务时不截图
+                if not self.scheduler.wait_due(0.5, last_capture + self.scheduler.min_interval()):
                     continue
 
-                # 检查每个监控配置
-                for i, config in enumerate(self.monitor_configs):
-                    if not config.get('enabled', True):
-                        continue
+                # 从截图来源获取画面（默认为控制器截图，支持Scrcpy和模拟器）
+                last_capture = time.time()
+                bgr, timestamp = self.frame_source.grab()
+
+                if bgr is None:
+                    if getattr(self.frame_source, 'finished', False):
+                        # 回放结束：停止截图，由调用方调用 stop_monitoring 收尾
+                        self.log_message.emit("截图来源已结束")
+                        self.monitoring = False
+                        break
+                    self.log_message.emit(f"无法获取屏幕截图({self.frame_source.name})")
+                else:
+                    # 每帧只转换一次，所有条件共享同一份BGR数据
+                    frame = Frame(bgr, timestamp)
+                    with self._frame_cond:
+                        self._latest_frame = frame
+                        self._frame_seq += 1
+                        self._frame_cond.notify_all()
 
-                    # 检查冷却时间
-                    current_time = time.time()
-                    if current_time - config.get('last_executed', 0) < config.get('cooldown', 5):
-                        continue
+            except Exception as e:
+                import traceback
+                self.log_message.emit(f"截图错误: {str(e)}")
+                print(f"截图线程错误详情:")
+                print(traceback.format_exc())
+                time.sleep(1)
 
-                    # 获取任务模式
-                    task_mode = config.get('task_mode')
-                    
-                    if task_mode == 'IF':
-                        # IF模式：先检查统一条件，通过后再检查每个条件-动作对
-                        unified_conditions = config.get('unified_conditions', [])
-                        if unified_conditions:
-                            if not self._check_unified_conditions(screenshot, unified_conditions, config.get('condition_logic', 'AND (全部满足)'), log_details=False):
-                                continue
-                        
-                        self._execute_if_mode(config, screenshot, current_time, i)
-                    elif task_mode == 'RANDOM':
-                        # RANDOM模式：检查触发条件，然后随机执行动作序列
-                        # 检查统一条件
-                        unified_conditions = config.get('unified_conditions', [])
-                        if unified_conditions:
-                            if not self._check_unified_conditions(screenshot, unified_conditions, config.get('condition_logic', 'AND (全部满足)'), log_details=False):
-                                continue
-                        
-                        self.log_message.emit(f"✅ RANDOM模式触发: {config['name']}")
-                        self.match_found.emit({
-                            'config': config,
-                            'index': i,
-                            'time': datetime.now().strftime("%H:%M:%S")
-                        })
-                        
-                        # 随机选择并执行一个动作序列
-                        self._execute_random_mode(config)
-                        config['last_executed'] = current_time
-                    else:
-                        # 传统模式（兼容旧版本）
-                        # 检查统一条件
-                        unified_conditions = config.get('unified_conditions', [])
-                        if unified_conditions:
-                            if not self._check_unified_conditions(screenshot, unified_conditions, config.get('condition_logic', 'AND (全部满足)'), log_details=False):
-                                continue
-                        else:
-                            # 兼容旧版本：没有统一条件时，尝试使用旧格式
-                            # 检查旧版变量条件
-                            if not self._check_conditions(config.get('conditions', [])):
-                                continue
-                            
-                            # 检查旧版模板匹配
-                            if config.get('template'):
-                                region_img = self._get_region_image(screenshot, config.get('region'))
-                                if not region_img:
-                                    continue
-                                if not self._match_template(region_img, config['template'], config.get('threshold', 0.85)):
-                                    continue
-                        
-                        self.log_message.emit(f"✅ 触发成功: {config['name']}")
-                        self.match_found.emit({
-                            'config': config,
-                            'index': i,
-                            'time': datetime.now().strftime("%H:%M:%S")
-                        })
+    def _task_lane(self, config):
+        """任务的动作执行通道：串行任务共用主通道，并行任务独占一个通道"""
+        if config.get('concurrency', 'serial') == 'parallel':
+            return f"task-{id(config)}"
+        return MAIN_LANE
+
+    def _compile_plan(self, config):
+        """编译任务的执行计划（模板在此时预先转换）"""
+        plan = compile_task(config, self.templates, self._task_lane(config))
+        self.plans[id(config)] = plan
+        self._index_variables()
+        return plan
+
+    def _index_plans(self):
+        """任务列表变化后更新各计划中的任务序号"""
+        for index, config in enumerate(self.monitor_configs):
+            plan = self.plans.get(id(config))
+            if plan is not None:
+                plan.index = index
+
+    def _prune_lanes(self):
+        """关闭已删除或被替换的并行任务的执行通道"""
+        self.executor.prune({MAIN_LANE} | {plan.lane for plan in self.plans.values()})
+
+    def _index_variables(self):
+        """重建变量依赖索引"""
+        index = {}
+        for plan in self.plans.values():
+            for name in plan.variables():
+                index.setdefault(name, []).append(plan.config)
+        self.variable_index = index
+
+    def set_screen_states(self, states):
+        """设置画面状态定义并重新编译"""
+        kept_ids = {id(template) for state in states for template in iter_config_templates(state)}
+        for state in self.screen_states:
+            for template in iter_config_templates(state):
+                if id(template) not in kept_ids:
+                    self.templates.invalidate(template)
+        self.screen_states = states
+        self.state_plans = [compile_screen_state(state, self.templates) for state in states]
+        if states:
+            self.log_message.emit(f"画面状态: {len(states)} 个")
+
+    def classify_screen(self, screenshot):
+        """判断当前帧属于哪个画面状态（按定义顺序取第一个满足的，每帧只判断一次），都不满足时返回None"""
+        if 'screen_state' not in screenshot.memo:
+            state_name = None
+            for state in self.state_plans:
+                if state.evaluate(self, screenshot):
+                    state_name = state.name
+                    break
+            screenshot.memo['screen_state'] = state_name
+        return screenshot.memo['screen_state']
+
+    def set_global_variable(self, name, value):
+        """设置公共变量，值变化时依赖该变量的任务立即基于最新一帧重新检测"""
+        changed = name not in self.global_variables or self.global_variables[name] != value
+        self.global_variables[name] = value
+        if not changed or not self.monitoring:
+            return
 
-                        # 执行预设动作
-                        self._execute_actions(config['actions'])
-                        config['last_executed'] = current_time
+        configs = self.variable_index.get(name)
+        if configs and self.scheduler.make_due(configs):
+            with self._frame_cond:
+                self._reevaluate = True
+                self._frame_cond.notify_all()
+
+    def _monitor_loop(self):
+        """检测循环 - 始终取最新一帧检测，触发的动作交给执行器"""
+        last_seq = 0
+        while self.monitoring:
+            try:
+                # 处理变量同步
+                self._sync_network_variables()
 
-                time.sleep(self.check_interval)
+                # 等待新的一帧（期间产生的旧帧直接丢弃），变量变化时基于最新一帧立即重新检测
+                with self._frame_cond:
+                    if self._frame_seq == last_seq and not self._reevaluate:
+                        self._frame_cond.wait(0.5)
+                    if self._frame_seq == last_seq and not self._reevaluate:
+                        continue
+                    self._reevaluate = False
+                    if self._latest_frame is None:
+                        continue
+                    screenshot, last_seq = self._latest_frame, self._frame_seq
+
+                # 只检测已到期的任务（按优先级从高到低）
+                started = time.time()
+                hit = False
+                due_configs = self.scheduler.pop_due()
+                if self.eval_workers > 1:
+                    self._prefetch_matches(due_configs, screenshot)
+                for config in due_configs:
+                    fired = False
+                    plan = self.plans.get(id(config))
+                    try:
+                        if plan is not None:
+                            fired = self._evaluate_task(plan, screenshot)
+                            hit = fired or hit
+                    except Exception as e:
+                        import traceback
+                        self.log_message.emit(f"任务检测错误 {config.get('name', '')}: {str(e)}")
+                        print(traceback.format_exc())
+                    finally:
+                        # 任务的动作仍在排队或执行时下一帧重试，动作结束后即可再次触发
+                        busy = not fired and plan is not None and self.executor.is_pending(plan.lane, id(config))
+                        self.scheduler.reschedule(config, retry=busy)
+
+                # 根据触发情况、画面变化和检测耗时调整间隔
+                if self.adaptive.update(screenshot, hit, time.time() - started):
+                    self.scheduler.expedite()
 
             except Exception as e:
                 import traceback
@@ -185,6 +290,104 @@ class AutoMonitor(QObject):
                 print(traceback.format_exc())
                 time.sleep(1)
     
+    def _prefetch_matches(self, configs, screenshot):
+        """
+        用线程池并行匹配到期任务中的图像条件，结果缓存在帧上；
+        变量条件已决定结果的条件组不预先匹配（保留短路求值），
+        随后的条件逻辑和触发仍在检测线程中按优先级顺序执行，触发顺序与串行检测一致
+        """
+        plans = [plan for plan in (self.plans.get(id(config)) for config in configs)
+                 if plan is not None and plan.enabled and not self.executor.is_pending(plan.lane, id(plan.config))]
+
+        # 先识别画面状态，只预先匹配适用于当前画面的任务
+        if any(plan.screen_states for plan in plans):
+            self._run_matches([image for state in self.state_plans
+                               for image in state.prefetch_images(self, screenshot)], screenshot)
+            state_name = self.classify_screen(screenshot)
+            plans = [plan for plan in plans if not plan.screen_states or state_name in plan.screen_states]
+
+        self._run_matches([image for plan in plans for image in plan.prefetch_images(self, screenshot)], screenshot)
+
+    def _run_matches(self, images, screenshot):
+        """并行执行图像匹配（相同检测只匹配一次）"""
+        unique = {}
+        for image in images:
+            key = image.prefetch_key(self, screenshot)
+            if key is not None:
+                unique.setdefault(key, image)
+        if len(unique) < 2:
+            return  # 只有一个检测时直接在检测线程中匹配
+
+        # 线程池只在检测线程中创建和替换
+        if self._eval_pool is None or self._eval_pool_size != self.eval_workers:
+            self._shutdown_eval_pool()
+            self._eval_pool = ThreadPoolExecutor(max_workers=self.eval_workers, thread_name_prefix='ImageMatch')
+            self._eval_pool_size = self.eval_workers
+        list(self._eval_pool.map(lambda image: image.match(self, screenshot), unique.values()))
+
+    def _shutdown_eval_pool(self):
+        """关闭匹配线程池"""
+        if self._eval_pool is not None:
+            self._eval_pool.shutdown(wait=True)
+            self._eval_pool = None
+
+    def _evaluate_task(self, plan, screenshot):
+        """检测单个任务，条件满足时将动作提交给执行器，返回是否触发"""
+        if not plan.enabled:
+            return False
+
+        # 只检测适用于当前画面的任务
+        if plan.screen_states and self.classify_screen(screenshot) not in plan.screen_states:
+            return False
+
+        # 冷却由调度器保证，到期时冷却已经结束
+        current_time = time.time()
+        config = plan.config
+        i = plan.index
+
+        # 动作仍在排队或执行的任务不再检测（通道被其他任务占用时照常检测，触发后排队执行）
+        if self.executor.is_pending(plan.lane, id(config)):
+            return False
+
+        # 先检查统一条件
+        if plan.conditions is not None and not plan.conditions.evaluate(self, screenshot):
+            return False
+
+        if plan.mode == MODE_IF:
+            # IF模式：统一条件通过后再检查每个条件-动作对
+            return self._execute_if_mode(plan, screenshot, current_time, i)
+
+        if plan.mode == MODE_RANDOM:
+            # RANDOM模式：随机执行一个动作序列
+            self.log_message.emit(f"✅ RANDOM模式触发: {plan.name}")
+            self.match_found.emit({
+                'config': config,
+                'index': i,
+                'time': datetime.now().strftime("%H:%M:%S")
+            })
+            self.executor.submit(plan.lane, id(config), self._execute_random_mode, config)
+            config['last_executed'] = current_time
+            return True
+
+        # 传统模式（兼容旧版本）：没有统一条件时使用旧版变量条件和模板
+        for condition in plan.legacy_conditions:
+            if not condition.evaluate(self, screenshot):
+                return False
+        if plan.legacy_image is not None and not plan.legacy_image.evaluate(self, screenshot):
+            return False
+
+        self.log_message.emit(f"✅ 触发成功: {plan.name}")
+        self.match_found.emit({
+            'config': config,
+            'index': i,
+            'time': datetime.now().strftime("%H:%M:%S")
+        })
+
+        # 执行预设动作
+        self.executor.submit(plan.lane, id(config), self._execute_actions, plan.actions)
+        config['last_executed'] = current_time
+        return True
+
     def _sync_network_variables(self):
         """同步网络变量（双向）"""
         # 如果没有配置同步变量，直接返回
@@ -231,40 +434,65 @@ class AutoMonitor(QObject):
     
 
     
-    def _execute_if_mode(self, config, screenshot, current_time, config_index):
-        """执行IF模式"""
-        if_pairs = config.get('if_pairs', [])
-        any_condition_met = False  # 记录是否有任何条件满足
+    def _execute_if_mode(self, plan, screenshot, current_time, config_index):
+        """
+        执行IF模式（所有条件组基于同一帧检测，满足的动作序列按顺序交给执行器），返回是否有条件满足
+        满足的条件组的动作会修改后面条件组读取的变量时，后面的条件组在执行通道中等这些动作执行完再检测
+        """
+        config = plan.config
+        triggered = []  # 满足条件的 (条件序号, 动作序列)
         
-        for pair_index, pair in enumerate(if_pairs):
-            conditions = pair.get('conditions', [])
-            logic = pair.get('logic', 'AND (全部满足)')
-            
-            # 检查这个条件组（不输出详细日志）
-            if self._check_if_conditions(screenshot, conditions, logic, log_details=False):
-                # 条件满足时才输出日志
-                self.log_message.emit(f"✅ IF条件{pair_index + 1}满足: {config['name']}")
-                
-                # 执行对应的动作
-                actions = pair.get('actions', [])
-                if actions:
-                    self.log_message.emit(f"  执行条件{pair_index + 1}的动作序列...")
-                    self._execute_actions(actions)
-                
-                # 触发事件
-                self.match_found.emit({
-                    'config': config,
-                    'index': config_index,
-                    'pair_index': pair_index,
-                    'time': datetime.now().strftime("%H:%M:%S")
-                })
-                
-                any_condition_met = True
+        for position, (pair_index, group, actions) in enumerate(plan.pairs):
+            # 检查这个条件组
+            if group.evaluate(self, screenshot):
+                self._report_if_pair(plan, pair_index, config_index)
+                triggered.append((pair_index, actions))
+                if position in plan.chained_pairs:
+                    # 剩下的条件组要看到这些动作设置的变量
+                    self.executor.submit(plan.lane, id(config), self._run_if_actions, triggered,
+                                         plan, screenshot, position + 1, config_index)
+                    config['last_executed'] = current_time
+                    return True
                 # 继续检查其他条件，不break
         
-        # 只要有任何条件满足，就更新执行时间
-        if any_condition_met:
+        # 只要有任何条件满足，就执行动作并更新执行时间
+        if triggered:
+            self.executor.submit(plan.lane, id(config), self._run_if_actions, triggered)
             config['last_executed'] = current_time
+        return bool(triggered)
+
+    def _report_if_pair(self, plan, pair_index, config_index):
+        """IF条件组满足时输出日志并触发事件"""
+        self.log_message.emit(f"✅ IF条件{pair_index + 1}满足: {plan.name}")
+        self.match_found.emit({
+            'config': plan.config,
+            'index': config_index,
+            'pair_index': pair_index,
+            'time': datetime.now().strftime("%H:%M:%S")
+        })
+    
+    def _run_if_actions(self, triggered, plan=None, screenshot=None, start=0, config_index=-1):
+        """
+        依次执行IF模式中满足条件的动作序列（在执行通道中调用）
+        指定plan时，之后从第start个条件组起逐个检测并立即执行满足的动作（与逐个执行时的变量可见性一致）
+        """
+        for pair_index, actions in triggered:
+            if not self.monitoring:
+                return
+            if actions:
+                self.log_message.emit(f"  执行条件{pair_index + 1}的动作序列...")
+                self._execute_actions(actions)
+        if plan is None:
+            return
+
+        for pair_index, group, actions in plan.pairs[start:]:
+            if not self.monitoring:
+                return
+            if group.evaluate(self, screenshot):
+                self._report_if_pair(plan, pair_index, config_index)
+                if actions:
+                    self.log_message.emit(f"  执行条件{pair_index + 1}的动作序列...")
+                    self._execute_actions(actions)
     
     def _execute_random_mode(self, config):
         """执行RANDOM模式"""
@@ -285,127 +513,24 @@ class AutoMonitor(QObject):
         if actions:
             self._execute_actions(actions)
     
-    def _check_if_conditions(self, screenshot, conditions, logic, log_details=False):
-        """检查IF模式的条件组"""
-        if not conditions:
-            return False
-        
-        # 单条件优化：直接返回结果
-        if len(conditions) == 1:
-            condition = conditions[0]
-            condition_type = condition.get('type')
-            
-            if condition_type == 'variable':
-                # 变量条件
-                var_name = condition.get('variable', '')
-                operator = condition.get('operator', '==')
-                value = condition.get('value', 0)
-                
-                if var_name not in self.global_variables:
-                    return False
-                else:
-                    current_value = self.global_variables[var_name]
-                    
-                    if operator == '==':
-                        return current_value == value
-                    elif operator == '!=':
-                        return current_value != value
-                    elif operator == '>':
-                        return current_value > value
-                    elif operator == '<':
-                        return current_value < value
-                    elif operator == '>=':
-                        return current_value >= value
-                    elif operator == '<=':
-                        return current_value <= value
-                    else:
-                        return False
-                        
-            elif condition_type == 'image':
-                # 图像检测条件
-                region_img = self._get_region_image(screenshot, condition.get('region'))
-                if not region_img:
-                    return False
-                else:
-                    template = condition.get('template')
-                    threshold = condition.get('threshold', 0.85)
-                    
-                    if template:
-                        match_result = self._match_template(region_img, template, threshold)
-                    else:
-                        return False
-                    
-                    expect_exist = condition.get('expect_exist', True)
-                    return match_result if expect_exist else not match_result
-        
-        # 多条件情况
-        results = []
-        
-        for condition in conditions:
-            condition_type = condition.get('type')
-            
-            if condition_type == 'variable':
-                # 变量条件
-                var_name = condition.get('variable', '')
-                operator = condition.get('operator', '==')
-                value = condition.get('value', 0)
-                
-                if var_name not in self.global_variables:
-                    condition_met = False
-                else:
-                    current_value = self.global_variables[var_name]
-                    
-                    if operator == '==':
-                        condition_met = current_value == value
-                    elif operator == '!=':
-                        condition_met = current_value != value
-                    elif operator == '>':
-                        condition_met = current_value > value
-                    elif operator == '<':
-                        condition_met = current_value < value
-                    elif operator == '>=':
-                        condition_met = current_value >= value
-                    elif operator == '<=':
-                        condition_met = current_value <= value
-                    else:
-                        condition_met = False
-                
-                results.append(condition_met)
-                
-            elif condition_type == 'image':
-                # 图像检测条件
-                region_img = self._get_region_image(screenshot, condition.get('region'))
-                if not region_img:
-                    match_result = False
-                else:
-                    template = condition.get('template')
-                    threshold = condition.get('threshold', 0.85)
-                    
-                    if template:
-                        match_result = self._match_template(region_img, template, threshold)
-                    else:
-                        match_result = False
-                
-                expect_exist = condition.get('expect_exist', True)
-                condition_met = match_result if expect_exist else not match_result
-                results.append(condition_met)
-        
-        # 根据逻辑判断
-        if "AND" in logic:
-            return all(results) if results else False
-        else:  # OR
-            return any(results) if results else False
-
-    def _get_region_image(self, screenshot, region):
-        """获取区域图像（处理坐标转换）"""
+    def frame_resolution(self, screenshot):
+        """设备分辨率（每帧只获取一次）"""
+        resolution = screenshot.memo.get('resolution')
+        if resolution is None:
+            resolution = self.frame_source.resolution() or screenshot.size
+            screenshot.memo['resolution'] = resolution
+        return resolution
+
+    def _get_region_rect(self, screenshot, region, resolution=None):
+        """将设备坐标区域转换为帧内像素区域 (x, y, w, h)，区域无效时返回None"""
         if not region:
-            return screenshot
+            return 0, 0, screenshot.width, screenshot.height
 
         try:
             x, y, w, h = region
 
             # 获取设备分辨率
-            device_width, device_height = self.controller.get_device_resolution()
+            device_width, device_height = resolution or self.frame_resolution(screenshot)
             window_width, window_height = screenshot.size
 
             # 判断方向
@@ -433,31 +558,44 @@ class AutoMonitor(QObject):
             h = min(h, screenshot.height - y)
 
             if w > 0 and h > 0:
-                return screenshot.crop((x, y, x + w, y + h))
+                return x, y, w, h
         except Exception as e:
             self.log_message.emit(f"处理区域失败: {str(e)}")
 
         return None
 
-    def _match_template(self, screenshot, template, threshold):
-        """模板匹配"""
+    def _match_score(self, screenshot, rect, compiled, pyramid_levels=0, gray=False, scale=1.0):
+        """
+        计算帧内区域的模板最佳匹配分数
+        结果按(模板, 区域, 方法, 灰度, 缩放, 金字塔)缓存在帧上，
+        多个任务引用相同检测时每帧只匹配一次，阈值由调用方比较；
+        区域画面与上次匹配时相比未变化时复用上次分数
+        """
         try:
-            screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-            template_cv = cv2.cvtColor(np.array(template), cv2.COLOR_RGB2BGR)
-
-            result = cv2.matchTemplate(screenshot_cv, template_cv, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-            return max_val >= threshold
+            key = ('match', compiled.key, rect, cv2.TM_CCOEFF_NORMED, gray, scale, pyramid_levels)
+            score = screenshot.memo.get(key)
+            if score is None:
+                # 区域与上次匹配时相比没有变化则直接复用分数
+                score = self.change_detector.lookup(key, screenshot, rect)
+                if score is None:
+                    region_img = screenshot.region(*rect, gray=gray, scale=scale)
+                    score, _ = match_best(region_img, compiled.get(gray, scale), cv2.TM_CCOEFF_NORMED,
+                                          pyramid_levels, lambda level: compiled.pyramid(level, gray, scale))
+                    self.change_detector.store(key, screenshot, rect, score)
+                screenshot.memo[key] = score
+            return score
         except Exception as e:
             self.log_message.emit(f"匹配错误: {str(e)}")
-            return False
+            return -1.0
 
     def _execute_actions(self, actions):
         """执行动作序列 - 支持录制脚本和随机动作"""
         if not actions:
             return
 
+        # 连续的点击/滑动/输入/按键/等待合并为一个脚本发送，变量、ADB命令和录制脚本之前先发送已收集的命令
+        batch = self.controller.input_batch()
+
         for action in actions:
             # 检查是否需要停止
             if not self.monitoring:
@@ -465,6 +603,8 @@ class AutoMonitor(QObject):
                 
             try:
                 action_type = action.get('type')
+                if batch is not None and action_type in ('set_variable', 'adb_command', 'recording'):
+                    batch.flush()
 
                 if action_type == 'set_variable':
                     # 设置或修改公共变量
@@ -497,7 +637,7 @@ class AutoMonitor(QObject):
                             else:
                                 result = int(source_value)
                             
-                            self.global_variables[var_name] = result
+                            self.set_global_variable(var_name, result)
                             self.log_message.emit(f"  变量计算: {var_name} = {source_var}({source_value}) {calc_op} {calc_value} = {result}")
                         else:
                             self.log_message.emit(f"  错误: 源变量 {source_var} 不存在")
@@ -506,24 +646,24 @@ class AutoMonitor(QObject):
                         var_value = action.get('value', 0)
                         
                         if operation == 'set':
-                            self.global_variables[var_name] = int(var_value)
+                            self.set_global_variable(var_name, int(var_value))
                             self.log_message.emit(f"  设置变量: {var_name} = {var_value}")
                         elif operation == 'add':
                             current = self.global_variables.get(var_name, 0)
-                            self.global_variables[var_name] = int(current + var_value)
+                            self.set_global_variable(var_name, int(current + var_value))
                             self.log_message.emit(f"  变量增加: {var_name} += {var_value} (现在={self.global_variables[var_name]})")
                         elif operation == 'subtract':
                             current = self.global_variables.get(var_name, 0)
-                            self.global_variables[var_name] = int(current - var_value)
+                            self.set_global_variable(var_name, int(current - var_value))
                             self.log_message.emit(f"  变量减少: {var_name} -= {var_value} (现在={self.global_variables[var_name]})")
                         elif operation == 'multiply':
                             current = self.global_variables.get(var_name, 1)
-                            self.global_variables[var_name] = int(current * var_value)
+                            self.set_global_variable(var_name, int(current * var_value))
                             self.log_message.emit(f"  变量乘以: {var_name} *= {var_value} (现在={self.global_variables[var_name]})")
                         elif operation == 'divide':
                             current = self.global_variables.get(var_name, 1)
                             if var_value != 0:
-                                self.global_variables[var_name] = int(current // var_value)
+                                self.set_global_variable(var_name, int(current // var_value))
                                 self.log_message.emit(f"  变量除以: {var_name} /= {var_value} (现在={self.global_variables[var_name]})")
                 
                 elif action_type == 'adb_command':
@@ -537,214 +677,54 @@ class AutoMonitor(QObject):
                             self.log_message.emit(f"  ADB命令失败: {command[:50]}")
 
                 elif action_type == 'click':
-                    self.controller.click(action['x'], action['y'])
+                    self.controller.click(action['x'], action['y'], batch=batch)
                     self.log_message.emit(f"  点击: ({action['x']}, {action['y']})")
 
                 elif action_type == 'swipe':
                     self.controller.swipe(
                         action['x1'], action['y1'],
                         action['x2'], action['y2'],
-                        action.get('duration', 300)
+                        action.get('duration', 300),
+                        batch=batch
                     )
                     self.log_message.emit(
                         f"  滑动: ({action['x1']}, {action['y1']}) → ({action['x2']}, {action['y2']})")
 
                 elif action_type == 'text':
-                    self.controller.input_text(action['text'])
+                    self.controller.input_text(action['text'], batch=batch)
                     self.log_message.emit(f"  输入: {action['text']}")
 
                 elif action_type == 'key':
-                    self.adb.keyevent(action['keycode'])
+                    self.controller.keyevent(action['keycode'], batch=batch)
                     self.log_message.emit(f"  按键: {action.get('key_name', action['keycode'])}")
 
                 elif action_type == 'wait':
                     wait_time = action.get('duration', 1)
-                    time.sleep(wait_time)
+                    if batch is None:
+                        time.sleep(wait_time)
+                    else:
+                        batch.sleep(wait_time)
                     self.log_message.emit(f"  等待: {wait_time}秒")
 
                 elif action_type == 'recording':
                     # 新增：执行录制脚本
                     self._execute_recording(action)
 
-                time.sleep(action.get('delay', 0.1))
+                delay = action.get('delay', 0.1)
+                if batch is None:
+                    time.sleep(delay)
+                else:
+                    batch.sleep(delay)
 
             except Exception as e:
                 self.log_message.emit(f"  执行失败: {str(e)}")
-    
 
+        # 停止前已经执行到的动作照常发送
+        if batch is not None and not batch.flush():
+            self.log_message.emit("  输入命令发送失败")
     
-    def _check_conditions(self, conditions):
-        """检查条件是否满足"""
-        if not conditions:
-            return True
-            
-        for condition in conditions:
-            var_name = condition.get('variable', '')
-            operator = condition.get('operator', '==')
-            value = condition.get('value', 0)
-            
-            if var_name not in self.global_variables:
-                continue
-                
-            current_value = self.global_variables[var_name]
-            
-            if operator == '==' and current_value != value:
-                return False
-            elif operator == '!=' and current_value == value:
-                return False
-            elif operator == '>' and current_value <= value:
-                return False
-            elif operator == '<' and current_value >= value:
-                return False
-            elif operator == '>=' and current_value < value:
-                return False
-            elif operator == '<=' and current_value > value:
-                return False
-                
-        return True
-    
-    def _check_unified_conditions(self, screenshot, unified_conditions, logic, log_details=True):
-        """检查统一条件（支持AND/OR/NOT）"""
-        if not unified_conditions:
-            return True
-        
-        # 单条件优化：直接返回结果，不进行逻辑判断
-        if len(unified_conditions) == 1:
-            condition = unified_conditions[0]
-            condition_type = condition.get('type')
-            
-            if condition_type == 'variable':
-                # 变量条件
-                var_name = condition.get('variable', '')
-                operator = condition.get('operator', '==')
-                value = condition.get('value', 0)
-                
-                if var_name not in self.global_variables:
-                    return False
-                else:
-                    current_value = self.global_variables[var_name]
-                    
-                    if operator == '==':
-                        condition_met = current_value == value
-                    elif operator == '!=':
-                        condition_met = current_value != value
-                    elif operator == '>':
-                        condition_met = current_value > value
-                    elif operator == '<':
-                        condition_met = current_value < value
-                    elif operator == '>=':
-                        condition_met = current_value >= value
-                    elif operator == '<=':
-                        condition_met = current_value <= value
-                    else:
-                        condition_met = False
-                    
-                    # 只在满足时输出日志
-                    if condition_met and log_details:
-                        self.log_message.emit(f"  [变量] {var_name} {operator} {value} → 满足")
-                    
-                    return condition_met
-                    
-            elif condition_type == 'image':
-                # 图像检测条件
-                region_img = self._get_region_image(screenshot, condition.get('region'))
-                if not region_img:
-                    return False
-                else:
-                    template = condition.get('template')
-                    threshold = condition.get('threshold', 0.85)
-                    
-                    if template:
-                        match_result = self._match_template(region_img, template, threshold)
-                    else:
-                        return False
-                    
-                    expect_exist = condition.get('expect_exist', True)
-                    condition_met = match_result if expect_exist else not match_result
-                    
-                    # 只在满足时输出日志
-                    if condition_met and log_details:
-                        exist_text = "检测到" if match_result else "未检测到"
-                        self.log_message.emit(f"  [图像] {exist_text} → 满足")
-                    
-                    return condition_met
-        
-        # 多条件情况：需要进行逻辑判断
-        results = []
-        
-        for i, condition in enumerate(unified_conditions):
-            condition_type = condition.get('type')
-            
-            if condition_type == 'variable':
-                # 变量条件
-                var_name = condition.get('variable', '')
-                operator = condition.get('operator', '==')
-                value = condition.get('value', 0)
-                
-                if var_name not in self.global_variables:
-                    condition_met = False
-                else:
-                    current_value = self.global_variables[var_name]
-                    
-                    if operator == '==':
-                        condition_met = current_value == value
-                    elif operator == '!=':
-                        condition_met = current_value != value
-                    elif operator == '>':
-                        condition_met = current_value > value
-                    elif operator == '<':
-                        condition_met = current_value < value
-                    elif operator == '>=':
-                        condition_met = current_value >= value
-                    elif operator == '<=':
-                        condition_met = current_value <= value
-                    else:
-                        condition_met = False
-                
-                results.append(condition_met)
-                
-            elif condition_type == 'image':
-                # 图像检测条件
-                region_img = self._get_region_image(screenshot, condition.get('region'))
-                if not region_img:
-                    match_result = False
-                else:
-                    template = condition.get('template')
-                    threshold = condition.get('threshold', 0.85)
-                    
-                    if template:
-                        match_result = self._match_template(region_img, template, threshold)
-                    else:
-                        match_result = False
-                
-                expect_exist = condition.get('expect_exist', True)
-                condition_met = match_result if expect_exist else not match_result
-                
-                results.append(condition_met)
-        
-        # 根据逻辑判断最终结果
-        if "AND" in logic:
-            # AND模式：全部满足
-            final_result = all(results) if results else False
-            if final_result and log_details:
-                self.log_message.emit(f"  AND逻辑: {len(results)}/{len(results)} 满足 → 通过")
-        elif "OR" in logic:
-            # OR模式：任一满足
-            final_result = any(results) if results else False
-            if final_result and log_details:
-                satisfied = len([r for r in results if r])
-                self.log_message.emit(f"  OR逻辑: {satisfied}/{len(results)} 满足 → 通过")
-        elif "NOT" in logic:
-            # NOT模式：全部不满足
-            final_result = not any(results) if results else True
-            if final_result and log_details:
-                not_satisfied = len([r for r in results if not r])
-                self.log_message.emit(f"  NOT逻辑: {not_satisfied}/{len(results)} 不满足 → 通过")
-        else:
-            final_result = False
-        
-        return final_result
 
+    
     def _execute_recording(self, action):
         """执行录制脚本文件"""
         recording_file = action.get('recording_file', '')
@@ -829,9 +809,29 @@ class AutoMonitor(QObject):
                 config_copy.pop('last_executed', None)
                 configs_to_save.append(config_copy)
 
+            # 处理画面状态中的图片
+            states_to_save = []
+            for state in self.screen_states:
+                state_copy = state.copy()
+                conditions_copy = []
+                for condition in state.get('conditions', []):
+                    cond_copy = condition.copy()
+                    if condition.get('type') == 'image' and 'template' in condition:
+                        template = condition.get('template')
+                        if template is not None:
+                            buffered = BytesIO()
+                            template.save(buffered, format="PNG")
+                            cond_copy['template'] = base64.b64encode(buffered.getvalue()).decode('utf-8')
+                        else:
+                            cond_copy['template'] = None
+                    conditions_copy.append(cond_copy)
+                state_copy['conditions'] = conditions_copy
+                states_to_save.append(state_copy)
+
             scheme = {
                 'version': '1.0',
                 'check_interval': self.check_interval,
+                'screen_states': states_to_save,
                 'configs': configs_to_save
             }
 
@@ -851,7 +851,11 @@ class AutoMonitor(QObject):
                 scheme = json.load(f)
 
             self.monitor_configs.clear()
+            self.plans.clear()
+            self.variable_index.clear()
+            self.templates.clear()
             self.check_interval = scheme.get('check_interval', 0.5)
+            self.scheduler.default_interval = self.check_interval
 
             for config in scheme.get('configs', []):
                 # 将base64转换回图片（如果存在）
@@ -888,8 +892,24 @@ class AutoMonitor(QObject):
                                         condition['template'] = None
                 
                 config['last_executed'] = 0
+                self._compile_plan(config)
                 self.monitor_configs.append(config)
 
+            # 处理画面状态中的图片
+            states = scheme.get('screen_states', [])
+            for state in states:
+                for condition in state.get('conditions', []):
+                    if condition.get('type') == 'image' and 'template' in condition:
+                        template_data = condition.get('template')
+                        if template_data is not None and template_data != '':
+                            condition['template'] = Image.open(BytesIO(base64.b64decode(template_data)))
+                        else:
+                            condition['template'] = None
+            self.set_screen_states(states)
+
+            self._index_plans()
+            self._prune_lanes()
+            self.scheduler.rebuild(self.monitor_configs)
             self.log_message.emit(f"方案已加载: {filename}")
             return True
         except Exception as e:
@@ -901,8 +921,15 @@ class AutoMonitor(QObject):
         if 0 <= index < len(self.monitor_configs):
             # 保留原有的last_executed时间
             last_executed = self.monitor_configs[index].get('last_executed', 0)
+            old_config = self.monitor_configs[index]
+            self.templates.release_config(old_config, keep=config)
+            self.plans.pop(id(old_config), None)
+            self._compile_plan(config)
             self.monitor_configs[index] = config
             self.monitor_configs[index]['last_executed'] = last_executed
+            self._index_plans()
+            self._prune_lanes()
+            self.scheduler.rebuild(self.monitor_configs)
             self.log_message.emit(f"更新监控任务: {config.get('name', 'Unknown')}")
             return True
         return False
@@ -911,7 +938,13 @@ class AutoMonitor(QObject):
         """移除监控配置"""
         if 0 <= index < len(self.monitor_configs):
             name = self.monitor_configs[index]['name']
+            self.templates.release_config(self.monitor_configs[index])
+            self.plans.pop(id(self.monitor_configs[index]), None)
+            self._index_variables()
             del self.monitor_configs[index]
+            self._index_plans()
+            self._prune_lanes()
+            self.scheduler.rebuild(self.monitor_configs)
             self.log_message.emit(f"移除监控任务: {name}")
             return True
         return False
@@ -919,6 +952,11 @@ class AutoMonitor(QObject):
     def clear_monitor_configs(self):
         """清空所有监控配置"""
         self.monitor_configs.clear()
+        self.plans.clear()
+        self.variable_index.clear()
+        self.templates.clear()
+        self._prune_lanes()
+        self.scheduler.rebuild(self.monitor_configs)
         self.log_message.emit("已清空所有监控任务")
 
     def get_monitor_config(self, index):
@@ -927,10 +965,45 @@ class AutoMonitor(QObject):
             return self.monitor_configs[index].copy()
         return None
 
+    @property
+    def frames_captured(self):
+        """本次监控已截取的帧数"""
+        return self._frame_seq
+
+    def set_frame_source(self, source):
+        """更换截图来源（None表示恢复为控制器截图）"""
+        self.frame_source = source if source is not None else ControllerFrameSource(self.controller)
+
     def set_check_interval(self, interval):
         """设置检查间隔（秒）"""
         self.check_interval = max(0.05, min(interval, 10))  # 最小值改为0.05秒
+        self.scheduler.default_interval = self.check_interval
         if self.check_interval < 0.1:
             self.log_message.emit(f"⚠️ 检查间隔设置为: {self.check_interval}秒 (过快可能影响性能)")
         else:
-            self.log_message.emit(f"检查间隔设置为: {self.check_interval}秒")
\ No newline at end of file
+            self.log_message.emit(f"检查间隔设置为: {self.check_interval}秒")
+
+    def set_change_detection(self, enabled, tolerance=4.0, refresh_ticks=10):
+        """设置区域变化检测（区域未变化时跳过匹配，每refresh_ticks次强制刷新）"""
+        self.change_detector.configure(enabled, tolerance, refresh_ticks)
+
+    def set_adaptive_interval(self, enabled, max_factor=8.0):
+        """设置自适应检测间隔（空闲时最多放慢到max_factor倍，触发或画面变化时恢复）"""
+        self.adaptive.configure(enabled, max_factor)
+
+    def set_eval_workers(self, workers):
+        """设置并行匹配线程数（0或1表示不使用线程池）"""
+        self.eval_workers = max(0, int(workers))  # 检测线程在下一帧按新的数量重建线程池
+
+    def apply_performance_settings(self, performance):
+        """应用设置中的性能选项（settings.json 的 performance 部分）"""
+        self.set_change_detection(
+            performance.get("change_detection", False),
+            performance.get("change_tolerance", 4.0),
+            performance.get("change_refresh_ticks", 10))
+        self.set_adaptive_interval(
+            performance.get("adaptive_interval", False),
+            performance.get("adaptive_max_factor", 8.0))
+        self.set_eval_workers(performance.get("eval_workers", 0))
+        self.controller.batch_input = performance.get("batch_input", True)
+        self.adb.set_touch_backend(performance.get("touch_backend", "input"))
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""区域变化检测 - 监控区域画面未变化时复用上次的匹配结果"""
+
+import threading
+import numpy as np
+import cv2
+
+
+# 区域签名的网格尺寸（每个格子取区域内对应块的平均颜色）
+SIGNATURE_GRID = 32
+
+
+class RegionChangeDetector:
+    """区域变化检测器
+
+    为每个匹配检测记录上次的分数和区域签名（缩小到网格的平均颜色）。
+    签名中任一格子的变化都不超过容差时认为区域未变化，直接复用上次分数；
+    连续复用 refresh_ticks 次后强制重新匹配一次。
+
+    复用是有损的：大区域中很小的目标（如全屏区域中10x10像素的提示）出现时，
+    所在格子的平均颜色变化可能低于容差，最多要等 refresh_ticks 次检测才能发现，
+    因此默认关闭，由用户在设置中开启。
+    """
+
+    def __init__(self, enabled=False, tolerance=4.0, refresh_ticks=10):
+        self.enabled = enabled
+        self.tolerance = tolerance  # 格子平均颜色允许的最大变化（0-255）
+        self.refresh_ticks = refresh_ticks  # 连续复用多少次后强制刷新
+        self._lock = threading.Lock()
+        self._history = {}  # {匹配键: [分数, 签名, 已复用次数]}
+        self.reused = 0  # 统计：复用次数
+        self.matched = 0  # 统计：实际匹配次数
+
+    def configure(self, enabled=None, tolerance=None, refresh_ticks=None):
+        """修改配置（None表示保持不变）"""
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if tolerance is not None:
+            self.tolerance = max(0.0, float(tolerance))
+        if refresh_ticks is not None:
+            self.refresh_ticks = max(0, int(refresh_ticks))
+        self.reset()
+
+    @staticmethod
+    def signature(frame, rect):
+        """计算帧内区域的签名（同一帧内相同区域只计算一次）"""
+        key = ('signature', rect)
+        signature = frame.memo.get(key)
+        if signature is None:
+            x, y, w, h = rect
+            size = (min(w, SIGNATURE_GRID), min(h, SIGNATURE_GRID))
+            small = cv2.resize(frame.bgr[y:y + h, x:x + w], size, interpolation=cv2.INTER_AREA)
+            signature = small.astype(np.int16)
+            frame.memo[key] = signature
+        return signature
+
+    def lookup(self, key, frame, rect):
+        """区域未变化时返回上次的分数，否则返回None（需要重新匹配）"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._history.get(key)
+            if entry is None or entry[2] >= self.refresh_ticks:
+                return None
+
+            score, previous, _ = entry
+            current = self.signature(frame, rect)
+            if previous.shape != current.shape:
+                return None
+            if np.abs(current - previous).max() > self.tolerance:
+                return None
+
+            entry[2] += 1
+            self.reused += 1
+            return score
+
+    def store(self, key, frame, rect, score):
+        """记录一次实际匹配的结果"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._history[key] = [score, self.signature(frame, rect), 0]
+            self.matched += 1
+
+    def reset(self):
+        """清空历史记录（开始监控或方案变化时调用）"""
+        with self._lock:
+            self._history.clear()
+            self.reused = 0
+            self.matched = 0
@@ -6,7 +6,6 @@ import os
 import json
 from PyQt6.QtCore import QObject, pyqtSignal
 # from core.windows_hook_monitor import WindowsHookMonitor
-from core.simple_mouse_monitor import SimpleMouseMonitor  # 使用新的简化监控器
 from core.device_event_monitor import DeviceEventMonitor  # 添加设备事件监控器
 
 
@@ -19,7 +18,12 @@ class DeviceController(QObject):
         self.adb = adb_manager
         self.scrcpy = scrcpy_manager
         # self.monitor = WindowsHookMonitor()
-        self.monitor = SimpleMouseMonitor()  # 使用简化监控器
+        try:
+            # 窗口录制依赖pywin32，无界面/非Windows环境下不可用
+            from core.simple_mouse_monitor import SimpleMouseMonitor  # 使用简化监控器
+            self.monitor = SimpleMouseMonitor()
+        except ImportError:
+            self.monitor = None
         self.device_monitor = DeviceEventMonitor(adb_manager)  # 设备事件监控器
         self.recording = False
         self.recorded_actions = []
@@ -28,6 +32,10 @@ class DeviceController(QObject):
         self.simulator_hwnd = None
         self.simulator_crop_rect = None
         self.target_resolution = None
+        # 是否从Scrcpy窗口截图（多设备/无界面运行时同时存在多个Scrcpy窗口，需直接使用ADB截图）
+        self.window_capture_enabled = True
+        # 是否合并连续的输入命令一次发送（见 ADBManager.input_batch）
+        self.batch_input = True
 
         
         # 分辨率缓存
@@ -41,7 +49,8 @@ class DeviceController(QObject):
         self.playing = False  # 添加播放状态标志
         self.stop_playing_flag = False  # 添加停止播放标志
         # 连接监控器信号
-        self.monitor.action_captured.connect(self.on_action_captured)
+        if self.monitor:
+            self.monitor.action_captured.connect(self.on_action_captured)
         self.device_monitor.action_captured.connect(self.on_action_captured)
     
     def set_simulator_config(self, hwnd, crop_rect=None, target_resolution=None):
@@ -148,32 +157,30 @@ class DeviceController(QObject):
 
         # 3. 尝试通过ADB获取
         try:
-            # 获取物理分辨率
-            result = self.adb.shell("wm size")
-            if result:
-                if "Physical size:" in result:
-                    size_str = result.split("Physical size:")[1].strip()
-                    width, height = map(int, size_str.split('x'))
+            # 获取物理分辨率（设备跟踪可用时使用缓存）
+            size = self.adb.get_physical_size()
+            if size:
+                width, height = size
 
-                    # 同时获取屏幕方向（仅在录制时打印）
-                    if self.recording:
-                        rotation_result = self.adb.shell("dumpsys input | grep SurfaceOrientation")
-                        orientation = "portrait"
+                # 同时获取屏幕方向（仅在录制时打印）
+                if self.recording:
+                    rotation_result = self.adb.shell("dumpsys input | grep SurfaceOrientation")
+                    orientation = "portrait"
 
-                        if rotation_result:
-                            if "SurfaceOrientation: 1" in rotation_result or "SurfaceOrientation: 3" in rotation_result:
-                                orientation = "landscape"
-                                print(f"[Controller] 检测到横屏模式")
-                            else:
-                                print(f"[Controller] 检测到竖屏模式")
+                    if rotation_result:
+                        if "SurfaceOrientation: 1" in rotation_result or "SurfaceOrientation: 3" in rotation_result:
+                            orientation = "landscape"
+                            print(f"[Controller] 检测到横屏模式")
+                        else:
+                            print(f"[Controller] 检测到竖屏模式")
 
-                        print(f"[Controller] 获取设备分辨率: {width}x{height} ({orientation})")
+                    print(f"[Controller] 获取设备分辨率: {width}x{height} ({orientation})")
 
-                    # 更新缓存
-                    self._cached_resolution = (width, height)
-                    self._resolution_cache_time = current_time
+                # 更新缓存
+                self._cached_resolution = (width, height)
+                self._resolution_cache_time = current_time
 
-                    return width, height
+                return width, height
 
         except Exception as e:
             if self.recording:  # 仅在录制时打印错误
@@ -198,13 +205,34 @@ class DeviceController(QObject):
             return delay * random_factor
         return delay
 
-    def click(self, x, y, use_random=True):
-        """点击指定坐标（带随机偏移）"""
+    def _input_device(self, batch=None):
+        """执行输入的对象：批处理 > scrcpy控制通道（已连接时）> ADB"""
+        if batch is not None:
+            return batch
+        control = self.scrcpy.control_client if self.scrcpy is not None else None
+        if control is not None and control.connected:
+            return control
+        return self.adb
+
+    def _inject(self, method, *args, batch=None):
+        """执行输入命令，scrcpy控制通道发送失败时改用ADB"""
+        device = self._input_device(batch)
+        if getattr(device, method)(*args) is False and batch is None and device is not self.adb:
+            getattr(self.adb, method)(*args)
+
+    def input_batch(self):
+        """合并输入命令的批处理（见 ADBManager.input_batch）；未开启或使用scrcpy控制通道时返回None"""
+        if not self.batch_input or self._input_device() is not self.adb:
+            return None
+        return self.adb.input_batch()
+
+    def click(self, x, y, use_random=True, batch=None):
+        """点击指定坐标（带随机偏移，指定batch时加入批处理）"""
         if use_random and self.enable_randomization:
             x = self.add_random_offset(x, self.position_random_range)
             y = self.add_random_offset(y, self.position_random_range)
 
-        self.adb.tap(x, y)
+        self._inject('tap', x, y, batch=batch)
 
         if self.recording:
             self.recorded_actions.append({
@@ -214,14 +242,14 @@ class DeviceController(QObject):
                 'time': time.time()
             })
 
-    def long_click(self, x, y, duration=1000, use_random=True):
+    def long_click(self, x, y, duration=1000, use_random=True, batch=None):
         """长按（带随机化）"""
         if use_random and self.enable_randomization:
             x = self.add_random_offset(x, self.position_random_range)
             y = self.add_random_offset(y, self.position_random_range)
             duration = self.add_random_offset(duration, self.long_press_random_range)
 
-        self.adb.swipe(x, y, x, y, duration)
+        self._inject('swipe', x, y, x, y, duration, batch=batch)
 
         if self.recording:
             self.recorded_actions.append({
@@ -232,7 +260,7 @@ class DeviceController(QObject):
                 'time': time.time()
             })
 
-    def swipe(self, x1, y1, x2, y2, duration=300, use_random=True):
+    def swipe(self, x1, y1, x2, y2, duration=300, use_random=True, batch=None):
         """滑动（带随机化）"""
         if use_random and self.enable_randomization:
             x1 = self.add_random_offset(x1, self.position_random_range)
@@ -241,7 +269,7 @@ class DeviceController(QObject):
             y2 = self.add_random_offset(y2, self.position_random_range)
             duration = self.add_random_offset(duration, 0.1)  # 10%的持续时间随机
 
-        self.adb.swipe(x1, y1, x2, y2, duration)
+        self._inject('swipe', x1, y1, x2, y2, duration, batch=batch)
 
         if self.recording:
             self.recorded_actions.append({
@@ -252,9 +280,9 @@ class DeviceController(QObject):
                 'time': time.time()
             })
 
-    def input_text(self, text):
+    def input_text(self, text, batch=None):
         """输入文本"""
-        self.adb.text(text)
+        self._inject('text', text, batch=batch)
 
         if self.recording:
             self.recorded_actions.append({
@@ -263,9 +291,13 @@ class DeviceController(QObject):
                 'time': time.time()
             })
 
+    def keyevent(self, keycode, batch=None):
+        """发送按键事件"""
+        self._inject('keyevent', keycode, batch=batch)
+
     def press_back(self):
         """返回键"""
-        self.adb.keyevent(4)
+        self.keyevent(4)
         if self.recording:
             self.recorded_actions.append({
                 'type': 'key',
@@ -276,7 +308,7 @@ class DeviceController(QObject):
 
     def press_home(self):
         """主页键"""
-        self.adb.keyevent(3)
+        self.keyevent(3)
         if self.recording:
             self.recorded_actions.append({
                 'type': 'key',
@@ -287,7 +319,7 @@ class DeviceController(QObject):
 
     def press_recent(self):
         """最近任务键"""
-        self.adb.keyevent(187)
+        self.keyevent(187)
         if self.recording:
             self.recorded_actions.append({
                 'type': 'key',
@@ -299,7 +331,8 @@ class DeviceController(QObject):
     def screenshot(self):
         """截图 - 支持模拟器窗口和Scrcpy窗口"""
         try:
-            from core.window_capture import WindowCapture
+            if self.simulator_hwnd or self.window_capture_enabled:
+                from core.window_capture import WindowCapture
             
             # 1. 模拟器模式：截图指定窗口并裁剪
             if self.simulator_hwnd:
@@ -307,14 +340,16 @@ class DeviceController(QObject):
                 return WindowCapture.capture_window_by_hwnd(self.simulator_hwnd, self.simulator_crop_rect)
 
             # 2. 尝试从Scrcpy窗口截图
-            screenshot = WindowCapture.capture_window_safe("scrcpy", client_only=True)
+            if self.window_capture_enabled:
+                screenshot = WindowCapture.capture_window_safe("scrcpy", client_only=True)
 
-            if screenshot:
-                # print(f"[Controller] Scrcpy窗口截图成功: {screenshot.size}, 模式: {screenshot.mode}")
-                return screenshot
+                if screenshot:
+                    # print(f"[Controller] Scrcpy窗口截图成功: {screenshot.size}, 模式: {screenshot.mode}")
+                    return screenshot
+
+                # 3. 如果窗口截图失败，才使用ADB截图
+                print("[Controller] Scrcpy窗口截图失败，尝试ADB截图...")
 
-            # 3. 如果窗口截图失败，才使用ADB截图
-            print("[Controller] Scrcpy窗口截图失败，尝试ADB截图...")
             png_data = self.adb.screenshot()
             if png_data:
                 img = Image.open(io.BytesIO(png_data))
@@ -349,6 +384,11 @@ class DeviceController(QObject):
                 
             print(f"[Controller] 设备录制开始，分辨率: {width}x{height}")
         else:
+            if not self.monitor:
+                self.recording = False
+                print("[Controller] 当前环境不支持窗口录制")
+                return False
+
             # 使用窗口监控
             # 设置到监控器（监控器会自动根据窗口判断方向）
             self.monitor.set_device_resolution(width, height)
@@ -375,7 +415,7 @@ class DeviceController(QObject):
         
         if self.recording_mode == 'device':
             self.device_monitor.stop_monitoring()
-        else:
+        elif self.monitor:
             self.monitor.stop_monitoring()
             
         print(f"[Controller] 录制停止，共记录 {len(self.recorded_actions)} 个操作")
@@ -396,7 +436,7 @@ class DeviceController(QObject):
 
         try:
             # 检查设备连接
-            if not self.adb.shell("echo test"):
+            if not self.adb.is_device_online():
                 if not self.adb.connect_device(self.adb.device_serial):
                     return False
 
@@ -407,6 +447,13 @@ class DeviceController(QObject):
             # 获取第一个动作的开始时间作为基准
             base_time_ms = actions[0].get('start_time_ms', 0)
 
+            # 间隔较短的连续动作合并为脚本在设备端执行（每个脚本最多约 max_wait 秒，发送之间检查停止标志）：
+            # 脚本中的等待按录制时间扣除之前命令的预计执行时间（含实测的命令启动耗时），
+            # 每个脚本的第一个动作和长间隔之后的动作按本地时间重新对齐，误差不会跨脚本累积
+            batch = self.input_batch()
+            if batch is not None:
+                print(f"  合并输入命令: 间隔不超过 {batch.max_wait} 秒的动作一次发送")
+
             # 记录播放开始的实际时间
             play_start_time = time.perf_counter()
 
@@ -422,6 +469,16 @@ class DeviceController(QObject):
                 # 计算应该执行的时间点
                 target_time = relative_start_ms / 1000.0 / speed
 
+                if batch is not None and batch.pending:
+                    # 当前脚本执行到此处的预计时间点（滑动/长按在设备端执行期间不需要额外等待）
+                    script_time = batch.started - play_start_time + batch.expected_duration
+                    delay = target_time - script_time
+                    if delay <= batch.max_wait:
+                        batch.sleep(delay)
+                        self._execute_action(action, i, len(actions), use_random, speed, batch)
+                        continue
+                    batch.flush()
+
                 # 计算实际需要等待的时间
                 elapsed_time = time.perf_counter() - play_start_time
                 wait_time = target_time - elapsed_time
@@ -434,7 +491,10 @@ class DeviceController(QObject):
                     print(f"  ⚠️ 延迟 {-wait_time:.3f} 秒")
 
                 # 执行动作
-                self._execute_action(action, i, len(actions), use_random, speed)
+                self._execute_action(action, i, len(actions), use_random, speed, batch)
+
+            if batch is not None and not self.stop_playing_flag:
+                batch.flush()
 
             return not self.stop_playing_flag
 
@@ -443,8 +503,8 @@ class DeviceController(QObject):
             self.stop_playing_flag = False
             print("[Controller] 播放完成")
 
-    def _execute_action(self, action, index, total, use_random, speed):
-        """执行单个动作"""
+    def _execute_action(self, action, index, total, use_random, speed, batch=None):
+        """执行单个动作（指定batch时加入批处理）"""
         print(f"  执行操作 {index + 1}/{total}: {action['type']}")
 
         try:
@@ -456,7 +516,7 @@ class DeviceController(QObject):
                     x = self.add_random_offset(x, self.position_random_range)
                     y = self.add_random_offset(y, self.position_random_range)
                 print(f"    点击: ({x}, {y})")
-                self.adb.tap(x, y)
+                self._inject('tap', x, y, batch=batch)
 
             elif action_type == 'long_click':
                 x, y = action['x'], action['y']
@@ -470,7 +530,7 @@ class DeviceController(QObject):
                 # 根据播放速度调整持续时间
                 actual_duration = max(50, int(duration / speed))
                 print(f"    长按: ({x}, {y}) 持续 {actual_duration}ms")
-                self.adb.swipe(x, y, x, y, actual_duration)
+                self._inject('swipe', x, y, x, y, actual_duration, batch=batch)
 
             elif action_type == 'swipe':
                 x1, y1 = action['x1'], action['y1']
@@ -490,30 +550,32 @@ class DeviceController(QObject):
                 # 如果有轨迹数据，使用轨迹播放
                 if trajectory and len(trajectory) > 2:
                     print(f"    滑动（带轨迹）: {len(trajectory)}个轨迹点, 持续 {actual_duration}ms")
-                    self._play_swipe_with_trajectory(trajectory, actual_duration, use_random)
+                    self._play_swipe_with_trajectory(trajectory, actual_duration, use_random, batch)
                 else:
                     # 兼容旧版本：简单的直线滑动
                     print(f"    滑动（直线）: ({x1}, {y1}) -> ({x2}, {y2}) 持续 {actual_duration}ms")
-                    self.adb.swipe(x1, y1, x2, y2, actual_duration)
+                    self._inject('swipe', x1, y1, x2, y2, actual_duration, batch=batch)
 
             elif action_type == 'text':
                 print(f"    输入文本: {action['text']}")
-                self.adb.text(action['text'])
+                self._inject('text', action['text'], batch=batch)
 
             elif action_type == 'key':
                 print(f"    按键: {action.get('key_name', action['keycode'])}")
-                self.adb.keyevent(action['keycode'])
+                self.keyevent(action['keycode'], batch=batch)
 
         except Exception as e:
             print(f"    ❌ 执行失败: {e}")
-    def _play_swipe_with_trajectory(self, trajectory, duration_ms, use_random):
+    def _play_swipe_with_trajectory(self, trajectory, duration_ms, use_random, batch=None):
         """使用轨迹数据播放滑动
         
         Args:
             trajectory: [(x, y, time_ms), ...] 轨迹点列表
             duration_ms: 播放持续时间（毫秒）
             use_random: 是否添加随机偏移
+            batch: 加入的批处理（InputBatch），None表示直接执行
         """
+        device = self._input_device(batch)
         if len(trajectory) < 2:
             # 退化为简单滑动
             x1, y1 = trajectory[0][0], trajectory[0][1]
@@ -523,13 +585,18 @@ class DeviceController(QObject):
                 y1 = self.add_random_offset(y1, self.position_random_range)
                 x2 = self.add_random_offset(x2, self.position_random_range)
                 y2 = self.add_random_offset(y2, self.position_random_range)
-            self.adb.swipe(x1, y1, x2, y2, duration_ms)
+            self._inject('swipe', x1, y1, x2, y2, duration_ms, batch=batch)
             return
         
+        # scrcpy 控制通道或 sendevent 注入时整条轨迹作为一次连续手势，不在分段之间抬起手指
+        if device.swipe_path(self._path_points(trajectory, duration_ms, use_random)):
+            return
+        device = self._input_device(batch)  # 控制通道发送失败时已断开，改用ADB
+        
         # 对于复杂轨迹，使用贝塞尔曲线近似
         if len(trajectory) > 3:
             print(f"      使用贝塞尔曲线播放轨迹: {len(trajectory)}个控制点")
-            self._play_bezier_swipe(trajectory, duration_ms, use_random)
+            self._play_bezier_swipe(trajectory, duration_ms, use_random, batch)
             return
         
         # 简单轨迹：分段执行
@@ -555,7 +622,7 @@ class DeviceController(QObject):
                     x2 = self.add_random_offset(x2, self.position_random_range * 0.3)
                     y2 = self.add_random_offset(y2, self.position_random_range * 0.3)
                 
-                self.adb.swipe(x1, y1, x2, y2, max(10, avg_segment_duration))
+                device.swipe(x1, y1, x2, y2, max(10, avg_segment_duration))
             return
         
         # 记录开始时间
@@ -579,18 +646,19 @@ class DeviceController(QObject):
             segment_duration = max(10, segment_duration)
             
             # 执行该段滑动
-            self.adb.swipe(x1, y1, x2, y2, segment_duration)
+            device.swipe(x1, y1, x2, y2, segment_duration)
             
             # 为了连贯性，减少段间延迟
             if i < total_segments - 1:
                 # 短暂延迟，避免命令堆积
                 time.sleep(0.005)  # 5ms延迟
     
-    def _play_bezier_swipe(self, trajectory, duration_ms, use_random):
+    def _play_bezier_swipe(self, trajectory, duration_ms, use_random, batch=None):
         """使用贝塞尔曲线播放复杂轨迹
         
         将多个轨迹点转换为贝塞尔控制点，生成平滑曲线
         """
+        device = self._input_device(batch)
         import time
         
         # 提取关键控制点（简化轨迹）
@@ -617,12 +685,28 @@ class DeviceController(QObject):
                 x2 = self.add_random_offset(x2, self.position_random_range * 0.2)
                 y2 = self.add_random_offset(y2, self.position_random_range * 0.2)
             
-            self.adb.swipe(x1, y1, x2, y2, segment_duration)
+            device.swipe(x1, y1, x2, y2, segment_duration)
             
             # 极短延迟保证流畅性
             if i < len(bezier_points) - 2:
                 time.sleep(0.002)  # 2ms延迟
     
+    def _path_points(self, trajectory, duration_ms, use_random):
+        """轨迹点的时间按播放持续时间缩放（相对第一个点），可加随机偏移"""
+        start = trajectory[0][2]
+        time_span = trajectory[-1][2] - start
+        points = []
+        for i, (x, y, t) in enumerate(trajectory):
+            if time_span > 0:
+                t = (t - start) * duration_ms / time_span
+            else:
+                t = i * duration_ms / (len(trajectory) - 1)
+            if use_random and self.enable_randomization:
+                x = self.add_random_offset(x, self.position_random_range * 0.3)
+                y = self.add_random_offset(y, self.position_random_range * 0.3)
+            points.append((x, y, t))
+        return points
+
     def _calculate_bezier_points(self, control_points, num_points):
         """计算贝塞尔曲线上的点
         
@@ -672,7 +756,7 @@ class DeviceController(QObject):
             f"[Controller] 随机化设置: 启用={enabled}, 位置={position_range * 100}%, 延迟={delay_range * 100}%, 长按={long_press_range * 100}%")
 
         # 同步到监控器
-        if hasattr(self, 'monitor'):
+        if getattr(self, 'monitor', None):
             self.monitor.set_randomization(enabled, position_range)
         if hasattr(self, 'device_monitor'):
             # 设备监控器不需要随机化（录制时）
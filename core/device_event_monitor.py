@@ -177,10 +177,10 @@ class DeviceEventMonitor(QObject):
             return False
             
         # 测试设备连接
-        test_result = self.adb.shell("echo test")
-        self._debug_log(f"设备连接测试结果: {test_result}")
+        online = self.adb.is_device_online()
+        self._debug_log(f"设备连接测试结果: {online}")
         
-        if not test_result or "test" not in str(test_result):
+        if not online:
             self.error_occurred.emit("设备未正确连接")
             return False
             
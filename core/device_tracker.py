@@ -0,0 +1,153 @@
+"""设备跟踪 - 订阅ADB服务的设备变化，维护设备列表和设备属性缓存
+
+后台线程通过 host:track-devices 接收设备上线/下线（服务在每次变化时推送完整列表），
+设备上线时用一条shell命令读取品牌、型号、Android版本、分辨率和密度并缓存。
+刷新设备列表和检查设备是否在线都只查内存；ADB服务不可用时 available 为False，调用方使用原来的命令方式。
+"""
+
+import re
+import threading
+import time
+from core.adb_transport import AdbTransportError, adb_transport
+
+# 设备上线时读取属性的命令（一次shell调用）
+INFO_COMMAND = ('echo "brand=$(getprop ro.product.brand)"; '
+                'echo "model=$(getprop ro.product.model)"; '
+                'echo "android=$(getprop ro.build.version.release)"; '
+                'wm size; wm density')
+
+
+def parse_device_info(output):
+    """解析 INFO_COMMAND 的输出为 {'brand', 'model', 'android', 'size', 'density'}"""
+    info = {}
+    for key in ('brand', 'model', 'android'):
+        match = re.search(rf'^{key}=(.*)$', output, re.MULTILINE)
+        info[key] = match.group(1).strip() if match else ""
+    size = re.search(r'Physical size:\s*(\d+)x(\d+)', output)
+    info['size'] = (int(size.group(1)), int(size.group(2))) if size else None
+    density = re.search(r'Physical density:\s*(\d+)', output)
+    info['density'] = int(density.group(1)) if density else None
+    return info
+
+
+class DeviceTracker:
+    """设备跟踪器"""
+
+    def __init__(self, transport=adb_transport, retry_interval=2.0):
+        self.transport = transport
+        self.retry_interval = retry_interval
+        self._devices = {}  # {序列号: 状态}
+        self._info = {}  # {序列号: 属性}
+        self._fetching = set()
+        self._available = False
+        self._cond = threading.Condition()
+        self._socket = None
+        self._thread = None
+        self._stopped = False
+
+    @property
+    def available(self):
+        """是否已连接ADB服务并收到设备列表"""
+        return self._available
+
+    def start(self, timeout=1.0):
+        """启动跟踪线程并等待首份设备列表最多timeout秒；已启动时不等待，返回 available"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._track_loop, name="DeviceTracker", daemon=True)
+                self._thread.start()
+                self._cond.wait_for(lambda: self._available, timeout)
+            return self._available
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            sock = self._socket
+        if sock is not None:
+            sock.close()
+
+    def _track_loop(self):
+        while not self._stopped:
+            try:
+                sock = self.transport.open_track_devices()
+            except AdbTransportError:
+                time.sleep(self.retry_interval)
+                continue
+
+            with self._cond:
+                self._socket = sock
+            try:
+                while not self._stopped:
+                    self._update(self.transport.read_device_list(sock))
+            except (AdbTransportError, OSError):
+                pass  # ADB服务重启或已停止，稍后重新订阅
+            finally:
+                sock.close()
+                with self._cond:
+                    self._socket = None
+                    self._available = False
+                    self._cond.notify_all()
+            if not self._stopped:
+                time.sleep(self.retry_interval)
+
+    def _update(self, devices):
+        """收到新的设备列表"""
+        devices = dict(devices)
+        with self._cond:
+            for serial, state in self._devices.items():
+                if devices.get(serial) != state:
+                    print(f"[DeviceTracker] {serial}: {state} -> {devices.get(serial, '已断开')}")
+                if devices.get(serial) != 'device':
+                    self._info.pop(serial, None)  # 重新上线的可能是另一台设备（如同一IP）
+            for serial, state in devices.items():
+                if serial not in self._devices:
+                    print(f"[DeviceTracker] {serial}: {state}")
+            self._devices = devices
+            self._available = True
+            self._cond.notify_all()
+            online = [serial for serial, state in devices.items()
+                      if state == 'device' and serial not in self._info and serial not in self._fetching]
+            self._fetching.update(online)
+
+        for serial in online:
+            threading.Thread(target=self._fetch_info, args=(serial,), daemon=True).start()
+
+    def _fetch_info(self, serial):
+        """读取并缓存设备属性"""
+        try:
+            info = parse_device_info(self.transport.shell(serial, INFO_COMMAND))
+        except (AdbTransportError, OSError):
+            info = None
+        with self._cond:
+            self._fetching.discard(serial)
+            if info is not None and self._devices.get(serial) == 'device':
+                self._info[serial] = info
+            self._cond.notify_all()
+        return info
+
+    # ---------- 查询 ----------
+
+    def devices(self):
+        """设备列表 [(序列号, 状态)]"""
+        with self._cond:
+            return list(self._devices.items())
+
+    def is_online(self, serial, timeout=0):
+        """设备是否在线（状态为device），最多等待timeout秒"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._devices.get(serial) == 'device', timeout)
+
+    def info(self, serial, timeout=3.0):
+        """设备属性（刚上线时等待读取完成，最多timeout秒），设备不在线或读取失败时返回None"""
+        with self._cond:
+            self._cond.wait_for(lambda: serial in self._info or serial not in self._fetching, timeout)
+            info = self._info.get(serial)
+            if info is not None or self._devices.get(serial) != 'device' or serial in self._fetching:
+                return info
+            self._fetching.add(serial)
+        return self._fetch_info(serial)  # 之前读取失败，重新读取
+
+
+# 全局设备跟踪器（所有ADBManager共用）
+device_tracker = DeviceTracker()
@@ -0,0 +1,60 @@
+"""单帧画面 - 每次截图只转换一次，供所有条件共享"""
+
+import time
+import numpy as np
+import cv2
+
+
+class Frame:
+    """监控循环中的一帧画面
+
+    截图在进入监控循环时只转换一次为连续的BGR数组，
+    各条件检测通过 region() 获取零拷贝的切片视图，
+    memo 用于缓存只对当前帧有效的计算结果（如匹配分数）。
+    """
+
+    def __init__(self, bgr, timestamp=None):
+        self.bgr = np.ascontiguousarray(bgr)
+        self.height, self.width = self.bgr.shape[:2]
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self._gray = None
+        self.memo = {}
+
+    @classmethod
+    def from_image(cls, image, timestamp=None):
+        """从PIL图像创建（RGB/RGBA/L）"""
+        array = np.asarray(image)
+        if array.ndim == 2:
+            bgr = cv2.cvtColor(array, cv2.COLOR_GRAY2BGR)
+        elif array.shape[2] == 4:
+            bgr = cv2.cvtColor(array, cv2.COLOR_RGBA2BGR)
+        else:
+            bgr = cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+        return cls(bgr, timestamp)
+
+    @property
+    def size(self):
+        """(宽, 高)，与PIL的size一致"""
+        return self.width, self.height
+
+    @property
+    def gray(self):
+        """灰度图（首次访问时转换并缓存）"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def region(self, x, y, w, h, gray=False, scale=1.0):
+        """获取区域视图（不复制像素；scale不为1时返回缩放后的副本）"""
+        source = self.gray if gray else self.bgr
+        view = source[y:y + h, x:x + w]
+        if scale == 1.0:
+            return view
+        return resize_image(view, scale)
+
+
+def resize_image(image, scale):
+    """按比例缩小图像（模板与画面使用同一规则取整）"""
+    height, width = image.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,264 @@
+"""截图来源 - 监控循环通过统一接口获取画面，可替换为窗口、ADB、屏幕区域或回放"""
+
+import os
+import time
+import numpy as np
+import cv2
+
+
+# 回放目录中识别的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# screencap 原始像素格式转换为BGR的颜色转换代码
+RAW_TO_BGR = {
+    1: cv2.COLOR_RGBA2BGR,  # RGBA_8888
+    2: cv2.COLOR_RGBA2BGR,  # RGBX_8888
+    3: cv2.COLOR_RGB2BGR,  # RGB_888
+    4: cv2.COLOR_BGR5652BGR,  # RGB_565（小端存储，按OpenCV的BGR565解释后即为BGR）
+    5: cv2.COLOR_BGRA2BGR,  # BGRA_8888
+}
+
+
+def _pil_to_bgr(image):
+    """PIL图像转换为BGR数组"""
+    array = np.asarray(image)
+    if array.ndim == 2:
+        return cv2.cvtColor(array, cv2.COLOR_GRAY2BGR)
+    if array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+
+
+class FrameSource:
+    """截图来源基类
+
+    grab() 返回 (BGR数组, 时间戳)，获取失败时数组为None；
+    resolution() 返回监控区域坐标所使用的设备分辨率 (宽, 高)，None表示与画面尺寸相同。
+    """
+
+    name = 'source'
+
+    def __init__(self, resolution=None):
+        self._resolution = tuple(resolution) if resolution else None
+
+    def grab(self):
+        raise NotImplementedError
+
+    def resolution(self):
+        return self._resolution
+
+    def close(self):
+        """释放资源"""
+
+
+class ControllerFrameSource(FrameSource):
+    """设备控制器截图（模拟器窗口 → Scrcpy窗口 → ADB，与界面版行为一致）"""
+
+    name = 'controller'
+
+    def __init__(self, controller):
+        super().__init__()
+        self.controller = controller
+
+    def grab(self):
+        image = self.controller.screenshot()
+        if not image:
+            return None, time.time()
+        return _pil_to_bgr(image), time.time()
+
+    def resolution(self):
+        return tuple(self.controller.get_device_resolution())
+
+
+class WindowFrameSource(FrameSource):
+    """窗口截图（按窗口句柄或标题，可裁剪）"""
+
+    name = 'window'
+
+    def __init__(self, hwnd=None, title="scrcpy", crop_rect=None, resolution=None):
+        super().__init__(resolution)
+        from core.window_capture import WindowCapture
+        self._capture = WindowCapture
+        self.hwnd = hwnd
+        self.title = title
+        self.crop_rect = crop_rect
+
+    def grab(self):
+        if self.hwnd:
+            image = self._capture.capture_window_by_hwnd(self.hwnd, self.crop_rect)
+        else:
+            image = self._capture.capture_window_safe(self.title, client_only=True)
+        if not image:
+            return None, time.time()
+        return _pil_to_bgr(image), time.time()
+
+
+class AdbScreencapFrameSource(FrameSource):
+    """ADB截图（screencap -p）"""
+
+    name = 'adb'
+
+    def __init__(self, adb_manager, resolution=None):
+        super().__init__(resolution)
+        self.adb = adb_manager
+
+    def grab(self):
+        png_data = self.adb.screenshot()
+        timestamp = time.time()
+        if not png_data:
+            return None, timestamp
+        return cv2.imdecode(np.frombuffer(png_data, np.uint8), cv2.IMREAD_COLOR), timestamp
+
+
+class AdbRawFrameSource(FrameSource):
+    """ADB原始帧缓冲截图（screencap 不带 -p）
+
+    省去设备端PNG编码和本地解码，像素数据直接映射为数组；
+    scale 小于1时先在本地缩小再转换颜色，监控区域坐标仍按设备原始分辨率换算。
+    """
+
+    name = 'adb-raw'
+
+    def __init__(self, adb_manager, scale=1.0, resolution=None):
+        super().__init__(resolution)
+        self.adb = adb_manager
+        self.scale = scale
+        self._native = None  # 设备原始分辨率（来自截图头部）
+
+    def grab(self):
+        raw = self.adb.screencap_raw()
+        timestamp = time.time()
+        if raw is None:
+            return None, timestamp
+
+        pixels, pixel_format = raw
+        height, width = pixels.shape[:2]
+        self._native = (width, height)
+        if self.scale != 1.0:
+            size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+            if pixels.shape[2] == 2:
+                # RGB_565 无法直接插值，先转换为BGR
+                pixels = cv2.cvtColor(pixels, RAW_TO_BGR[pixel_format])
+                return cv2.resize(pixels, size, interpolation=cv2.INTER_AREA), timestamp
+            pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(pixels, RAW_TO_BGR[pixel_format]), timestamp
+
+    def resolution(self):
+        return self._resolution or self._native
+
+
+class MssFrameSource(FrameSource):
+    """屏幕区域截图（mss，跨平台）"""
+
+    name = 'mss'
+
+    def __init__(self, region=None, monitor=1, resolution=None):
+        """
+        :param region: 屏幕区域 (left, top, width, height)，None表示整个显示器
+        :param monitor: 显示器序号（region为None时使用）
+        """
+        super().__init__(resolution)
+        import mss
+        self._mss = mss.mss()
+        if region:
+            left, top, width, height = region
+            self.area = {'left': left, 'top': top, 'width': width, 'height': height}
+        else:
+            self.area = self._mss.monitors[monitor]
+
+    def grab(self):
+        shot = self._mss.grab(self.area)
+        return cv2.cvtColor(np.asarray(shot), cv2.COLOR_BGRA2BGR), time.time()
+
+    def close(self):
+        self._mss.close()
+
+
+class ReplayFrameSource(FrameSource):
+    """回放截图：按文件名顺序读取目录中的图片，或读取视频文件
+
+    fps 不为0时按真实时间回放（检测慢于回放速度时跳过中间帧，与实时设备一致）；
+    fps 为0时每次 grab() 返回下一帧（用于基准测试）。
+    回放结束后 loop 为True时从头开始，否则返回None。
+    """
+
+    name = 'replay'
+
+    def __init__(self, path, fps=0, loop=True, resolution=None):
+        super().__init__(resolution)
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.finished = False
+        self._files = None
+        self._video = None
+        self._index = -1
+        self._start = None
+        self._last = None  # 最近返回的帧（回放速度慢于检测时重复返回）
+
+        if os.path.isdir(path):
+            self._files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS))
+            if not self._files:
+                raise ValueError(f"目录中没有图片: {path}")
+            self.frame_count = len(self._files)
+        else:
+            self._video = cv2.VideoCapture(path)
+            if not self._video.isOpened():
+                raise ValueError(f"无法打开视频: {path}")
+            self.frame_count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+
+    def _target_index(self):
+        """当前应该返回的帧序号"""
+        if not self.fps:
+            return self._index + 1
+        if self._start is None:
+            self._start = time.time()
+            return 0
+        return max(self._index, int((time.time() - self._start) * self.fps))
+
+    def _read_file(self, index):
+        if index >= len(self._files):
+            if not self.loop:
+                return None
+            index %= len(self._files)
+        return cv2.imread(self._files[index], cv2.IMREAD_COLOR)
+
+    def _read_video(self, index):
+        # 视频只能顺序读取：跳过中间帧
+        while self._index < index:
+            ok = self._video.grab()
+            if not ok:
+                if not self.loop:
+                    return None
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._index = index - 1
+                ok = self._video.grab()
+                if not ok:
+                    return None
+            self._index += 1
+        ok, frame = self._video.retrieve()
+        return frame if ok else None
+
+    def grab(self):
+        if self.finished:
+            return None, time.time()
+
+        index = self._target_index()
+        if index == self._index and self._last is not None:
+            return self._last, time.time()
+
+        if self._files is not None:
+            frame = self._read_file(index)
+            self._index = index
+        else:
+            frame = self._read_video(index)
+
+        if frame is None:
+            self.finished = True
+        self._last = frame
+        return frame, time.time()
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
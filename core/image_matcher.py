@@ -5,6 +5,149 @@ import time
 from PyQt6.QtCore import QObject, pyqtSignal
 
 
+# 金字塔模式下模板最短边的最小尺寸（像素），过小的模板不再继续缩小
+PYRAMID_MIN_TEMPLATE_SIZE = 8
+# 金字塔模式粗匹配阶段的阈值放宽量
+PYRAMID_COARSE_SLACK = 0.15
+
+
+def match_response(image, template, method=cv2.TM_CCOEFF_NORMED):
+    """执行模板匹配，返回统一为"越大越相似"的结果矩阵"""
+    result = cv2.matchTemplate(image, template, method)
+    if method == cv2.TM_SQDIFF_NORMED:
+        # 平方差越小越相似，统一转换为越大越相似
+        result = 1.0 - result
+    return result
+
+
+def non_max_suppression(result, threshold, min_distance=10, max_results=None):
+    """
+    非极大值抑制（向量化）
+    1. 只保留达到阈值的局部极大值点
+    2. 按置信度从高到低贪心去重：与已保留的点距离小于min_distance的点丢弃，达到max_results后停止
+       已保留的点按min_distance大小的网格登记，每个候选只需与相邻3x3格子中的点比较
+    :return: [(x, y, confidence), ...] 按confidence降序
+    """
+    if max_results is not None and max_results <= 0:
+        return []
+
+    min_distance = max(1, int(min_distance))
+
+    # 局部极大值
+    kernel = np.ones((min_distance, min_distance), np.uint8)
+    dilated = cv2.dilate(result, kernel)
+    ys, xs = np.nonzero((result >= threshold) & (result >= dilated))
+    if len(xs) == 0:
+        return []
+
+    scores = result[ys, xs]
+    order = np.argsort(-scores, kind='stable')
+    xs, ys, scores = xs[order].tolist(), ys[order].tolist(), scores[order].tolist()
+
+    limit = len(xs) if max_results is None else max_results
+    kept = []
+    cells = {}  # {(格子x, 格子y): [已保留的点]}
+    min_dist_sq = min_distance * min_distance
+    for px, py, score in zip(xs, ys, scores):
+        cx, cy = px // min_distance, py // min_distance
+        if any((px - kx) ** 2 + (py - ky) ** 2 < min_dist_sq
+               for gx in (cx - 1, cx, cx + 1) for gy in (cy - 1, cy, cy + 1)
+               for kx, ky in cells.get((gx, gy), ())):
+            continue
+        cells.setdefault((cx, cy), []).append((px, py))
+        kept.append((px, py, float(score)))
+        if len(kept) >= limit:
+            break
+
+    return kept
+
+
+def usable_pyramid_levels(image_shape, template_shape, levels):
+    """根据图像和模板尺寸限制金字塔层数"""
+    levels = max(0, int(levels))
+    th, tw = template_shape[:2]
+    ih, iw = image_shape[:2]
+    while levels > 0:
+        factor = 1 << levels
+        if min(th, tw) // factor >= PYRAMID_MIN_TEMPLATE_SIZE and ih // factor >= th // factor \
+                and iw // factor >= tw // factor:
+            break
+        levels -= 1
+    return levels
+
+
+def pyramid_candidates(image, template, levels, method=cv2.TM_CCOEFF_NORMED, coarse_threshold=-1.0,
+                       max_candidates=3, template_pyramid=None):
+    """
+    金字塔由粗到细匹配
+    先在缩小 2^levels 倍的图像上匹配，再只在粗匹配峰值附近的小窗口内做全分辨率匹配
+    :param template_pyramid: 可选，level -> 缩小后的模板（如 CompiledTemplate.pyramid），None时现场生成
+    :return: [(x, y, confidence), ...] 全分辨率坐标（左上角），按confidence降序
+    """
+    th, tw = template.shape[:2]
+    ih, iw = image.shape[:2]
+    levels = usable_pyramid_levels(image.shape, template.shape, levels)
+
+    if levels == 0:
+        result = match_response(image, template, method)
+        return non_max_suppression(result, coarse_threshold, max(tw, th) // 2, max_candidates)
+
+    # 粗匹配
+    coarse_image = image
+    for _ in range(levels):
+        coarse_image = cv2.pyrDown(coarse_image)
+    if template_pyramid is not None:
+        coarse_template = template_pyramid(levels)
+    else:
+        coarse_template = template
+        for _ in range(levels):
+            coarse_template = cv2.pyrDown(coarse_template)
+
+    coarse_result = match_response(coarse_image, coarse_template, method)
+    peaks = non_max_suppression(coarse_result, coarse_threshold,
+                                max(coarse_template.shape[:2]) // 2, max_candidates)
+
+    # 在峰值附近精匹配
+    factor = 1 << levels
+    margin = factor * 2
+    refined = []
+    for cx, cy, _ in peaks:
+        x0 = max(0, cx * factor - margin)
+        y0 = max(0, cy * factor - margin)
+        x1 = min(iw, cx * factor + margin + tw)
+        y1 = min(ih, cy * factor + margin + th)
+        if x1 - x0 < tw or y1 - y0 < th:
+            continue
+
+        result = match_response(image[y0:y1, x0:x1], template, method)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        refined.append((x0 + max_loc[0], y0 + max_loc[1], float(max_val)))
+
+    refined.sort(key=lambda m: m[2], reverse=True)
+    return refined
+
+
+def match_best(image, template, method=cv2.TM_CCOEFF_NORMED, pyramid_levels=0, template_pyramid=None):
+    """
+    返回最佳匹配 (confidence, (x, y))，没有结果时返回 (-1.0, None)
+    pyramid_levels > 0 时使用金字塔由粗到细匹配
+    """
+    if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+        return -1.0, None
+
+    if pyramid_levels and usable_pyramid_levels(image.shape, template.shape, pyramid_levels):
+        candidates = pyramid_candidates(image, template, pyramid_levels, method,
+                                        template_pyramid=template_pyramid)
+        if not candidates:
+            return -1.0, None
+        x, y, confidence = candidates[0]
+        return confidence, (x, y)
+
+    result = match_response(image, template, method)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), max_loc
+
+
 class ImageMatcher(QObject):
     """图像模板匹配器"""
     match_found = pyqtSignal(list)  # 发出匹配结果：[(x, y, confidence), ...]
@@ -12,6 +155,7 @@ class ImageMatcher(QObject):
     def __init__(self):
         super().__init__()
         self.method = cv2.TM_CCOEFF_NORMED  # 默认最佳方法
+        self.pyramid_levels = 0  # 金字塔层数，0为关闭
 
     def set_method(self, method_name):
         """设置匹配方法"""
@@ -22,18 +166,22 @@ class ImageMatcher(QObject):
         }
         self.method = methods.get(method_name, cv2.TM_CCOEFF_NORMED)
 
-    def find_all(self, screenshot: Image.Image, template: Image.Image, threshold=0.85, region=None):
+    def set_pyramid_levels(self, levels):
+        """设置金字塔层数（0为关闭，每层缩小一半）"""
+        self.pyramid_levels = max(0, int(levels))
+
+    def find_all(self, screenshot: Image.Image, template: Image.Image, threshold=0.85, region=None,
+                 max_results=None, min_distance=10):
         """
         查找所有匹配位置
         :param screenshot: 全屏或区域截图 (PIL Image)
         :param template: 模板图片 (PIL Image)
         :param threshold: 容差阈值 (0.5-1.0)
         :param region: 搜索区域 (x, y, w, h)，None为全屏
+        :param max_results: 最多返回的匹配数量，None为不限制
+        :param min_distance: 小于该距离（像素）的匹配视为同一位置
         :return: 列表 [(center_x, center_y, confidence), ...] 按confidence降序
         """
-        if template.size[0] > screenshot.size[0] or template.size[1] > screenshot.size[1]:
-            return []
-
         # 转换为OpenCV格式
         ss = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
         temp = cv2.cvtColor(np.array(template), cv2.COLOR_RGB2BGR)
@@ -42,45 +190,50 @@ class ImageMatcher(QObject):
             x, y, w, h = region
             ss = ss[y:y+h, x:x+w]
 
+        if temp.shape[0] > ss.shape[0] or temp.shape[1] > ss.shape[1]:
+            return []
+
         # 匹配
-        result = cv2.matchTemplate(ss, temp, self.method)
-        locations = np.where(result >= threshold)
+        if self.pyramid_levels and usable_pyramid_levels(ss.shape, temp.shape, self.pyramid_levels):
+            # 粗匹配放宽阈值，精匹配后再按原阈值过滤
+            candidates = pyramid_candidates(ss, temp, self.pyramid_levels, self.method,
+                                            threshold - PYRAMID_COARSE_SLACK,
+                                            max_candidates=max_results or 50)
+            peaks = self._dedupe_candidates(candidates, threshold, min_distance, max_results)
+        else:
+            result = match_response(ss, temp, self.method)
+            peaks = non_max_suppression(result, threshold, min_distance, max_results)
 
         matches = []
-        for pt in zip(*locations[::-1]):  # (y, x) -> (x, y)
-            confidence = result[pt[1], pt[0]]
+        for px, py, confidence in peaks:
             # 计算中心点
-            center_x = pt[0] + template.size[0] // 2
-            center_y = pt[1] + template.size[1] // 2
+            center_x = px + template.size[0] // 2
+            center_y = py + template.size[1] // 2
             if region:
                 center_x += x
                 center_y += y
-            matches.append((center_x, center_y, float(confidence)))
-
-        # 去重（距离<10像素视为同一位置）
-        matches = self._remove_duplicates(matches, threshold=10)
-        matches.sort(key=lambda m: m[2], reverse=True)  # 按置信度降序
+            matches.append((center_x, center_y, confidence))
 
         self.match_found.emit(matches)
         return matches
 
-    def _remove_duplicates(self, matches, threshold=10):
-        """去除重复匹配"""
-        if len(matches) < 2:
-            return matches
-        unique = []
-        for m in matches:
-            is_duplicate = False
-            for u in unique:
-                dist = ((m[0] - u[0]) ** 2 + (m[1] - u[1]) ** 2) ** 0.5
-                if dist < threshold:
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                unique.append(m)
-        return unique
+    @staticmethod
+    def _dedupe_candidates(candidates, threshold, min_distance=10, max_results=None):
+        """过滤并去重金字塔精匹配结果（候选已按置信度降序）"""
+        kept = []
+        min_dist_sq = min_distance * min_distance
+        for px, py, score in candidates:
+            if score < threshold:
+                break
+            if any((px - kx) ** 2 + (py - ky) ** 2 < min_dist_sq for kx, ky, _ in kept):
+                continue
+            kept.append((px, py, score))
+            if max_results is not None and len(kept) >= max_results:
+                break
+        return kept
 
     def find_best(self, *args, **kwargs):
         """只返回最佳匹配"""
+        kwargs.setdefault('max_results', 1)
         all_matches = self.find_all(*args, **kwargs)
-        return all_matches[0] if all_matches else None
\ No newline at end of file
+        return all_matches[0] if all_matches else None
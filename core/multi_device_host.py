@@ -0,0 +1,314 @@
+"""多设备监控 - 每台设备一个独立的监控进程，共用一份方案和模板"""
+
+import base64
+import gc
+import json
+import multiprocessing as mp
+import queue
+import signal
+import threading
+from io import BytesIO
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image
+from PyQt6.QtCore import QObject, pyqtSignal, Qt
+from core.template_cache import TemplateCache, template_cache
+
+
+# 设备进程发回主进程的消息类型
+EVENT_LOG = 'log'
+EVENT_MATCH = 'match'
+EVENT_STOPPED = 'stopped'
+
+# 多设备监控支持的截图来源（每台设备各自截图）
+DEVICE_SOURCES = ('adb-raw', 'adb', 'controller')
+
+
+def iter_scheme_templates(scheme):
+    """遍历方案文件中所有模板图片的base64数据（任务模板、统一条件、IF条件、画面状态）"""
+    def from_conditions(conditions):
+        for condition in conditions:
+            if condition.get('type') == 'image' and condition.get('template'):
+                yield condition['template']
+
+    for config in scheme.get('configs', []):
+        if config.get('template'):
+            yield config['template']
+        yield from from_conditions(config.get('unified_conditions', []))
+        for pair in config.get('if_pairs', []):
+            yield from from_conditions(pair.get('conditions', []))
+    for state in scheme.get('screen_states', []):
+        yield from from_conditions(state.get('conditions', []))
+
+
+class SharedTemplates:
+    """共享模板
+
+    主进程把方案中的模板转换一次后打包进一块共享内存，
+    设备进程直接以只读数组的形式使用，不再各自转换、各自占用一份内存。
+    """
+
+    def __init__(self, scheme):
+        cache = TemplateCache()  # 独立的缓存，不影响界面进程的全局模板缓存
+        compiled = {}
+        for data in iter_scheme_templates(scheme):
+            template = cache.get(Image.open(BytesIO(base64.b64decode(data))))
+            compiled[template.key] = template
+
+        self.layout = []  # [(内容哈希, 'bgr'/'gray', 偏移, 形状)]
+        size = 0
+        for key, template in compiled.items():
+            for kind, array in (('bgr', template.bgr), ('gray', template.gray)):
+                self.layout.append((key, kind, size, array.shape))
+                size += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        for (key, kind, offset, shape) in self.layout:
+            array = getattr(compiled[key], kind)
+            np.ndarray(shape, np.uint8, buffer=self.shm.buf, offset=offset)[...] = array
+
+    @property
+    def descriptor(self):
+        """传给设备进程的描述（可序列化）"""
+        return self.shm.name, self.layout
+
+    def close(self):
+        """释放共享内存（所有设备进程退出后调用）"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_shared_templates(descriptor):
+    """设备进程中登记共享模板，返回共享内存对象（进程退出前需保持引用）"""
+    name, layout = descriptor
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 以前没有 track 参数
+        shm = shared_memory.SharedMemory(name=name)
+
+    arrays = {}
+    for key, kind, offset, shape in layout:
+        array = np.ndarray(shape, np.uint8, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays.setdefault(key, {})[kind] = array
+    template_cache.attach_shared({key: (value['bgr'], value['gray']) for key, value in arrays.items()})
+    return shm
+
+
+def _find_window(title):
+    """按标题查找模拟器窗口，返回窗口句柄"""
+    from core.window_capture import WindowCapture
+    for hwnd, window_title, _ in WindowCapture.get_all_visible_windows():
+        if window_title == title:
+            return hwnd
+    return None
+
+
+def release_shared_templates(shm):
+    """
+    设备进程中关闭共享模板：模板缓存中的数组是共享内存的视图，先从缓存中移除再关闭，
+    仍有对象引用时（进程即将退出）保留映射，由系统回收
+    """
+    template_cache.detach_shared()
+    gc.collect()  # 监控器和信号连接之间的循环引用也可能持有模板
+    try:
+        shm.close()
+    except BufferError:
+        print("[MultiDeviceHost] 共享模板仍被引用，进程退出时释放")
+
+
+def _device_frame_source(adb, capture):
+    """设备进程中的截图来源，None表示使用控制器截图（窗口截图已关闭，即ADB截图）"""
+    from core.frame_source import AdbRawFrameSource, AdbScreencapFrameSource
+
+    if capture['source'] == 'adb-raw':
+        return AdbRawFrameSource(adb, capture['scale'], capture['resolution'])
+    if capture['source'] == 'adb':
+        return AdbScreencapFrameSource(adb, capture['resolution'])
+    return None
+
+
+def _run_device(device, adb_path, scheme_file, performance, capture, report, should_stop):
+    """在设备进程中连接设备、加载方案并监控，直到 should_stop() 为真（返回后不再持有任何模板）"""
+    from core.adb_manager import ADBManager
+    from core.device_controller import DeviceController
+    from core.auto_monitor import AutoMonitor
+
+    adb = ADBManager(adb_path)
+    if not adb.connect_device(device['serial']):
+        report(EVENT_LOG, "设备连接失败")
+        return
+
+    controller = DeviceController(adb, None)
+    controller.window_capture_enabled = False  # 多个Scrcpy窗口无法区分，直接使用ADB截图
+    window = device.get('window')
+    if window:
+        hwnd = _find_window(window)
+        if hwnd is None:
+            report(EVENT_LOG, f"未找到模拟器窗口: {window}")
+            return
+        simulator_config = controller.load_simulator_config(window) or {}
+        controller.set_simulator_config(hwnd, simulator_config.get('crop_rect'),
+                                        simulator_config.get('resolution'))
+
+    # 模拟器窗口使用控制器截图，其余按配置截图
+    source = None if window else _device_frame_source(adb, capture)
+    monitor = AutoMonitor(adb, controller, source)
+    # 监控线程中发出的信号直接转发到队列（设备进程没有Qt事件循环）
+    monitor.log_message.connect(lambda message: report(EVENT_LOG, message),
+                                Qt.ConnectionType.DirectConnection)
+    monitor.match_found.connect(
+        lambda data: report(EVENT_MATCH, {'name': data['config'].get('name', ''),
+                                          'index': data['index'], 'time': data['time']}),
+        Qt.ConnectionType.DirectConnection)
+    monitor.apply_performance_settings(performance)
+
+    if monitor.load_scheme(scheme_file) and monitor.start_monitoring():
+        while monitor.monitoring and not should_stop():
+            pass
+        monitor.stop_monitoring()
+
+
+def _device_worker(device, adb_path, scheme_file, templates, performance, capture, events, stop_event):
+    """设备进程入口：登记共享模板并监控设备，直到主进程要求停止"""
+    serial = device['serial']
+
+    def report(kind, payload=None):
+        events.put((kind, serial, payload))
+
+    # Ctrl+C 会发给整个进程组，由主进程统一停止；单独收到 SIGTERM 时自行停止
+    terminated = threading.Event()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: terminated.set())
+
+    shm = None
+    try:
+        shm = attach_shared_templates(templates)
+        _run_device(device, adb_path, scheme_file, performance, capture, report,
+                    lambda: terminated.is_set() or stop_event.wait(0.5))
+    except Exception as e:
+        report(EVENT_LOG, f"设备进程错误: {str(e)}")
+    finally:
+        if shm is not None:
+            release_shared_templates(shm)
+        report(EVENT_STOPPED)
+
+
+class MultiDeviceHost(QObject):
+    """多设备监控主机
+
+    同一个方案为每台设备（ADB序列号，或序列号+模拟器窗口）启动一个监控进程，
+    每个进程拥有独立的解释器和CPU核心，互不争抢GIL，也不需要为每台设备打开一个界面。
+    模板在主进程中转换一次后通过共享内存只读共享，日志和触发记录通过队列汇总回主进程，
+    由读取线程以信号发出（命令行运行 clickzen run 指定多个 --serial 时使用，以直接连接方式接收）。
+    """
+
+    # 信号
+    log_message = pyqtSignal(str)
+    match_found = pyqtSignal(str, dict)  # (序列号, {'name', 'index', 'time'})
+    device_stopped = pyqtSignal(str)
+
+    def __init__(self, adb_path, performance=None, capture_source='adb-raw', capture_scale=1.0,
+                 capture_resolution=None):
+        """
+        :param capture_source: 设备截图方式，见 DEVICE_SOURCES（屏幕区域和窗口截图无法区分设备，不支持）
+        :param capture_scale: adb-raw 截图在本地缩小的比例
+        :param capture_resolution: 监控区域坐标对应的设备分辨率 (宽, 高)，None表示画面尺寸
+        :raises ValueError: 截图方式不支持多设备
+        """
+        super().__init__()
+        if capture_source not in DEVICE_SOURCES:
+            raise ValueError(f"多设备监控不支持截图来源 {capture_source}（可用: {'、'.join(DEVICE_SOURCES)}）")
+        self.adb_path = str(adb_path)
+        self.performance = performance or {}
+        self.capture = {'source': capture_source, 'scale': capture_scale, 'resolution': capture_resolution}
+        self._context = mp.get_context('spawn')
+        self._processes = {}  # {序列号: Process}
+        self._events = None
+        self._stop_event = None
+        self._templates = None
+        self._reader = None
+
+    def start(self, scheme_file, devices):
+        """
+        为每台设备启动监控进程
+        :param devices: 序列号列表，或 [{'serial': 序列号, 'window': 模拟器窗口标题}]
+        """
+        if self._processes:
+            return False
+
+        with open(scheme_file, 'r', encoding='utf-8') as f:
+            scheme = json.load(f)
+        devices = [{'serial': device} if isinstance(device, str) else device for device in devices]
+        if not devices:
+            self.log_message.emit("没有需要监控的设备")
+            return False
+
+        self._templates = SharedTemplates(scheme)
+        self._events = self._context.Queue()
+        self._stop_event = self._context.Event()
+        for device in devices:
+            process = self._context.Process(
+                target=_device_worker,
+                args=(device, self.adb_path, scheme_file, self._templates.descriptor, self.performance,
+                      self.capture, self._events, self._stop_event),
+                name=f"Monitor-{device['serial']}",
+                daemon=True)
+            process.start()
+            self._processes[device['serial']] = process
+
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+        self.log_message.emit(f"多设备监控已启动: {len(devices)} 台设备")
+        return True
+
+    def _read_events(self):
+        """汇总设备进程发回的日志和触发记录"""
+        running = set(self._processes)
+        while running:
+            try:
+                kind, serial, payload = self._events.get(timeout=0.5)
+            except queue.Empty:
+                # 进程异常退出时不会发送停止消息
+                for dead in [serial for serial in running if not self._processes[serial].is_alive()]:
+                    running.discard(dead)
+                    self.device_stopped.emit(dead)
+                continue
+
+            if kind == EVENT_LOG:
+                self.log_message.emit(f"[{serial}] {payload}")
+            elif kind == EVENT_MATCH:
+                self.match_found.emit(serial, payload)
+            elif kind == EVENT_STOPPED and serial in running:
+                running.discard(serial)
+                self.device_stopped.emit(serial)
+
+    def stop(self, timeout=5):
+        """停止所有设备进程"""
+        if not self._processes:
+            return
+        self._stop_event.set()
+        for serial, process in self._processes.items():
+            process.join(timeout)
+            if process.is_alive():
+                print(f"[MultiDeviceHost] 设备进程 {serial} 未能正常退出，强制结束")
+                process.terminate()
+                process.join(1)
+        if self._reader is not None:
+            self._reader.join(timeout=2)
+        self._templates.close()
+        self._processes.clear()
+        self._templates = None
+        self._reader = None
+        self.log_message.emit("多设备监控已停止")
+
+    def wait(self):
+        """等待所有设备进程结束（无界面运行时使用）"""
+        if self._reader is not None:
+            self._reader.join()
+
+    @property
+    def devices(self):
+        """正在监控的设备序列号"""
+        return [serial for serial, process in self._processes.items() if process.is_alive()]
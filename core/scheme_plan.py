@@ -0,0 +1,316 @@
+"""方案编译 - 将监控配置字典编译为执行计划，检测循环只执行编译好的计划"""
+
+import operator
+
+
+# 变量比较运算符
+COMPARE_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+# 条件组逻辑
+LOGIC_AND = 'AND'
+LOGIC_OR = 'OR'
+LOGIC_NOT = 'NOT'
+
+# 任务模式
+MODE_IF = 'IF'
+MODE_RANDOM = 'RANDOM'
+MODE_LEGACY = 'LEGACY'
+
+
+def parse_logic(logic, default=None):
+    """解析条件逻辑文本（如 "AND (全部满足)"），无法识别时返回default"""
+    for mode in (LOGIC_AND, LOGIC_OR, LOGIC_NOT):
+        if mode in logic:
+            return mode
+    return default
+
+
+class VariableCondition:
+    """变量条件"""
+    __slots__ = ('name', 'compare', 'value', 'missing', 'cost')
+
+    def __init__(self, condition, missing=False, unknown=False):
+        """
+        :param missing: 变量不存在时的结果
+        :param unknown: 运算符无法识别时的结果
+        """
+        self.name = condition.get('variable', '')
+        self.value = condition.get('value', 0)
+        self.missing = missing
+        self.compare = COMPARE_OPERATORS.get(condition.get('operator', '=='))
+        if self.compare is None:
+            self.compare = lambda current, value: unknown
+        self.cost = (0, 0)
+
+    def evaluate(self, monitor, frame):
+        variables = monitor.global_variables
+        if self.name not in variables:
+            return self.missing
+        return self.compare(variables[self.name], self.value)
+
+    def variables(self):
+        return (self.name,)
+
+    def image_conditions(self):
+        return ()
+
+
+class ImageCondition:
+    """图像条件（模板已预先编译，像素区域按帧尺寸和设备分辨率缓存）"""
+    __slots__ = ('template', 'region', 'threshold', 'expect_exist', 'pyramid_levels', 'gray', 'scale',
+                 'cost', '_rects')
+
+    def __init__(self, condition, templates):
+        self.template = templates.get(condition.get('template'))
+        region = condition.get('region')
+        self.region = tuple(region) if region else None
+        self.threshold = condition.get('threshold', 0.85)
+        self.expect_exist = condition.get('expect_exist', True)
+        self.pyramid_levels = condition.get('pyramid_levels', 0)
+        self.gray = condition.get('grayscale', False)
+        self.scale = condition.get('scale', 1.0)
+        self._rects = {}  # {(帧尺寸, 设备分辨率): 像素区域}
+
+        # 检测代价：按搜索面积估算，未指定区域视为全屏
+        area = self.region[2] * self.region[3] if self.region else float('inf')
+        scale = self.scale / 2 if self.pyramid_levels else self.scale
+        self.cost = (2, area * scale * scale)
+
+    def rect(self, monitor, frame):
+        """帧内像素区域，区域无效时返回None"""
+        resolution = monitor.frame_resolution(frame)
+        key = (frame.size, resolution)
+        try:
+            return self._rects[key]
+        except KeyError:
+            rect = monitor._get_region_rect(frame, self.region, resolution)
+            self._rects[key] = rect
+            return rect
+
+    def match(self, monitor, frame):
+        """
+        检测图像（未考虑expect_exist）
+        :return: True/False，区域无效或没有模板时返回None
+        """
+        if self.template is None:
+            return None
+        rect = self.rect(monitor, frame)
+        if rect is None:
+            return None
+        score = monitor._match_score(frame, rect, self.template, self.pyramid_levels, self.gray, self.scale)
+        return score >= self.threshold
+
+    def evaluate(self, monitor, frame):
+        found = self.match(monitor, frame)
+        if found is None:
+            return False  # 区域无效或没有模板时视为不满足（不受expect_exist影响）
+        return found if self.expect_exist else not found
+
+    def prefetch_key(self, monitor, frame):
+        """同一帧内相同检测的标识（用于并行预先匹配时去重），无需匹配时返回None"""
+        if self.template is None:
+            return None
+        rect = self.rect(monitor, frame)
+        if rect is None:
+            return None
+        return self.template.key, rect, self.gray, self.scale, self.pyramid_levels
+
+    def variables(self):
+        return ()
+
+    def image_conditions(self):
+        return (self,)
+
+
+class ConditionGroup:
+    """条件组：按代价从低到高排列，短路求值"""
+    __slots__ = ('logic', 'conditions')
+
+    def __init__(self, logic, conditions):
+        self.logic = logic
+        # 稳定排序：变量 < 其他类型 < 图像（按搜索面积从小到大）
+        self.conditions = tuple(sorted(conditions, key=lambda condition: condition.cost))
+
+    def evaluate(self, monitor, frame):
+        """AND遇到不满足、OR/NOT遇到满足时立即得出结论"""
+        if not self.conditions:
+            return self.logic == LOGIC_NOT
+        if self.logic == LOGIC_AND:
+            for condition in self.conditions:
+                if not condition.evaluate(monitor, frame):
+                    return False
+            return True
+        if self.logic is None:
+            return False
+
+        met = False
+        for condition in self.conditions:
+            if condition.evaluate(monitor, frame):
+                met = True
+                break
+        return met if self.logic == LOGIC_OR else not met
+
+    def variables(self):
+        return tuple(name for condition in self.conditions for name in condition.variables())
+
+    def prefetch_images(self, monitor, frame):
+        """
+        先求值非图像条件，返回仍需匹配才能得出结论的图像条件（用于并行预先匹配）
+        :return: 图像条件列表；非图像条件已决定结果时返回 ()（满足）或 None（不满足）
+        """
+        if not self.conditions or self.logic is None:
+            return () if self.evaluate(monitor, frame) else None
+        images = []
+        for condition in self.conditions:
+            found = condition.image_conditions()
+            if found:
+                images.extend(found)
+            elif condition.evaluate(monitor, frame) != (self.logic == LOGIC_AND):
+                # AND遇到不满足、OR/NOT遇到满足，图像条件无需匹配
+                return None if self.logic != LOGIC_OR else ()
+        if images:
+            return images
+        return None if self.logic == LOGIC_OR else ()
+
+
+def action_variables(actions):
+    """动作序列中设置的变量名"""
+    return {action.get('variable', '') for action in actions if action.get('type') == 'set_variable'}
+
+
+def compile_condition(condition, templates):
+    """编译单个条件，未知类型返回None"""
+    condition_type = condition.get('type')
+    if condition_type == 'variable':
+        return VariableCondition(condition)
+    if condition_type == 'image':
+        return ImageCondition(condition, templates)
+    return None
+
+
+def compile_group(conditions, logic):
+    """编译条件组（单个条件时直接返回该条件的结果，不进行逻辑判断）"""
+    if len(conditions) == 1 and conditions[0] is not None:
+        logic = LOGIC_AND
+    return ConditionGroup(logic, [condition for condition in conditions if condition is not None])
+
+
+class TaskPlan:
+    """单个监控任务的执行计划"""
+    __slots__ = ('config', 'index', 'name', 'enabled', 'mode', 'lane', 'screen_states', 'conditions', 'pairs',
+                 'chained_pairs', 'random_sequences', 'actions', 'legacy_conditions', 'legacy_image')
+
+    def __init__(self, config, lane):
+        self.config = config
+        self.index = -1  # 任务在监控配置列表中的序号（任务列表变化时由监控器更新）
+        self.name = config.get('name', '')
+        self.enabled = config.get('enabled', True)
+        self.lane = lane
+        self.screen_states = frozenset(config.get('screen_states', []))  # 适用的画面状态，空表示所有画面
+        self.conditions = None  # 统一条件组，None表示没有统一条件
+        self.pairs = ()  # IF模式：(条件序号, 条件组, 动作序列)
+        self.chained_pairs = frozenset()  # IF模式：动作会修改后面条件组所读变量的条件-动作对（在pairs中的位置）
+        self.random_sequences = config.get('random_sequences', [])
+        self.actions = config.get('actions', [])
+        self.legacy_conditions = ()  # 旧版变量条件
+        self.legacy_image = None  # 旧版模板条件
+
+    def variables(self):
+        """计划中引用的所有变量名（用于变量变化时立即重新检测）"""
+        names = set()
+        if self.conditions is not None:
+            names.update(self.conditions.variables())
+        for _, group, _ in self.pairs:
+            names.update(group.variables())
+        for condition in self.legacy_conditions:
+            names.update(condition.variables())
+        return names
+
+    def prefetch_images(self, monitor, frame):
+        """本帧检测时可能需要匹配的图像条件（变量条件已决定结果的条件组不包含在内，用于并行预先匹配）"""
+        images = []
+        if self.conditions is not None:
+            pending = self.conditions.prefetch_images(monitor, frame)
+            if pending is None:
+                return images  # 统一条件不满足，不会检测后续条件
+            images.extend(pending)
+        for _, group, _ in self.pairs:
+            images.extend(group.prefetch_images(monitor, frame) or ())
+        if self.legacy_image is not None and all(
+                condition.evaluate(monitor, frame) for condition in self.legacy_conditions):
+            images.append(self.legacy_image)
+        return images
+
+
+def compile_task(config, templates, lane):
+    """将监控配置编译为执行计划"""
+    plan = TaskPlan(config, lane)
+
+    unified_conditions = config.get('unified_conditions', [])
+    if unified_conditions:
+        logic = parse_logic(config.get('condition_logic', 'AND (全部满足)'))
+        plan.conditions = compile_group(
+            [compile_condition(condition, templates) for condition in unified_conditions], logic)
+
+    task_mode = config.get('task_mode')
+    if task_mode == MODE_IF:
+        plan.mode = MODE_IF
+        pairs = []
+        for pair_index, pair in enumerate(config.get('if_pairs', [])):
+            conditions = pair.get('conditions', [])
+            logic = parse_logic(pair.get('logic', 'AND (全部满足)'), LOGIC_OR)
+            if logic == LOGIC_NOT:
+                logic = LOGIC_OR  # IF条件组只区分AND和OR
+            if conditions:
+                group = compile_group([compile_condition(condition, templates) for condition in conditions], logic)
+            else:
+                group = ConditionGroup(None, [])  # 空条件组永远不满足
+            pairs.append((pair_index, group, pair.get('actions', [])))
+        plan.pairs = tuple(pairs)
+        plan.chained_pairs = frozenset(
+            position for position, (_, _, actions) in enumerate(pairs)
+            if action_variables(actions).intersection(
+                name for _, group, _ in pairs[position + 1:] for name in group.variables()))
+    elif task_mode == MODE_RANDOM:
+        plan.mode = MODE_RANDOM
+    else:
+        plan.mode = MODE_LEGACY
+        if plan.conditions is None:
+            # 兼容旧版本：变量不存在或运算符无法识别时视为满足
+            plan.legacy_conditions = tuple(
+                VariableCondition(condition, missing=True, unknown=True)
+                for condition in config.get('conditions', []))
+            if config.get('template'):
+                plan.legacy_image = ImageCondition(config, templates)
+
+    return plan
+
+
+class ScreenState:
+    """画面状态：满足条件组时当前画面归为该状态"""
+    __slots__ = ('name', 'conditions')
+
+    def __init__(self, name, conditions):
+        self.name = name
+        self.conditions = conditions
+
+    def evaluate(self, monitor, frame):
+        return self.conditions.evaluate(monitor, frame)
+
+    def prefetch_images(self, monitor, frame):
+        return self.conditions.prefetch_images(monitor, frame) or ()
+
+
+def compile_screen_state(state, templates):
+    """编译画面状态定义"""
+    conditions = state.get('conditions', [])
+    logic = parse_logic(state.get('logic', 'AND (全部满足)'))
+    return ScreenState(state.get('name', ''),
+                       compile_group([compile_condition(condition, templates) for condition in conditions], logic))
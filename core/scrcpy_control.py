@@ -0,0 +1,203 @@
+"""scrcpy控制通道 - 通过 scrcpy-server 的控制socket注入触摸、按键和文本
+
+消息为scrcpy的二进制控制协议（大端序，scrcpy 2.0 及以上）：
+    注入按键  类型(1) 动作(1) 键码(4) 重复次数(4) meta状态(4)                          共14字节
+    注入文本  类型(1) 长度(4) UTF-8文本（最多300字节）
+    注入触摸  类型(1) 动作(1) 指针ID(8) x(4) y(4) 屏幕宽(2) 屏幕高(2) 压力(2) 动作按钮(4) 按钮(4)  共32字节
+触摸坐标附带的屏幕尺寸必须与设备当前显示尺寸一致，否则服务端会忽略该事件（没有任何反馈）。
+显示尺寸在第一次注入时获取，之后只在视频流尺寸变化（屏幕旋转、分辨率改变）或发送失败后重新获取，
+不定时轮询设备。
+"""
+
+import itertools
+import socket
+import struct
+import threading
+import time
+from core.trajectory_utils import densify_trajectory
+
+# 控制消息类型
+TYPE_INJECT_KEYCODE = 0
+TYPE_INJECT_TEXT = 1
+TYPE_INJECT_TOUCH_EVENT = 2
+
+# Android MotionEvent / KeyEvent 动作
+ACTION_DOWN = 0
+ACTION_UP = 1
+ACTION_MOVE = 2
+
+TEXT_MAX_LENGTH = 300
+
+
+def keycode_message(action, keycode, repeat=0, metastate=0):
+    """注入按键消息"""
+    return struct.pack('>BBiiI', TYPE_INJECT_KEYCODE, action, keycode, repeat, metastate)
+
+
+def text_message(text):
+    """注入文本消息（UTF-8编码后不超过 TEXT_MAX_LENGTH 字节）"""
+    data = text.encode('utf-8')
+    return struct.pack('>BI', TYPE_INJECT_TEXT, len(data)) + data
+
+
+def touch_message(action, pointer_id, x, y, screen_size, pressure=1.0):
+    """注入触摸消息（压力为0-1，按16位定点数编码）"""
+    width, height = screen_size
+    pressure = 0xffff if pressure >= 1 else int(pressure * 0x10000)
+    return struct.pack('>BBqiiHHHII', TYPE_INJECT_TOUCH_EVENT, action, pointer_id,
+                       int(x), int(y), width, height, pressure, 0, 0)
+
+
+def split_text(text, limit=TEXT_MAX_LENGTH):
+    """按UTF-8字节数拆分文本（不拆开单个字符）"""
+    chunks, current, size = [], [], 0
+    for char in text:
+        length = len(char.encode('utf-8'))
+        if size + length > limit:
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += length
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+class ScrcpyControlClient:
+    """scrcpy控制通道客户端
+
+    方法与 ADBManager 的输入方法同名（tap/swipe/swipe_path/keyevent/text），可以直接替换使用；
+    发送失败时返回False并断开，调用方改用ADB。
+    每个手势使用独立的指针ID，多个任务同时操作时互不干扰。
+    """
+
+    def __init__(self, host, port, size_provider, step_ms=10, timeout=2.0):
+        """
+        :param size_provider: 返回设备当前显示尺寸 (宽, 高) 的函数（执行一次设备命令，可能在后台线程中调用）
+        :param step_ms: 滑动时相邻两次移动事件的间隔（毫秒）
+        """
+        self.host = host
+        self.port = port
+        self.size_provider = size_provider
+        self.step_ms = step_ms
+        self.timeout = timeout
+        self._socket = None
+        self._lock = threading.Lock()
+        self._pointer_ids = itertools.cycle(range(10))
+        self._screen_size = None
+        self._refreshing = threading.Lock()  # 同一时间只有一个后台刷新
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    def connect(self):
+        """连接控制socket（服务端就绪后会先发送一个字节），失败返回False"""
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            return False
+        try:
+            # adb forward 在服务端未就绪时也会接受连接，收到首字节才表示连接成功
+            if not sock.recv(1):
+                sock.close()
+                return False
+        except OSError:
+            sock.close()
+            return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        return True
+
+    def close(self):
+        with self._lock:
+            sock, self._socket = self._socket, None
+        if sock is not None:
+            sock.close()
+
+    def refresh_size_async(self):
+        """显示尺寸可能已变化（如视频流尺寸变化），在后台线程中重新获取，正在获取时忽略"""
+        if self._socket is None or not self._refreshing.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self._refresh_size()
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=refresh, name="ScrcpyControlSize", daemon=True).start()
+
+    def _refresh_size(self):
+        size = self.size_provider()
+        if size:
+            size = tuple(size)
+            if self._screen_size is not None and size != self._screen_size:
+                print(f"[ScrcpyControl] 显示尺寸变化: {self._screen_size[0]}x{self._screen_size[1]} -> "
+                      f"{size[0]}x{size[1]}")
+            self._screen_size = size
+
+    def _send(self, data):
+        with self._lock:
+            if self._socket is None:
+                return False
+            try:
+                self._socket.sendall(data)
+                return True
+            except OSError as e:
+                print(f"[ScrcpyControl] 控制通道断开: {e}")
+                self._socket.close()
+                self._socket = None
+                self._screen_size = None  # 重新连接后重新获取
+                return False
+
+    def screen_size(self):
+        """设备当前显示尺寸（尚未获取时立即获取）"""
+        if self._screen_size is None:
+            self._refresh_size()
+        return self._screen_size
+
+    def _next_pointer(self):
+        with self._lock:
+            return next(self._pointer_ids)
+
+    def tap(self, x, y):
+        size = self.screen_size()
+        if size is None:
+            return False
+        pointer_id = self._next_pointer()
+        return self._send(touch_message(ACTION_DOWN, pointer_id, x, y, size) +
+                          touch_message(ACTION_UP, pointer_id, x, y, size, 0))
+
+    def swipe(self, x1, y1, x2, y2, duration=300):
+        """滑动（起点和终点相同时为长按）"""
+        return self.swipe_path([(x1, y1, 0), (x2, y2, duration)])
+
+    def swipe_path(self, points):
+        """
+        沿轨迹连续滑动，按本地时间逐点发送移动事件
+        :param points: [(x, y, 相对时间ms), ...]
+        """
+        size = self.screen_size()
+        if size is None:
+            return False
+        pointer_id = self._next_pointer()
+        points = densify_trajectory(points, self.step_ms)
+
+        x, y, _ = points[0]
+        if not self._send(touch_message(ACTION_DOWN, pointer_id, x, y, size)):
+            return False
+        start = time.perf_counter()
+        for x, y, t in points[1:]:
+            wait = start + t / 1000 - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if not self._send(touch_message(ACTION_MOVE, pointer_id, x, y, size)):
+                return False
+        return self._send(touch_message(ACTION_UP, pointer_id, x, y, size, 0))
+
+    def keyevent(self, keycode):
+        return self._send(keycode_message(ACTION_DOWN, keycode) + keycode_message(ACTION_UP, keycode))
+
+    def text(self, text):
+        return self._send(b''.join(text_message(chunk) for chunk in split_text(text)))
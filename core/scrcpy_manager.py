@@ -2,8 +2,13 @@ import subprocess
 import time
 import threading
 import os
+import random
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
+from core.scrcpy_control import ScrcpyControlClient
+
+# 控制通道使用的 scrcpy-server 在设备上的路径（与scrcpy自己推送的文件分开，互不覆盖）
+CONTROL_SERVER_PATH = "/data/local/tmp/clickzen-scrcpy-server.jar"
 
 
 class ScrcpyManager(QObject):
@@ -24,6 +29,11 @@ class ScrcpyManager(QObject):
         self.restart_attempts = 0
         self.max_restart_attempts = 10
         self.is_stopping = False
+        # 控制通道（只注入输入、不传输画面的scrcpy-server）
+        self.control_client = None
+        self._control_process = None
+        self._control_forward = None  # (序列号, 本地端口)
+        self._control_lock = threading.Lock()
 
     def check_environment(self):
         """检查Scrcpy环境"""
@@ -161,6 +171,8 @@ class ScrcpyManager(QObject):
                 self.is_stopping = False
                 self.started.emit()
                 self.log.emit("Scrcpy启动成功")
+                if self.config.get("scrcpy_control", False):
+                    threading.Thread(target=self.start_control, args=(serial,), daemon=True).start()
                 return True
             else:
                 self.error.emit("Scrcpy启动失败")
@@ -218,6 +230,11 @@ class ScrcpyManager(QObject):
                             threading.Thread(target=self._auto_restart, daemon=True).start()
                         else:
                             self.stop()
+                    elif "Texture:" in line:
+                        # 视频尺寸变化（屏幕旋转或分辨率改变），控制通道重新获取显示尺寸
+                        client = self.control_client
+                        if client is not None:
+                            client.refresh_size_async()
                     elif "INFO: Renderer:" in line:
                         # 渲染器初始化成功，窗口应该已创建
                         self.log.emit("Scrcpy窗口初始化成功")
@@ -273,9 +290,95 @@ class ScrcpyManager(QObject):
             self.error.emit("无法重启：未记录设备信息")
             self.stop()
 
+    def start_control(self, serial=None):
+        """
+        启动控制通道：在设备上另外运行一个只开启控制的scrcpy-server（video=false audio=false），
+        通过 adb forward 连接其控制socket。scrcpy窗口自己的控制连接由scrcpy客户端独占，无法共用。
+        """
+        with self._control_lock:
+            if self.control_client is not None and self.control_client.connected:
+                return True
+            self._stop_control()
+
+            serial = serial or self.current_serial or self.adb_manager.device_serial
+            version = self.config.get("scrcpy_version", "")
+            if not serial or int(version.split('.')[0] or 0) < 2:
+                self.log.emit("控制通道需要scrcpy 2.0以上版本和已连接的设备")
+                return False
+
+            adb = str(self.adb_manager.adb_path)
+            server = Path(self.config.get("scrcpy_path")).parent / "scrcpy-server"
+            creationflags = 0x08000000 if os.name == 'nt' else 0
+            try:
+                subprocess.run([adb, "-s", serial, "push", str(server), CONTROL_SERVER_PATH],
+                               capture_output=True, timeout=15, creationflags=creationflags, check=True)
+
+                scid = f"{random.getrandbits(31):08x}"
+                result = subprocess.run([adb, "-s", serial, "forward", "tcp:0", f"localabstract:scrcpy_{scid}"],
+                                        capture_output=True, text=True, timeout=5, creationflags=creationflags,
+                                        check=True)
+                port = int(result.stdout.strip())
+                self._control_forward = (serial, port)
+
+                self._control_process = subprocess.Popen(
+                    [adb, "-s", serial, "shell",
+                     f"CLASSPATH={CONTROL_SERVER_PATH} app_process / com.genymobile.scrcpy.Server {version} "
+                     f"scid={scid} log_level=warn video=false audio=false control=true tunnel_forward=true "
+                     f"cleanup=false clipboard_autosync=false send_device_meta=false"],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=creationflags)
+            except (OSError, ValueError, subprocess.SubprocessError) as e:
+                self.log.emit(f"启动控制通道失败: {e}")
+                self._stop_control()
+                return False
+
+            # 等待服务端开始监听
+            client = ScrcpyControlClient("127.0.0.1", port, self._control_screen_size)
+            deadline = time.time() + 5
+            while time.time() < deadline and self._control_process.poll() is None:
+                if client.connect():
+                    self.control_client = client
+                    self.log.emit(f"scrcpy控制通道已连接（端口 {port}），点击和滑动将通过控制通道发送")
+                    return True
+                time.sleep(0.1)
+
+            self.log.emit("scrcpy控制通道连接失败，继续使用ADB输入")
+            self._stop_control()
+            return False
+
+    def _control_screen_size(self):
+        """设备当前显示尺寸（考虑分辨率覆盖和屏幕旋转）"""
+        state = self.adb_manager.get_display_state(max_age=0)
+        if not state:
+            return None
+        width, height, rotation = state
+        return (height, width) if rotation in (1, 3) else (width, height)
+
+    def _stop_control(self):
+        if self.control_client is not None:
+            self.control_client.close()
+            self.control_client = None
+        if self._control_process is not None:
+            self._control_process.terminate()
+            self._control_process = None
+        if self._control_forward is not None:
+            serial, port = self._control_forward
+            self._control_forward = None
+            try:
+                subprocess.run([str(self.adb_manager.adb_path), "-s", serial, "forward", "--remove", f"tcp:{port}"],
+                               capture_output=True, timeout=5,
+                               creationflags=0x08000000 if os.name == 'nt' else 0)
+            except (OSError, subprocess.SubprocessError):
+                pass
+
+    def stop_control(self):
+        """关闭控制通道"""
+        with self._control_lock:
+            self._stop_control()
+
     def stop(self):
         """停止Scrcpy"""
         self.is_stopping = True
+        self.stop_control()
         if self.process:
             try:
                 self.process.terminate()
@@ -0,0 +1,157 @@
+"""任务调度器 - 每个任务按自己的检测间隔和优先级调度"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class TaskScheduler:
+    """任务调度器
+
+    以 (下次检测时间, -优先级, 序号, 任务) 组成最小堆，
+    检测循环只取出已到期的任务，冷却中的任务不产生任何开销。
+    """
+
+    def __init__(self, default_interval=0.5, adaptive=None):
+        self.default_interval = default_interval  # 未设置检测间隔的任务使用的间隔
+        self.adaptive = adaptive  # 可选的 AdaptiveInterval，用于动态调整间隔
+        self._lock = threading.Lock()
+        self._heap = []
+        self._tracked = set()  # 当前有效任务的id，用于忽略已删除任务
+        self._running = set()  # 已取出、正在检测的任务id（检测完成后重新排队）
+        self._counter = itertools.count()
+        self._changed = threading.Event()  # 调度队列变化（可能出现更早到期的任务）
+
+    def poll_interval(self, config):
+        """任务的检测间隔（秒），0或未设置时使用默认间隔"""
+        interval = config.get('poll_interval') or self.default_interval
+        if self.adaptive is not None:
+            interval = self.adaptive.apply(interval)
+        return interval
+
+    def min_interval(self):
+        """所有启用任务中最短的检测间隔（截图频率）"""
+        with self._lock:
+            intervals = [self.poll_interval(config) for _, _, _, config in self._heap
+                         if config.get('enabled', True)]
+        return min(intervals) if intervals else self.default_interval
+
+    def rebuild(self, configs, now=None):
+        """重建调度队列（加载方案或任务增删改时调用）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            # 未变化的任务保留原来的下次检测时间
+            scheduled = {id(entry[3]): entry[0] for entry in self._heap}
+            self._heap = []
+            self._tracked = set()
+            for config in configs:
+                if id(config) in self._running:
+                    # 正在检测的任务由 reschedule 重新排队
+                    self._tracked.add(id(config))
+                else:
+                    due = scheduled.get(id(config), now)
+                    self._push(config, max(due, self.cooldown_until(config)))
+            self._running &= self._tracked
+
+    def reset(self, configs, now=None):
+        """开始监控时重建调度队列，所有任务（冷却中的除外）立即到期"""
+        with self._lock:
+            self._running.clear()
+            self._heap = []
+        self.rebuild(configs, now)
+
+    def add(self, config, now=None):
+        """添加一个任务，立即到期"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._push(config, max(now, self.cooldown_until(config)))
+
+    @staticmethod
+    def cooldown_until(config):
+        """任务冷却结束的时间"""
+        return config.get('last_executed', 0) + config.get('cooldown', 5)
+
+    def _push(self, config, due):
+        self._tracked.add(id(config))
+        heapq.heappush(self._heap, (due, -config.get('priority', 0), next(self._counter), config))
+        self._changed.set()
+
+    def reschedule(self, config, now=None, retry=False):
+        """
+        任务检测完成后重新排队：下次检测时间取检测间隔与冷却结束时间中较晚者
+        :param retry: 任务因执行通道忙碌未能检测，下一帧立即重试（不等待检测间隔）
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if id(config) not in self._running:
+                return  # 检测期间任务已被删除或替换
+            self._running.discard(id(config))
+            interval = 0 if retry else self.poll_interval(config)
+            self._push(config, max(now + interval, self.cooldown_until(config)))
+
+    def expedite(self, now=None):
+        """间隔恢复后让已排队的任务按当前间隔提前到期（不早于冷却结束）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            heap = []
+            for due, priority, seq, config in self._heap:
+                due = min(due, max(now + self.poll_interval(config), self.cooldown_until(config)))
+                heap.append((due, priority, seq, config))
+            heapq.heapify(heap)
+            self._heap = heap
+        self._changed.set()
+
+    def make_due(self, configs, now=None):
+        """让指定任务立即到期（不早于冷却结束），正在检测的任务不受影响"""
+        now = time.time() if now is None else now
+        ids = {id(config) for config in configs}
+        with self._lock:
+            changed = False
+            for index, (due, priority, seq, config) in enumerate(self._heap):
+                if id(config) in ids:
+                    new_due = max(now, self.cooldown_until(config))
+                    if new_due < due:
+                        self._heap[index] = (new_due, priority, seq, config)
+                        changed = True
+            if changed:
+                heapq.heapify(self._heap)
+        return changed
+
+    def pop_due(self, now=None):
+        """取出所有已到期的任务，按优先级从高到低排列"""
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                if id(entry[3]) in self._tracked:
+                    self._running.add(id(entry[3]))
+                    due.append(entry)
+        due.sort(key=lambda entry: (entry[1], entry[2]))
+        return [entry[3] for entry in due]
+
+    def wait_due(self, timeout=0.5, not_before=0):
+        """
+        等待到有任务到期或调度队列变化（最长timeout秒），返回是否已有任务到期
+        :param not_before: 在此时间之前不视为到期（用于限制截图频率）
+        """
+        next_due = self.next_due()
+        wait = max(next_due, not_before) - time.time() if next_due is not None else timeout
+        if wait <= 0:
+            return True
+        self._changed.wait(min(wait, timeout))
+        self._changed.clear()
+        return False
+
+    def wake(self):
+        """唤醒正在等待的线程"""
+        self._changed.set()
+
+    def next_due(self):
+        """最早到期任务的时间，没有任务时返回None"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._heap)
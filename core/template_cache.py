@@ -0,0 +1,173 @@
+"""模板缓存 - 模板图片只在加载/编辑时转换一次"""
+
+import hashlib
+import threading
+import weakref
+import numpy as np
+import cv2
+from core.frame import resize_image
+
+
+class CompiledTemplate:
+    """预先转换好的模板数据（BGR/灰度/缩放/金字塔）"""
+
+    def __init__(self, key, bgr, gray=None):
+        self.key = key
+        self.bgr = np.ascontiguousarray(bgr)
+        self.gray = gray if gray is not None else cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        self.height, self.width = self.bgr.shape[:2]
+        self._variants = {(False, 1.0): self.bgr, (True, 1.0): self.gray}
+        self._pyramid = {}
+        self._lock = threading.Lock()  # 多个匹配线程可能同时生成缩放/金字塔
+
+    def get(self, gray=False, scale=1.0):
+        """获取BGR或灰度数组，scale不为1时返回缩放后的版本（首次访问时生成）"""
+        variant = self._variants.get((gray, scale))
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get((gray, scale))
+                if variant is None:
+                    variant = resize_image(self.gray if gray else self.bgr, scale)
+                    self._variants[(gray, scale)] = variant
+        return variant
+
+    def pyramid(self, level, gray=False, scale=1.0):
+        """获取第level层金字塔（每层缩小一半，首次访问时生成）"""
+        levels = self._pyramid.get((gray, scale))
+        if levels is None or len(levels) <= level:
+            base = self.get(gray, scale)
+            with self._lock:
+                levels = self._pyramid.setdefault((gray, scale), [base])
+                while len(levels) <= level:
+                    levels.append(cv2.pyrDown(levels[-1]))
+        return levels[level]
+
+
+class TemplateCache:
+    """模板注册表
+
+    以图片内容哈希为键缓存转换结果，相同内容的模板共享同一份数组。
+    同时记录图片对象到哈希的映射，避免每次匹配都重新计算哈希。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._compiled = {}  # {内容哈希: CompiledTemplate}
+        self._keys = {}  # {id(image): (弱引用, 内容哈希)}
+        self._shared = {}  # {内容哈希: (BGR数组, 灰度数组)} 其他进程共享的只读模板（clear时保留）
+
+    @staticmethod
+    def content_key(image):
+        """计算模板内容哈希"""
+        digest = hashlib.md5()
+        digest.update(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, image):
+        """获取模板的编译结果（不存在时立即编译）"""
+        if image is None:
+            return None
+
+        entry = self._keys.get(id(image))
+        if entry is not None and entry[0]() is image:
+            compiled = self._compiled.get(entry[1])
+            if compiled is not None:
+                return compiled
+
+        return self._compile(image)
+
+    def _compile(self, image):
+        """转换并登记模板"""
+        key = self.content_key(image)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                shared = self._shared.get(key)
+                if shared is not None:
+                    compiled = CompiledTemplate(key, *shared)
+                else:
+                    rgb = image if image.mode == 'RGB' else image.convert('RGB')
+                    bgr = cv2.cvtColor(np.asarray(rgb), cv2.COLOR_RGB2BGR)
+                    compiled = CompiledTemplate(key, bgr)
+                self._compiled[key] = compiled
+
+            image_id = id(image)
+            ref = weakref.ref(image, lambda _, image_id=image_id: self._forget(image_id))
+            self._keys[image_id] = (ref, key)
+        return compiled
+
+    def _forget(self, image_id):
+        """图片对象被回收时移除映射"""
+        with self._lock:
+            entry = self._keys.get(image_id)
+            if entry is not None and entry[0]() is None:
+                del self._keys[image_id]
+
+    def invalidate(self, image):
+        """使某个模板的缓存失效（条件被编辑或删除时调用）"""
+        if image is None:
+            return
+
+        with self._lock:
+            entry = self._keys.pop(id(image), None)
+            if entry is None:
+                return
+            key = entry[1]
+            # 仍有其他图片对象引用同一内容时保留编译结果
+            if not any(other_key == key for _, other_key in self._keys.values()):
+                self._compiled.pop(key, None)
+
+    def attach_shared(self, arrays):
+        """登记其他进程已转换好的模板 {内容哈希: (BGR数组, 灰度数组)}，相同内容的模板不再重复转换"""
+        with self._lock:
+            self._shared.update(arrays)
+
+    def detach_shared(self):
+        """移除其他进程共享的模板及其编译结果（共享内存关闭前调用，之后用到时重新转换）"""
+        with self._lock:
+            keys = set(self._shared)
+            self._shared.clear()
+            for key in keys:
+                self._compiled.pop(key, None)
+            self._keys = {image_id: entry for image_id, entry in self._keys.items() if entry[1] not in keys}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._compiled.clear()
+            self._keys.clear()
+
+    def compile_config(self, config):
+        """预编译监控配置中的所有模板"""
+        for template in iter_config_templates(config):
+            self.get(template)
+
+    def release_config(self, config, keep=None):
+        """释放监控配置中的所有模板（keep 配置中仍在使用的除外）"""
+        kept_ids = {id(template) for template in iter_config_templates(keep)} if keep else set()
+        for template in iter_config_templates(config):
+            if id(template) not in kept_ids:
+                self.invalidate(template)
+
+    def __len__(self):
+        return len(self._compiled)
+
+
+def iter_config_templates(config):
+    """遍历监控配置（或画面状态定义）中的所有模板图片（旧版模板、统一条件、IF条件、画面状态条件）"""
+    if config.get('template') is not None:
+        yield config['template']
+
+    for condition in config.get('unified_conditions', []) + config.get('conditions', []):
+        if condition.get('type') == 'image' and condition.get('template') is not None:
+            yield condition['template']
+
+    for pair in config.get('if_pairs', []):
+        for condition in pair.get('conditions', []):
+            if condition.get('type') == 'image' and condition.get('template') is not None:
+                yield condition['template']
+
+
+# 全局模板缓存（监控器与配置对话框共用）
+template_cache = TemplateCache()
@@ -0,0 +1,192 @@
+"""sendevent 触摸注入 - 直接向触摸屏输入设备写入多点触控事件
+
+input tap / input swipe 每次都要在设备上启动一个 app_process（低端设备上需要数百毫秒），
+sendevent 只是一个很小的原生命令；整条滑动轨迹作为一次连续手势发送，中途不抬起手指。
+生成的命令通过 ADBManager.shell（持久shell会话）执行，也可以加入 InputBatch。
+"""
+
+import itertools
+import re
+import threading
+from core.trajectory_utils import densify_trajectory
+
+# Linux 输入事件类型和代码
+EV_SYN = 0
+EV_KEY = 1
+EV_ABS = 3
+SYN_REPORT = 0
+BTN_TOUCH = 330
+ABS_MT_SLOT = 47
+ABS_MT_POSITION_X = 53
+ABS_MT_POSITION_Y = 54
+ABS_MT_TRACKING_ID = 57
+ABS_MT_PRESSURE = 58
+
+
+def parse_touch_devices(output):
+    """
+    从 getevent -p 的输出中找出多点触控设备（支持 ABS_MT_POSITION_X/Y 和 ABS_MT_TRACKING_ID）
+    :return: {设备路径: (X最大值, Y最大值, 是否支持压力)}
+    """
+    devices = {}
+    for block in re.split(r'^add device \d+:\s*', output, flags=re.MULTILINE)[1:]:
+        path = block.split()[0]
+        max_x = re.search(r'\b0035\s*:.*?max\s+(\d+)', block)
+        max_y = re.search(r'\b0036\s*:.*?max\s+(\d+)', block)
+        if max_x and max_y and re.search(r'\b0039\s*:', block):
+            devices[path] = (int(max_x.group(1)), int(max_y.group(1)),
+                             re.search(r'\b003a\s*:', block) is not None)
+    return devices
+
+
+def rotate_to_natural(x, y, display):
+    """
+    当前方向的屏幕坐标换算为自然方向（旋转0，与触摸屏坐标轴一致）的坐标
+    :param display: (自然方向宽, 自然方向高, 旋转 0-3)
+    """
+    width, height, rotation = display
+    if rotation == 1:  # 逆时针旋转90度：屏幕左边是自然方向的上边
+        return width - y, x
+    if rotation == 2:
+        return width - x, height - y
+    if rotation == 3:  # 顺时针旋转90度：屏幕左边是自然方向的下边
+        return y, height - x
+    return x, y
+
+
+class SendeventTouchInjector:
+    """sendevent 触摸注入（多点触控 B 协议，使用0号槽位）
+
+    触摸设备和触控坐标范围由 DeviceEventMonitor.get_device_info 查找（与设备录制使用同一套换算），
+    再按 getevent -p 中各设备的能力确认。屏幕坐标是当前方向的坐标，先按屏幕旋转换算到自然方向，
+    再按显示分辨率（有分辨率覆盖时以覆盖为准）缩放为触控坐标；旋转和分辨率在每个手势前刷新（缓存0.5秒）。
+    """
+
+    def __init__(self, adb, step_ms=20):
+        """
+        :param step_ms: 滑动时相邻两次移动事件的间隔（毫秒）
+        """
+        self.adb = adb
+        self.step_ms = step_ms
+        self.device = None
+        self.max_x = 0
+        self.max_y = 0
+        self.display = None  # (自然方向宽, 自然方向高, 旋转)
+        self.has_pressure = False
+        self._tracking_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """查找触摸设备和坐标范围，设备不支持时返回False"""
+        from core.device_event_monitor import DeviceEventMonitor
+
+        monitor = DeviceEventMonitor(self.adb)
+        if not monitor.get_device_info():
+            return False
+
+        # get_device_info 按名称查找，找不到时会给出默认设备，需按能力确认是多点触控屏
+        devices = parse_touch_devices(self.adb.shell("getevent -p") or "")
+        if not devices:
+            print("[TouchInjector] 没有找到多点触控设备")
+            return False
+        if monitor.touch_device in devices:
+            self.device = monitor.touch_device
+            self.max_x, self.max_y = monitor.max_x, monitor.max_y
+            self.has_pressure = devices[self.device][2]
+        else:
+            self.device = next(iter(devices))
+            self.max_x, self.max_y, self.has_pressure = devices[self.device]
+
+        self.display = self.adb.get_display_state(max_age=0)
+        if not self.display or self.max_x <= 0 or self.max_y <= 0:
+            print("[TouchInjector] 无法获取屏幕分辨率或触控坐标范围")
+            return False
+
+        width, height, rotation = self.display
+        print(f"[TouchInjector] 使用 {self.device}，触控范围 {self.max_x}x{self.max_y}，"
+              f"屏幕 {width}x{height}，旋转 {rotation}")
+        return True
+
+    def _refresh_display(self):
+        """手势前刷新屏幕旋转和分辨率（获取失败时沿用上次的值）"""
+        self.display = self.adb.get_display_state() or self.display
+
+    # ---------- 事件 ----------
+
+    def _event(self, event_type, code, value):
+        return f"sendevent {self.device} {event_type} {code} {value}"
+
+    def _position(self, x, y):
+        """当前方向的屏幕坐标换算为触控坐标"""
+        x, y = rotate_to_natural(x, y, self.display)
+        raw_x = round(x * self.max_x / self.display[0])
+        raw_y = round(y * self.max_y / self.display[1])
+        return (max(0, min(raw_x, self.max_x)),
+                max(0, min(raw_y, self.max_y)))
+
+    def _down(self, x, y):
+        with self._lock:
+            tracking_id = next(self._tracking_ids) % 65535
+        raw_x, raw_y = self._position(x, y)
+        events = [
+            self._event(EV_ABS, ABS_MT_SLOT, 0),
+            self._event(EV_ABS, ABS_MT_TRACKING_ID, tracking_id),
+            self._event(EV_KEY, BTN_TOUCH, 1),
+            self._event(EV_ABS, ABS_MT_POSITION_X, raw_x),
+            self._event(EV_ABS, ABS_MT_POSITION_Y, raw_y),
+        ]
+        if self.has_pressure:
+            events.append(self._event(EV_ABS, ABS_MT_PRESSURE, 50))
+        events.append(self._event(EV_SYN, SYN_REPORT, 0))
+        return events
+
+    def _move(self, x, y):
+        raw_x, raw_y = self._position(x, y)
+        return [
+            self._event(EV_ABS, ABS_MT_POSITION_X, raw_x),
+            self._event(EV_ABS, ABS_MT_POSITION_Y, raw_y),
+            self._event(EV_SYN, SYN_REPORT, 0),
+        ]
+
+    def _up(self):
+        return [
+            self._event(EV_ABS, ABS_MT_TRACKING_ID, -1),
+            self._event(EV_KEY, BTN_TOUCH, 0),
+            self._event(EV_SYN, SYN_REPORT, 0),
+        ]
+
+    # ---------- 脚本 ----------
+
+    def tap_script(self, x, y):
+        """点击的shell脚本"""
+        self._refresh_display()
+        return "; ".join(self._down(x, y) + self._up())
+
+    def path_script(self, points):
+        """
+        连续手势的shell脚本
+        :param points: [(x, y, 相对时间ms), ...]
+        :return: (脚本, 持续时间秒)
+        """
+        self._refresh_display()
+        points = densify_trajectory(points, self.step_ms)
+        x, y, last_time = points[0]
+        commands = self._down(x, y)
+        last = (x, y)
+        for x, y, t in points[1:]:
+            wait = (t - last_time) / 1000
+            if (x, y) == last:
+                continue  # 位置不变（长按）时只累计等待
+            if wait > 0:
+                commands.append(f"sleep {wait:.3f}")
+            commands += self._move(x, y)
+            last, last_time = (x, y), t
+        wait = (points[-1][2] - last_time) / 1000
+        if wait > 0:
+            commands.append(f"sleep {wait:.3f}")
+        commands += self._up()
+        return "; ".join(commands), (points[-1][2] - points[0][2]) / 1000
+
+    def swipe_script(self, x1, y1, x2, y2, duration=300):
+        """滑动（或原地长按）的shell脚本，返回 (脚本, 持续时间秒)"""
+        return self.path_script([(x1, y1, 0), (x2, y2, duration)])
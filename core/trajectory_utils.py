@@ -211,4 +211,24 @@ def interpolate_trajectory(trajectory, target_duration_ms):
             sampled.append(interpolated[-1])
         return sampled
     
-    return interpolated
\ No newline at end of file
+    return interpolated
+
+def densify_trajectory(points, step_ms):
+    """
+    在相邻轨迹点之间按时间间隔插入移动点（用于连续手势注入）
+    
+    Args:
+        points: [(x, y, time_ms), ...] 轨迹点列表，时间为相对时间
+        step_ms: 相邻两点的最大时间间隔（毫秒）
+    
+    Returns:
+        插值后的轨迹点列表（包含原始的起点和终点）
+    """
+    result = [points[0]]
+    for (x1, y1, t1), (x2, y2, t2) in zip(points, points[1:]):
+        steps = max(1, int((t2 - t1) // step_ms))
+        for i in range(1, steps + 1):
+            ratio = i / steps
+            result.append((round(x1 + (x2 - x1) * ratio), round(y1 + (y2 - y1) * ratio),
+                           t1 + (t2 - t1) * ratio))
+    return result
@@ -375,7 +375,7 @@ class AdvancedMonitorDialog(QDialog):
     def on_variable_updated(self, name, value):
         """变量更新回调"""
         if self.auto_monitor:
-            self.auto_monitor.global_variables[name] = value
+            self.auto_monitor.set_global_variable(name, value)
             self.log(f"📥 接收变量: {name} = {value}")
     
     def on_auto_push_toggled(self, checked):
@@ -1033,7 +1033,7 @@ class DocumentationDialog(QDialog):
         """变量更新"""
         # 同步到auto_monitor
         if self.auto_monitor:
-            self.auto_monitor.global_variables[name] = value
+            self.auto_monitor.set_global_variable(name, value)
     
     def add_broadcast_config(self):
         """添加广播配置"""
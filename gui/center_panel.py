@@ -398,12 +398,14 @@ class CenterPanel(QWidget):
         
         self.save_scheme_btn = QPushButton("💾 保存方案")
         self.load_scheme_btn = QPushButton("📂 加载方案")
+        self.screen_state_btn = QPushButton("🖼 画面状态")
         
-        for btn in [self.save_scheme_btn, self.load_scheme_btn]:
+        for btn in [self.save_scheme_btn, self.load_scheme_btn, self.screen_state_btn]:
             btn.setMinimumHeight(28)
         
         scheme_btn_layout.addWidget(self.save_scheme_btn)
         scheme_btn_layout.addWidget(self.load_scheme_btn)
+        scheme_btn_layout.addWidget(self.screen_state_btn)
         
         # 添加到右侧布局
         right_layout.addLayout(interval_layout)
@@ -7,7 +7,7 @@ from datetime import datetime
 import time
 import urllib.request
 from core.auto_monitor import AutoMonitor
-from gui.monitor_dialog import MonitorTaskDialog
+from gui.monitor_dialog import MonitorTaskDialog, ScreenStateListDialog
 from gui.settings_dialog import SettingsDialog
 from utils.config import VERSION
 from gui.device_manager import DeviceManager
@@ -79,6 +79,12 @@ class MainWindow(QMainWindow):
                 self.refresh_monitor_task_list()
                 QMessageBox.information(self, "成功", "监控方案已加载")
 
+    def edit_screen_states(self):
+        """编辑画面状态"""
+        dialog = ScreenStateListDialog(self.auto_monitor, self.controller, self)
+        if dialog.exec():
+            self.auto_monitor.set_screen_states(dialog.get_states())
+
     def update_mouse_coordinates(self):
         """更新鼠标坐标显示 - 支持设备模式和模拟器模式"""
         try:
@@ -405,6 +411,9 @@ class MainWindow(QMainWindow):
         interval = settings["performance"]["coord_update_interval"]
         self.coord_timer.setInterval(interval)
         
+        # 应用监控性能选项（区域变化检测、自适应间隔、并行匹配、输入合并、触摸注入方式）
+        self.auto_monitor.apply_performance_settings(settings["performance"])
+        
         # 应用日志设置
         max_lines = settings["ui"]["max_log_lines"]
         doc = self.log_text.document()
@@ -548,6 +557,7 @@ class MainWindow(QMainWindow):
         self.center_panel.remove_task_btn.clicked.connect(self.remove_monitor_task)
         self.center_panel.save_scheme_btn.clicked.connect(self.save_monitor_scheme)
         self.center_panel.load_scheme_btn.clicked.connect(self.load_monitor_scheme)
+        self.center_panel.screen_state_btn.clicked.connect(self.edit_screen_states)
         
         # 随机化设置
         self.center_panel.random_check.toggled.connect(self.on_randomization_changed)
@@ -5,6 +5,7 @@ from PIL import Image
 import numpy as np
 from core.window_capture import WindowCapture
 from core.window_capture import WindowCapture
+from core.template_cache import template_cache
 import json
 import time
 import os
@@ -62,6 +63,31 @@ class MonitorTaskDialog(QDialog):
         self.cooldown_spin.setSuffix(" 秒")
         param_layout.addRow("冷却时间:", self.cooldown_spin)
 
+        self.poll_interval_spin = QDoubleSpinBox()
+        self.poll_interval_spin.setRange(0, 60)
+        self.poll_interval_spin.setDecimals(2)
+        self.poll_interval_spin.setSingleStep(0.05)
+        self.poll_interval_spin.setSuffix(" 秒")
+        self.poll_interval_spin.setSpecialValueText("跟随全局检查间隔")
+        self.poll_interval_spin.setToolTip("该任务的检测间隔，需要快速响应的任务可以设置得更短")
+        param_layout.addRow("检测间隔:", self.poll_interval_spin)
+
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(-100, 100)
+        self.priority_spin.setToolTip("同时到期的任务中，优先级高的先检测、先执行")
+        param_layout.addRow("优先级:", self.priority_spin)
+
+        self.concurrency_combo = QComboBox()
+        self.concurrency_combo.addItem("串行 (与其他任务排队执行)", 'serial')
+        self.concurrency_combo.addItem("并行 (独立执行，不等待其他任务)", 'parallel')
+        self.concurrency_combo.setToolTip("动作执行期间检测不会暂停；串行任务同一时间只执行一个")
+        param_layout.addRow("执行方式:", self.concurrency_combo)
+
+        self.screen_states_input = QLineEdit()
+        self.screen_states_input.setPlaceholderText("留空表示所有画面，多个用逗号分隔")
+        self.screen_states_input.setToolTip("只在当前画面属于这些画面状态时检测该任务（画面状态在方案的\"画面状态\"中定义）")
+        param_layout.addRow("适用画面:", self.screen_states_input)
+
         param_group.setLayout(param_layout)
 
         # 监控任务模式
@@ -362,6 +388,11 @@ class MonitorTaskDialog(QDialog):
             self.name_input.setText(self.task_config.get('name', ''))
             self.enabled_check.setChecked(self.task_config.get('enabled', True))
             self.cooldown_spin.setValue(self.task_config.get('cooldown', 5))
+            self.poll_interval_spin.setValue(self.task_config.get('poll_interval', 0))
+            self.priority_spin.setValue(self.task_config.get('priority', 0))
+            concurrency_index = self.concurrency_combo.findData(self.task_config.get('concurrency', 'serial'))
+            self.concurrency_combo.setCurrentIndex(max(0, concurrency_index))
+            self.screen_states_input.setText(', '.join(self.task_config.get('screen_states', [])))
 
             # 加载任务模式
             task_mode = self.task_config.get('task_mode')
@@ -624,6 +655,11 @@ class MonitorTaskDialog(QDialog):
             'name': task_name,
             'enabled': self.enabled_check.isChecked(),
             'cooldown': self.cooldown_spin.value(),
+            'poll_interval': self.poll_interval_spin.value(),
+            'priority': self.priority_spin.value(),
+            'concurrency': self.concurrency_combo.currentData(),
+            'screen_states': [name.strip() for name in self.screen_states_input.text().replace('，', ',').split(',')
+                              if name.strip()],
             'unified_conditions': self.unified_conditions,
             'condition_logic': self.condition_logic_combo.currentText()
         }
@@ -1463,10 +1499,34 @@ class MultiConditionDialog(QDialog):
         threshold_layout.addWidget(self.threshold_spin)
         threshold_layout.addStretch()
         
+        # 匹配性能选项
+        performance_group = QGroupBox("匹配选项")
+        performance_layout = QFormLayout()
+        
+        self.pyramid_spin = QSpinBox()
+        self.pyramid_spin.setRange(0, 4)
+        self.pyramid_spin.setValue(0)
+        self.pyramid_spin.setSpecialValueText("关闭")
+        self.pyramid_spin.setToolTip("先在缩小的画面上粗略匹配，再在候选位置附近精确匹配\n"
+                                     "每层缩小一半，适合大区域/全屏检测，模板过小时自动减少层数")
+        performance_layout.addRow("金字塔层数:", self.pyramid_spin)
+        
+        self.grayscale_check = QCheckBox("灰度匹配")
+        self.grayscale_check.setToolTip("只比较亮度，匹配速度约为彩色的3倍\n颜色是区分关键时请勿开启")
+        performance_layout.addRow("", self.grayscale_check)
+        
+        self.scale_combo = QComboBox()
+        for text, scale in [("100% (原始)", 1.0), ("75%", 0.75), ("50%", 0.5), ("25%", 0.25)]:
+            self.scale_combo.addItem(text, scale)
+        self.scale_combo.setToolTip("画面区域与模板按同一比例缩小后再匹配\n50%时计算量约为原来的1/4")
+        performance_layout.addRow("匹配缩放:", self.scale_combo)
+        performance_group.setLayout(performance_layout)
+        
         layout.addWidget(region_group)
         layout.addWidget(template_group)
         layout.addWidget(expect_group)
         layout.addLayout(threshold_layout)
+        layout.addWidget(performance_group)
         
         # 按钮
         buttons = QDialogButtonBox(
@@ -1495,6 +1555,10 @@ class MultiConditionDialog(QDialog):
                 self.expect_not_exist_radio.setChecked(True)
             
             self.threshold_spin.setValue(self.condition.get('threshold', 0.85))
+            self.pyramid_spin.setValue(self.condition.get('pyramid_levels', 0))
+            self.grayscale_check.setChecked(self.condition.get('grayscale', False))
+            scale_index = self.scale_combo.findData(self.condition.get('scale', 1.0))
+            self.scale_combo.setCurrentIndex(max(0, scale_index))
     
     def select_region(self):
         """选择检测区域"""
@@ -1579,6 +1643,8 @@ class MultiConditionDialog(QDialog):
             window_h = min(window_h, window_height - window_y)
             
             if window_w > 0 and window_h > 0:
+                # 模板被重新截取，旧模板的缓存失效
+                template_cache.invalidate(self.template_image)
                 self.template_image = screenshot.crop((window_x, window_y,
                                                        window_x + window_w,
                                                        window_y + window_h))
@@ -1650,7 +1716,10 @@ class MultiConditionDialog(QDialog):
             'region': self.region,
             'template': self.template_image,
             'expect_exist': self.expect_exist_radio.isChecked(),
-            'threshold': self.threshold_spin.value()
+            'threshold': self.threshold_spin.value(),
+            'pyramid_levels': self.pyramid_spin.value(),
+            'grayscale': self.grayscale_check.isChecked(),
+            'scale': self.scale_combo.currentData()
         }
 
 
@@ -2019,3 +2088,260 @@ class ActionSequenceDialog(QDialog):
         }
 
 
+
+
+class ScreenStateDialog(QDialog):
+    """画面状态配置对话框"""
+    
+    def __init__(self, controller, parent=None, state=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.state = state or {}
+        self.conditions = list(self.state.get('conditions', []))
+        
+        self.setWindowTitle("配置画面状态")
+        self.setModal(True)
+        self.setMinimumSize(500, 400)
+        
+        self.initUI()
+        self.load_state()
+    
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        
+        # 状态名称
+        name_layout = QHBoxLayout()
+        name_layout.addWidget(QLabel("状态名称:"))
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("例如：主界面、战斗中")
+        name_layout.addWidget(self.name_input)
+        layout.addLayout(name_layout)
+        
+        # 识别条件
+        condition_group = QGroupBox("识别条件")
+        condition_layout = QVBoxLayout()
+        
+        logic_layout = QHBoxLayout()
+        logic_layout.addWidget(QLabel("条件逻辑:"))
+        self.logic_combo = QComboBox()
+        self.logic_combo.addItems(["AND (全部满足)", "OR (任一满足)", "NOT (都不满足)"])
+        logic_layout.addWidget(self.logic_combo)
+        logic_layout.addStretch()
+        condition_layout.addLayout(logic_layout)
+        
+        self.condition_list = QListWidget()
+        
+        cond_btn_layout = QHBoxLayout()
+        self.add_cond_menu_btn = QPushButton("添加条件")
+        cond_menu = QMenu()
+        cond_menu.addAction("变量条件", self.add_variable_condition)
+        cond_menu.addAction("图像检测", self.add_image_condition)
+        self.add_cond_menu_btn.setMenu(cond_menu)
+        
+        self.edit_cond_btn = QPushButton("编辑")
+        self.edit_cond_btn.clicked.connect(self.edit_condition)
+        self.remove_cond_btn = QPushButton("删除")
+        self.remove_cond_btn.clicked.connect(self.remove_condition)
+        
+        cond_btn_layout.addWidget(self.add_cond_menu_btn)
+        cond_btn_layout.addWidget(self.edit_cond_btn)
+        cond_btn_layout.addWidget(self.remove_cond_btn)
+        
+        condition_layout.addWidget(self.condition_list)
+        condition_layout.addLayout(cond_btn_layout)
+        condition_group.setLayout(condition_layout)
+        layout.addWidget(condition_group)
+        
+        # 按钮
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.validate_and_accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+    
+    def load_state(self):
+        """加载画面状态"""
+        if self.state:
+            self.name_input.setText(self.state.get('name', ''))
+            index = self.logic_combo.findText(self.state.get('logic', 'AND (全部满足)'))
+            self.logic_combo.setCurrentIndex(max(0, index))
+            self.refresh_condition_list()
+    
+    def add_variable_condition(self):
+        """添加变量条件"""
+        dialog = ConditionDialog(self)
+        if dialog.exec():
+            condition = dialog.get_condition()
+            condition['type'] = 'variable'
+            self.conditions.append(condition)
+            self.refresh_condition_list()
+    
+    def add_image_condition(self):
+        """添加图像条件"""
+        dialog = MultiConditionDialog(self.controller, self)
+        if dialog.exec():
+            condition = dialog.get_condition()
+            if condition:
+                condition['type'] = 'image'
+                self.conditions.append(condition)
+                self.refresh_condition_list()
+    
+    def edit_condition(self):
+        """编辑条件"""
+        current = self.condition_list.currentRow()
+        if current >= 0 and current < len(self.conditions):
+            condition = self.conditions[current]
+            if condition.get('type') == 'variable':
+                dialog = ConditionDialog(self, condition)
+                if dialog.exec():
+                    new_condition = dialog.get_condition()
+                    new_condition['type'] = 'variable'
+                    self.conditions[current] = new_condition
+            else:
+                dialog = MultiConditionDialog(self.controller, self, condition)
+                if dialog.exec():
+                    new_condition = dialog.get_condition()
+                    if new_condition:
+                        new_condition['type'] = 'image'
+                        self.conditions[current] = new_condition
+            self.refresh_condition_list()
+    
+    def remove_condition(self):
+        """删除条件"""
+        current = self.condition_list.currentRow()
+        if current >= 0:
+            del self.conditions[current]
+            self.refresh_condition_list()
+    
+    def refresh_condition_list(self):
+        """刷新条件列表"""
+        self.condition_list.clear()
+        for condition in self.conditions:
+            if condition.get('type') == 'variable':
+                var = condition.get('variable', '')
+                op = condition.get('operator', '==')
+                val = condition.get('value', 0)
+                text = f"[变量] {var} {op} {val}"
+            else:
+                region = condition.get('region')
+                region_text = "全屏" if not region else f"区域"
+                expect = "存在" if condition.get('expect_exist', True) else "不存在"
+                text = f"[图像] {region_text} - 期望{expect}"
+            self.condition_list.addItem(text)
+    
+    def validate_and_accept(self):
+        """验证并接受"""
+        if not self.name_input.text().strip():
+            QMessageBox.warning(self, "警告", "请输入状态名称")
+            return
+        if not self.conditions:
+            QMessageBox.warning(self, "警告", "请添加至少一个条件")
+            return
+        self.accept()
+    
+    def get_state(self):
+        """获取画面状态"""
+        return {
+            'name': self.name_input.text().strip(),
+            'logic': self.logic_combo.currentText(),
+            'conditions': self.conditions
+        }
+
+
+class ScreenStateListDialog(QDialog):
+    """画面状态管理对话框
+    
+    每帧按列表顺序判断当前画面属于哪个状态（取第一个满足的），
+    设置了"适用画面"的任务只在当前画面属于这些状态时检测。
+    """
+    
+    def __init__(self, auto_monitor, controller, parent=None):
+        super().__init__(parent)
+        self.auto_monitor = auto_monitor
+        self.controller = controller
+        self.states = list(auto_monitor.screen_states)
+        
+        self.setWindowTitle("画面状态")
+        self.setModal(True)
+        self.setMinimumSize(450, 350)
+        
+        self.initUI()
+        self.refresh_state_list()
+    
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        
+        hint = QLabel("按顺序识别当前画面，任务只在其\"适用画面\"中检测（未设置则始终检测）")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #666;")
+        layout.addWidget(hint)
+        
+        self.state_list = QListWidget()
+        self.state_list.itemDoubleClicked.connect(self.edit_state)
+        layout.addWidget(self.state_list)
+        
+        btn_layout = QHBoxLayout()
+        add_btn = QPushButton("添加")
+        add_btn.clicked.connect(self.add_state)
+        edit_btn = QPushButton("编辑")
+        edit_btn.clicked.connect(self.edit_state)
+        remove_btn = QPushButton("删除")
+        remove_btn.clicked.connect(self.remove_state)
+        up_btn = QPushButton("上移")
+        up_btn.clicked.connect(lambda: self.move_state(-1))
+        down_btn = QPushButton("下移")
+        down_btn.clicked.connect(lambda: self.move_state(1))
+        for btn in (add_btn, edit_btn, remove_btn, up_btn, down_btn):
+            btn_layout.addWidget(btn)
+        layout.addLayout(btn_layout)
+        
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+    
+    def refresh_state_list(self):
+        """刷新状态列表"""
+        self.state_list.clear()
+        for i, state in enumerate(self.states, 1):
+            logic = state.get('logic', 'AND').split(' ')[0]
+            self.state_list.addItem(f"{i}. {state.get('name', '')} ({logic}, {len(state.get('conditions', []))}个条件)")
+    
+    def add_state(self):
+        """添加画面状态"""
+        dialog = ScreenStateDialog(self.controller, self)
+        if dialog.exec():
+            self.states.append(dialog.get_state())
+            self.refresh_state_list()
+    
+    def edit_state(self):
+        """编辑画面状态"""
+        current = self.state_list.currentRow()
+        if 0 <= current < len(self.states):
+            dialog = ScreenStateDialog(self.controller, self, self.states[current])
+            if dialog.exec():
+                self.states[current] = dialog.get_state()
+                self.refresh_state_list()
+    
+    def remove_state(self):
+        """删除画面状态"""
+        current = self.state_list.currentRow()
+        if current >= 0:
+            del self.states[current]
+            self.refresh_state_list()
+    
+    def move_state(self, offset):
+        """调整画面状态顺序"""
+        current = self.state_list.currentRow()
+        target = current + offset
+        if current >= 0 and 0 <= target < len(self.states):
+            self.states[current], self.states[target] = self.states[target], self.states[current]
+            self.refresh_state_list()
+            self.state_list.setCurrentRow(target)
+    
+    def get_states(self):
+        """获取画面状态列表"""
+        return self.states
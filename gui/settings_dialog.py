@@ -111,6 +111,64 @@ class SettingsDialog(QDialog):
         self.min_check_interval.setToolTip("监控最小检查间隔，过小可能影响性能")
         
         monitor_layout.addRow("最小检查间隔:", self.min_check_interval)
+        
+        self.change_detection_check = QCheckBox("跳过未变化的区域")
+        self.change_detection_check.setChecked(False)
+        self.change_detection_check.setToolTip("检测区域画面与上次相比没有变化时直接复用上次的匹配结果\n"
+                                               "大区域中很小的目标出现时可能被当作未变化，"
+                                               "最多延迟“强制刷新间隔”次检测才被发现")
+        
+        self.change_tolerance = QDoubleSpinBox()
+        self.change_tolerance.setRange(0.0, 64.0)
+        self.change_tolerance.setValue(4.0)
+        self.change_tolerance.setSingleStep(1.0)
+        self.change_tolerance.setToolTip("区域颜色变化不超过该值时视为未变化（0-255）")
+        
+        self.change_refresh_ticks = QSpinBox()
+        self.change_refresh_ticks.setRange(0, 1000)
+        self.change_refresh_ticks.setValue(10)
+        self.change_refresh_ticks.setSuffix(" 次")
+        self.change_refresh_ticks.setToolTip("连续复用多少次后强制重新匹配")
+        
+        monitor_layout.addRow("", self.change_detection_check)
+        monitor_layout.addRow("变化容差:", self.change_tolerance)
+        monitor_layout.addRow("强制刷新间隔:", self.change_refresh_ticks)
+        
+        self.adaptive_interval_check = QCheckBox("自适应检查间隔")
+        self.adaptive_interval_check.setToolTip("长时间没有触发且画面不变时逐步放慢检查，触发或画面变化时立即恢复")
+        
+        self.adaptive_max_factor = QDoubleSpinBox()
+        self.adaptive_max_factor.setRange(1.0, 64.0)
+        self.adaptive_max_factor.setValue(8.0)
+        self.adaptive_max_factor.setSingleStep(1.0)
+        self.adaptive_max_factor.setSuffix(" 倍")
+        self.adaptive_max_factor.setToolTip("空闲时检查间隔最多放慢的倍数")
+        
+        monitor_layout.addRow("", self.adaptive_interval_check)
+        monitor_layout.addRow("最大放慢倍数:", self.adaptive_max_factor)
+        
+        self.eval_workers_spin = QSpinBox()
+        self.eval_workers_spin.setRange(0, max(1, os.cpu_count() or 1))
+        self.eval_workers_spin.setValue(0)
+        self.eval_workers_spin.setSpecialValueText("关闭")
+        self.eval_workers_spin.setSuffix(" 线程")
+        self.eval_workers_spin.setToolTip("同一帧的多个图像条件并行匹配，适合图像条件较多的方案（1表示关闭）")
+        
+        monitor_layout.addRow("并行匹配:", self.eval_workers_spin)
+        
+        self.batch_input_check = QCheckBox("合并连续输入命令")
+        self.batch_input_check.setChecked(True)
+        self.batch_input_check.setToolTip("动作序列和录制播放中间隔较短的点击/滑动/按键合并为一个脚本发送，在设备端按间隔执行")
+        
+        monitor_layout.addRow("", self.batch_input_check)
+        
+        self.touch_backend_combo = QComboBox()
+        self.touch_backend_combo.addItem("input 命令", "input")
+        self.touch_backend_combo.addItem("sendevent（低延迟）", "sendevent")
+        self.touch_backend_combo.setToolTip("sendevent 直接向触摸屏写入事件，不需要每次启动input进程，"
+                                            "滑动轨迹为一次连续手势；设备不支持时自动使用input命令")
+        
+        monitor_layout.addRow("触摸注入:", self.touch_backend_combo)
         monitor_group.setLayout(monitor_layout)
         
         # 坐标更新组
@@ -383,7 +441,15 @@ class SettingsDialog(QDialog):
             },
             "performance": {
                 "min_check_interval": 0.05,
-                "coord_update_interval": 50
+                "coord_update_interval": 50,
+                "change_detection": False,
+                "change_tolerance": 4.0,
+                "change_refresh_ticks": 10,
+                "adaptive_interval": False,
+                "adaptive_max_factor": 8.0,
+                "eval_workers": 0,
+                "batch_input": True,
+                "touch_backend": "input"
             },
             "record": {
                 "record_mouse_move": False,
@@ -422,6 +488,15 @@ class SettingsDialog(QDialog):
         performance = self.settings.get("performance", {})
         self.min_check_interval.setValue(performance.get("min_check_interval", 0.05))
         self.coord_update_interval.setValue(performance.get("coord_update_interval", 50))
+        self.change_detection_check.setChecked(performance.get("change_detection", False))
+        self.change_tolerance.setValue(performance.get("change_tolerance", 4.0))
+        self.change_refresh_ticks.setValue(performance.get("change_refresh_ticks", 10))
+        self.adaptive_interval_check.setChecked(performance.get("adaptive_interval", False))
+        self.adaptive_max_factor.setValue(performance.get("adaptive_max_factor", 8.0))
+        self.eval_workers_spin.setValue(performance.get("eval_workers", 0))
+        self.batch_input_check.setChecked(performance.get("batch_input", True))
+        self.touch_backend_combo.setCurrentIndex(
+            max(0, self.touch_backend_combo.findData(performance.get("touch_backend", "input"))))
         
         # 录制设置
         record = self.settings.get("record", {})
@@ -472,7 +547,15 @@ class SettingsDialog(QDialog):
             },
             "performance": {
                 "min_check_interval": self.min_check_interval.value(),
-                "coord_update_interval": self.coord_update_interval.value()
+                "coord_update_interval": self.coord_update_interval.value(),
+                "change_detection": self.change_detection_check.isChecked(),
+                "change_tolerance": self.change_tolerance.value(),
+                "change_refresh_ticks": self.change_refresh_ticks.value(),
+                "adaptive_interval": self.adaptive_interval_check.isChecked(),
+                "adaptive_max_factor": self.adaptive_max_factor.value(),
+                "eval_workers": self.eval_workers_spin.value(),
+                "batch_input": self.batch_input_check.isChecked(),
+                "touch_backend": self.touch_backend_combo.currentData()
             },
             "record": {
                 "record_mouse_move": self.record_mouse_move_check.isChecked(),
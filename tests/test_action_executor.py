@@ -0,0 +1,74 @@
+"""动作执行器：通道排队和停止"""
+
+import threading
+import time
+from core.action_executor import ActionExecutor, MAIN_LANE
+
+
+def test_same_task_is_not_queued_twice():
+    executor = ActionExecutor()
+    release = threading.Event()
+    try:
+        assert executor.submit(MAIN_LANE, 'a', release.wait)
+        assert executor.is_pending(MAIN_LANE, 'a')
+        assert not executor.submit(MAIN_LANE, 'a', release.wait)
+    finally:
+        release.set()
+        executor.stop()
+
+
+def test_busy_lane_queues_other_tasks():
+    executor = ActionExecutor()
+    release = threading.Event()
+    done = []
+    try:
+        executor.submit(MAIN_LANE, 'a', release.wait)
+        assert executor.submit(MAIN_LANE, 'b', done.append, 'b')
+        assert executor.is_pending(MAIN_LANE, 'b')
+        release.set()
+        deadline = time.time() + 2
+        while executor.is_pending(MAIN_LANE, 'b') and time.time() < deadline:
+            time.sleep(0.01)
+        assert done == ['b']
+    finally:
+        executor.stop()
+
+
+def test_stop_drops_queued_jobs():
+    executor = ActionExecutor()
+    release = threading.Event()
+    done = []
+    executor.submit(MAIN_LANE, 'a', release.wait)
+    executor.submit(MAIN_LANE, 'b', done.append, 'b')
+    threading.Timer(0.1, release.set).start()
+    executor.stop()
+    assert done == []
+
+
+def test_stop_waits_on_one_deadline():
+    executor = ActionExecutor()
+    release = threading.Event()
+    for lane in ('a', 'b', 'c'):
+        executor.submit(lane, lane, release.wait)
+    started = time.monotonic()
+    executor.stop(timeout=0.3)
+    # 三个通道都在忙，总等待时间不超过一个timeout
+    assert time.monotonic() - started < 0.6
+    release.set()
+
+
+def test_prune_closes_unused_lanes():
+    executor = ActionExecutor()
+    release = threading.Event()
+    try:
+        executor.submit(MAIN_LANE, 'a', release.wait)
+        executor.submit('task-1', 'b', release.wait)
+        executor.submit('task-2', 'c', lambda: None)
+        threads = dict(executor._lanes)
+        executor.prune({MAIN_LANE, 'task-1'})
+        assert set(executor._lanes) == {MAIN_LANE, 'task-1'}
+        threads['task-2'].join(1)
+        assert not threads['task-2']._thread.is_alive()
+    finally:
+        release.set()
+        executor.stop()
@@ -0,0 +1,64 @@
+"""自适应检测间隔：空闲时放大，触发或画面变化时恢复"""
+
+import numpy as np
+import pytest
+from core.adaptive_interval import AdaptiveInterval
+from core.frame import Frame
+
+
+def frame(value=100):
+    return Frame(np.full((240, 108, 3), value, np.uint8))
+
+
+def idle(adaptive, ticks):
+    for _ in range(ticks):
+        adaptive.update(frame(), False, 0.0)
+
+
+def test_disabled_keeps_interval():
+    adaptive = AdaptiveInterval()
+    idle(adaptive, 50)
+    assert adaptive.factor == 1.0
+    assert adaptive.apply(0.5) == 0.5
+
+
+def test_backs_off_after_idle_ticks_up_to_max_factor():
+    adaptive = AdaptiveInterval(enabled=True, max_factor=4.0, idle_ticks=3, backoff=2.0)
+    idle(adaptive, 3)  # 第一帧建立签名，之后两帧空闲
+    assert adaptive.factor == 1.0
+    idle(adaptive, 1)
+    assert adaptive.factor == 2.0
+    assert adaptive.apply(0.5) == 1.0
+    idle(adaptive, 10)
+    assert adaptive.factor == 4.0
+
+
+def test_hit_resets_factor():
+    adaptive = AdaptiveInterval(enabled=True, idle_ticks=1, backoff=2.0)
+    idle(adaptive, 3)
+    assert adaptive.factor > 1.0
+    assert adaptive.update(frame(), True, 0.0) is True
+    assert adaptive.factor == 1.0
+    assert adaptive.update(frame(), True, 0.0) is False  # 已是原间隔，无需提前
+
+
+def test_frame_change_resets_factor():
+    adaptive = AdaptiveInterval(enabled=True, idle_ticks=1, backoff=2.0)
+    idle(adaptive, 3)
+    assert adaptive.update(frame(200), False, 0.0) is True
+    assert adaptive.factor == 1.0
+
+
+def test_slow_evaluation_stretches_interval():
+    adaptive = AdaptiveInterval(enabled=True, load_margin=1.25)
+    adaptive.update(frame(), False, 0.4)
+    assert adaptive.apply(0.1) == pytest.approx(0.5)
+
+
+def test_configure_resets_state():
+    adaptive = AdaptiveInterval(enabled=True, idle_ticks=1, backoff=2.0)
+    idle(adaptive, 3)
+    adaptive.configure(max_factor=0.5)
+    assert adaptive.factor == 1.0
+    assert adaptive.max_factor == 1.0
+    assert adaptive.eval_time == 0.0
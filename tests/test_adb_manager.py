@@ -0,0 +1,111 @@
+"""ADBManager 辅助函数"""
+
+from core.adb_manager import InputBatch, parse_display_state
+
+
+def test_parse_display_state():
+    output = "Physical size: 1080x2400\n    SurfaceOrientation: 1\n"
+    assert parse_display_state(output) == (1080, 2400, 1)
+
+
+def test_parse_display_state_override():
+    output = "Physical size: 1080x2400\nOverride size: 720x1600\n    SurfaceOrientation: 3\n"
+    assert parse_display_state(output) == (720, 1600, 3)
+
+
+def test_parse_display_state_without_orientation():
+    assert parse_display_state("Physical size: 1080x2400\n") == (1080, 2400, 0)
+    assert parse_display_state("") is None
+
+
+class FakeADB:
+    """记录发送的脚本"""
+
+    def __init__(self):
+        self.scripts = []
+
+    def get_touch_injector(self):
+        return None
+
+    def shell(self, command, root=False, timeout=None):
+        self.scripts.append(command)
+        return ""
+
+
+def test_batch_merges_commands():
+    adb = FakeADB()
+    with InputBatch(adb) as batch:
+        batch.tap(1, 2)
+        batch.sleep(0.1)
+        batch.sleep(0.1)
+        batch.keyevent(4)
+    assert adb.scripts == ["input tap 1 2; sleep 0.200; input keyevent 4"]
+
+
+def test_batch_long_sleep_flushes():
+    adb = FakeADB()
+    batch = InputBatch(adb, max_wait=0.05)
+    batch.tap(1, 2)
+    batch.sleep(0.1)
+    assert adb.scripts == ["input tap 1 2"]
+    assert batch.pending == 0
+
+
+def test_batch_flushes_at_duration_limit():
+    adb = FakeADB()
+    batch = InputBatch(adb, max_wait=1.0)
+    for _ in range(10):
+        batch.tap(1, 2)
+        batch.sleep(0.3)
+    batch.flush()
+    # 每个脚本预计执行时间不超过约1秒
+    assert len(adb.scripts) == 3
+    assert all(script.count("input tap") <= 4 for script in adb.scripts)
+
+
+def test_batch_flushes_at_command_limit():
+    adb = FakeADB()
+    batch = InputBatch(adb, max_commands=5)
+    for _ in range(12):
+        batch.keyevent(4)
+    assert [script.count("keyevent") for script in adb.scripts] == [5, 5]
+    assert batch.pending == 2
+
+
+def test_batch_flushes_at_size_limit():
+    adb = FakeADB()
+    batch = InputBatch(adb, max_commands=1000, max_bytes=200)
+    for _ in range(40):
+        batch.text("abcdefghij")
+    batch.flush()
+    assert len(adb.scripts) > 1
+    assert all(len(script.encode('utf-8')) <= 200 for script in adb.scripts)
+    assert sum(script.count("input text") for script in adb.scripts) == 40
+
+
+def test_session_pool_is_created_once(monkeypatch):
+    import threading
+    import time
+    import core.adb_manager as adb_manager
+
+    created = []
+
+    class SlowPool:
+        def __init__(self, command, name):
+            created.append(self)
+            time.sleep(0.05)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(adb_manager, "AdbShellPool", SlowPool)
+    adb = adb_manager.ADBManager("adb")
+    adb.device_serial = "emu-1"
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(adb._session_pool())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
@@ -0,0 +1,102 @@
+"""持久shell会话：用本地的 sh 代替 adb shell"""
+
+import shutil
+import threading
+import time
+import pytest
+from core.adb_shell_session import AdbShellPool, AdbShellSession
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="需要 sh")
+
+
+@pytest.fixture
+def session():
+    session = AdbShellSession(["sh"], timeout=2, name="test")
+    yield session
+    session.close()
+
+
+def test_output_and_status(session):
+    assert session.run("echo hello; echo world") == "hello\nworld\n"
+    assert session.last_status == 0
+    assert session.run("false") == ""
+    assert session.last_status == 1
+
+
+def test_output_without_trailing_newline(session):
+    assert session.run("printf abc") == "abc"
+    assert session.run("printf ''") == ""
+
+
+def test_commands_do_not_read_the_session_input(session):
+    # 命令的标准输入是 /dev/null，不会读走后续命令
+    assert session.run("cat") == ""
+    assert session.run("echo after") == "after\n"
+
+
+def test_output_containing_sentinel_text(session):
+    session.run("true")  # 第1条命令
+    fake = f"{session._prefix}1 0"
+    assert session.run(f"echo '{fake}'; echo '{session._prefix}'") == f"{fake}\n{session._prefix}\n"
+    assert session.last_status == 0
+    assert session.run("echo next") == "next\n"
+
+
+def test_timeout_resets_session(session):
+    assert session.run("echo ready") == "ready\n"
+    process = session._process
+    started = time.monotonic()
+    assert session.run("sleep 5; echo late", timeout=0.2) is None
+    assert time.monotonic() - started < 2
+    assert process.poll() is not None  # 超时的会话已结束
+    # 新会话不会收到上一条命令的残留输出
+    assert session.run("echo fresh") == "fresh\n"
+
+
+def test_reconnects_after_process_dies(session):
+    assert session.run("echo one") == "one\n"
+    session._process.kill()
+    session._process.wait()
+    assert session.run("echo two") == "two\n"
+
+
+def test_disconnect_during_command_is_not_retried(session):
+    assert session.run("kill -9 $$") is None  # 子shell中的 $$ 是会话进程
+    assert session.run("echo back") == "back\n"
+
+
+def test_exit_only_ends_the_command(session):
+    assert session.run("exit 3") == ""
+    assert session.last_status == 3
+    assert session.run("echo still") == "still\n"
+
+
+def test_start_failure_raises():
+    session = AdbShellSession(["/nonexistent/adb", "shell"], name="missing")
+    with pytest.raises(ConnectionError):
+        session.run("echo hello")
+
+
+def test_pool_runs_commands_in_parallel():
+    pool = AdbShellPool(["sh"], size=3, timeout=2, name="pool")
+    results = []
+    try:
+        pool.run("true")  # 预先启动一个会话
+        threads = [threading.Thread(target=lambda i=i: results.append(pool.run(f"sleep 0.3; echo {i}")))
+                   for i in range(3)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert time.monotonic() - started < 0.8
+        assert sorted(results) == ["0\n", "1\n", "2\n"]
+    finally:
+        pool.close()
+
+
+def test_commands_do_not_change_session_state(session):
+    start = session.run("pwd")
+    assert session.run("cd / && export CZ_TEST=1 && CZ_LOCAL=2") == ""
+    assert session.run("pwd") == start
+    assert session.run('echo "[$CZ_TEST$CZ_LOCAL]"') == "[]\n"
@@ -0,0 +1,195 @@
+"""ADB服务socket传输：用本地的模拟ADB服务检查协议和连接池"""
+
+import socket
+import socketserver
+import threading
+import time
+import pytest
+from core.adb_transport import AdbTransport, AdbTransportError
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """模拟ADB服务：请求为 4位十六进制长度 + 内容，响应 OKAY 或 FAIL + 4位十六进制长度 + 错误信息"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, devices):
+        super().__init__(("127.0.0.1", 0), FakeAdbHandler)
+        self.port = self.server_address[1]
+        self.devices = devices  # {序列号: 状态}
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.waiting = {}  # {连接序号: 已切换到设备、等待服务请求的socket}
+        self.services = []  # [(连接序号, 服务)]
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def kill_idle(self):
+        """关闭所有等待服务请求的连接（模拟ADB服务重启或设备断开）"""
+        with self.lock:
+            waiting, self.waiting = self.waiting, {}
+        for sock in waiting.values():
+            sock.shutdown(socket.SHUT_RDWR)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+
+    def read_request(self):
+        header = self.request.recv(4)
+        if len(header) < 4:
+            return None
+        length = int(header, 16)
+        data = b""
+        while len(data) < length:
+            data += self.request.recv(length - len(data))
+        return data.decode()
+
+    def okay(self, data=None):
+        if data is None:
+            self.request.sendall(b"OKAY")
+        else:
+            self.request.sendall(b"OKAY" + b"%04x" % len(data) + data)
+
+    def fail(self, message):
+        data = message.encode()
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            index = server.connections
+
+        request = self.read_request()
+        if request == "host:version":
+            return self.okay(b"0029")
+        if request == "host:devices":
+            listing = "".join(f"{serial}\t{state}\n" for serial, state in server.devices.items())
+            return self.okay(listing.encode())
+        if not request or not request.startswith("host:transport:"):
+            return self.fail(f"unknown host service '{request}'")
+
+        serial = request[len("host:transport:"):]
+        if server.devices.get(serial) != 'device':
+            return self.fail(f"device '{serial}' not found")
+        self.okay()
+
+        with server.lock:
+            server.waiting[index] = self.request
+        service = self.read_request()
+        with server.lock:
+            server.waiting.pop(index, None)
+        if service is None:
+            return
+        with server.lock:
+            server.services.append((index, service))
+
+        if service.startswith("shell:"):
+            command = service[len("shell:"):]
+            self.okay()
+            if command == "hang":
+                time.sleep(1)
+                return
+            self.request.sendall(command.replace("echo ", "").encode() + b"\n")
+        elif service.startswith("exec:"):
+            self.okay()
+            self.request.sendall(bytes(range(256)))
+        else:
+            self.fail(f"unknown service '{service}'")
+
+
+@pytest.fixture
+def server():
+    server = FakeAdbServer({"emu-1": "device", "emu-2": "offline"})
+    yield server
+    server.stop()
+
+
+def make_transport(server, pool_size=0):
+    return AdbTransport(port=server.port, pool_size=pool_size, timeout=2)
+
+
+def wait_idle(transport, serial, count, timeout=2):
+    deadline = time.time() + timeout
+    while len(transport._idle.get(serial, ())) < count and time.time() < deadline:
+        time.sleep(0.01)
+    return len(transport._idle.get(serial, ()))
+
+
+def test_host_requests(server):
+    transport = make_transport(server)
+    assert transport.version() == 0x29
+    assert transport.devices() == [("emu-1", "device"), ("emu-2", "offline")]
+
+
+def test_shell_and_exec(server):
+    transport = make_transport(server)
+    assert transport.shell("emu-1", "echo hello") == "hello\n"
+    assert transport.exec_out("emu-1", "screencap") == bytes(range(256))
+    assert [service for _, service in server.services] == ["shell:echo hello", "exec:screencap"]
+
+
+def test_fail_replies(server):
+    transport = make_transport(server)
+    with pytest.raises(AdbTransportError, match="not found"):
+        transport.shell("emu-2", "echo hello")
+    with pytest.raises(AdbTransportError, match="unknown service"):
+        transport._run_service("emu-1", "bogus:", None)
+    assert [service for _, service in server.services] == ["bogus:"]
+
+
+def test_unreachable_server():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    with pytest.raises(AdbTransportError):
+        AdbTransport(port=port).version()
+
+
+def test_timeout_after_command_sent(server):
+    transport = make_transport(server)
+    with pytest.raises(TimeoutError):
+        transport.shell("emu-1", "hang", timeout=0.2)
+
+
+def test_oversized_request_is_not_sent(server):
+    transport = make_transport(server)
+    with pytest.raises(AdbTransportError):
+        transport.shell("emu-1", "echo " + "x" * 0x10000)
+    assert server.services == []
+
+
+def test_idle_sockets_are_reused(server):
+    transport = make_transport(server, pool_size=2)
+    try:
+        assert transport.shell("emu-1", "echo first") == "first\n"
+        assert wait_idle(transport, "emu-1", 2) == 2
+
+        connections = server.connections
+        assert transport.shell("emu-1", "echo second") == "second\n"
+        index, service = server.services[-1]
+        assert service == "shell:echo second"
+        assert index <= connections  # 使用的是事先准备好的连接
+    finally:
+        transport.close()
+
+
+def test_stale_idle_socket_is_retried(server):
+    transport = make_transport(server, pool_size=1)
+    try:
+        transport.shell("emu-1", "echo first")
+        assert wait_idle(transport, "emu-1", 1) == 1
+        server.kill_idle()
+        time.sleep(0.05)
+
+        connections = server.connections
+        assert transport.shell("emu-1", "echo again") == "again\n"
+        index, _ = server.services[-1]
+        assert index > connections  # 空闲连接已失效，改用新连接
+    finally:
+        transport.close()
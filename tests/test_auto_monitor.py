@@ -0,0 +1,277 @@
+"""AutoMonitor：任务检测和动作执行"""
+
+import time
+from core.auto_monitor import AutoMonitor
+
+
+class FakeController:
+    def __init__(self):
+        self.clicks = []
+
+    def input_batch(self):
+        return None
+
+    def click(self, x, y, use_random=True, batch=None):
+        self.clicks.append(x)
+        time.sleep(0.05)
+
+
+def task(name, x):
+    return {'name': name, 'cooldown': 0, 'actions': [{'type': 'click', 'x': x, 'y': 0, 'delay': 0}]}
+
+
+def test_tasks_sharing_a_lane_all_fire():
+    # 第一个任务冷却比动作时间短、持续触发时，同一通道的第二个任务也要执行
+    controller = FakeController()
+    monitor = AutoMonitor(None, controller, source=object())
+    monitor.monitoring = True
+    for config in (task('a', 1), task('b', 2)):
+        monitor.add_monitor_config(config)
+    try:
+        deadline = time.time() + 1.0
+        while time.time() < deadline:
+            for config in monitor.monitor_configs:
+                monitor._evaluate_task(monitor.plans[id(config)], None)
+            time.sleep(0.01)
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+    assert controller.clicks.count(1) >= 5
+    assert controller.clicks.count(2) >= 5
+
+
+def test_match_reports_current_task_index():
+    controller = FakeController()
+    monitor = AutoMonitor(None, controller, source=object())
+    matches = []
+    monitor.match_found.connect(lambda data: matches.append((data['config']['name'], data['index'])))
+    for name in ('a', 'b', 'c'):
+        monitor.add_monitor_config(task(name, 0))
+    monitor.remove_monitor_config(0)
+    monitor.update_monitor_config(1, task('d', 0))
+    try:
+        for config in monitor.monitor_configs:
+            monitor._evaluate_task(monitor.plans[id(config)], None)
+    finally:
+        monitor.executor.stop()
+    assert matches == [('b', 0), ('d', 1)]
+
+
+def test_replaced_parallel_task_lane_is_closed():
+    monitor = AutoMonitor(None, FakeController(), source=object())
+    monitor.monitoring = True
+    config = dict(task('a', 1), concurrency='parallel')
+    monitor.add_monitor_config(config)
+    try:
+        monitor._evaluate_task(monitor.plans[id(config)], None)
+        old_lane = monitor.plans[id(config)].lane
+        assert old_lane in monitor.executor._lanes
+        monitor.update_monitor_config(0, dict(task('a', 1), concurrency='parallel'))
+        assert old_lane not in monitor.executor._lanes
+        monitor.remove_monitor_config(0)
+        assert monitor.executor._lanes == {}
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+
+
+def variable_pair(value, actions):
+    return {'conditions': [{'type': 'variable', 'variable': 'x', 'operator': '==', 'value': value}],
+            'actions': actions}
+
+
+def set_x(value):
+    return {'type': 'set_variable', 'variable': 'x', 'operation': 'set', 'value': value, 'delay': 0}
+
+
+def run_if_task(pairs):
+    controller = FakeController()
+    monitor = AutoMonitor(None, controller, source=object())
+    monitor.monitoring = True
+    monitor.global_variables['x'] = 0
+    fired = []
+    monitor.match_found.connect(lambda data: fired.append(data['pair_index']))
+    config = {'name': 'if', 'cooldown': 0, 'task_mode': 'IF', 'if_pairs': pairs}
+    monitor.add_monitor_config(config)
+    try:
+        monitor._evaluate_task(monitor.plans[id(config)], None)
+        deadline = time.time() + 2
+        while monitor.executor.is_pending(monitor.plans[id(config)].lane, id(config)) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+    return monitor, controller, fired
+
+
+def test_if_pairs_see_variables_set_by_earlier_pairs():
+    # 条件1设置 x=1 后，条件2（x==0）不再满足
+    monitor, controller, fired = run_if_task([
+        variable_pair(0, [set_x(1)]),
+        variable_pair(0, [{'type': 'click', 'x': 2, 'y': 0, 'delay': 0}]),
+    ])
+    assert fired == [0]
+    assert controller.clicks == []
+    assert monitor.global_variables['x'] == 1
+
+
+def test_if_pairs_toggle_variable_in_order():
+    # 条件1把 x 从0设为1，条件2看到 x==1 再设回0
+    monitor, controller, fired = run_if_task([
+        variable_pair(0, [set_x(1)]),
+        variable_pair(1, [set_x(0), {'type': 'click', 'x': 3, 'y': 0, 'delay': 0}]),
+    ])
+    assert fired[0] == 0
+    assert controller.clicks == [3]
+    assert monitor.global_variables['x'] == 0
+
+
+def image_task(x_value, logic='AND (全部满足)'):
+    from PIL import Image
+    template = Image.new('RGB', (8, 8), (255, 0, 0))
+    return {'name': 'img', 'cooldown': 0, 'actions': [], 'condition_logic': logic,
+            'unified_conditions': [
+                {'type': 'image', 'template': template, 'region': [0, 0, 40, 40]},
+                {'type': 'image', 'template': template, 'region': [40, 40, 40, 40]},
+                {'type': 'variable', 'variable': 'x', 'operator': '==', 'value': x_value},
+            ]}
+
+
+def count_prefetch_matches(config):
+    import numpy as np
+    from core.frame import Frame
+
+    class Source:
+        def resolution(self):
+            return None
+
+    monitor = AutoMonitor(None, FakeController(), source=Source())
+    monitor.global_variables['x'] = 0
+    monitor.set_eval_workers(2)
+    monitor.add_monitor_config(config)
+    calls = []
+    match_score = monitor._match_score
+    monitor._match_score = lambda *args: calls.append(args) or match_score(*args)
+    try:
+        monitor._prefetch_matches([config], Frame(np.zeros((100, 100, 3), np.uint8)))
+    finally:
+        monitor._shutdown_eval_pool()
+    return len(calls)
+
+
+def test_prefetch_skips_groups_decided_by_variables():
+    # AND 中变量条件不满足、OR 中变量条件满足时，图像条件无需匹配
+    assert count_prefetch_matches(image_task(1)) == 0
+    assert count_prefetch_matches(image_task(0, 'OR (任一满足)')) == 0
+    # 变量条件不能决定结果时照常并行匹配
+    assert count_prefetch_matches(image_task(0)) == 2
+    assert count_prefetch_matches(image_task(1, 'OR (任一满足)')) == 2
+
+
+def variable_task(name, variable=None):
+    config = {'name': name, 'cooldown': 0, 'poll_interval': 60, 'actions': []}
+    if variable:
+        config['unified_conditions'] = [{'type': 'variable', 'variable': variable, 'operator': '==', 'value': 1}]
+    return config
+
+
+def scheduled_monitor(configs):
+    """监控中、所有任务刚检测完（下次检测在60秒后）的监控器"""
+    monitor = AutoMonitor(None, FakeController(), source=object())
+    monitor.monitoring = True
+    for config in configs:
+        monitor.add_monitor_config(config)
+    now = time.time()
+    for config in monitor.scheduler.pop_due(now):
+        monitor.scheduler.reschedule(config, now)
+    return monitor
+
+
+def test_variable_change_makes_dependent_tasks_due():
+    dependent, other = variable_task('dependent', 'x'), variable_task('other')
+    monitor = scheduled_monitor([dependent, other])
+    try:
+        assert monitor.scheduler.pop_due() == []
+        monitor.set_global_variable('x', 1)
+        assert monitor._reevaluate
+        assert monitor.scheduler.pop_due() == [dependent]
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+
+
+def test_unchanged_or_unused_variable_does_not_reevaluate():
+    config = variable_task('dependent', 'x')
+    monitor = scheduled_monitor([config])
+    monitor.global_variables['x'] = 1
+    try:
+        monitor.set_global_variable('x', 1)
+        monitor.set_global_variable('y', 1)
+        assert not monitor._reevaluate
+        assert monitor.scheduler.pop_due() == []
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+
+
+def test_variable_index_follows_task_updates():
+    monitor = scheduled_monitor([variable_task('a', 'x')])
+    try:
+        monitor.update_monitor_config(0, variable_task('a', 'y'))
+        updated = monitor.monitor_configs[0]
+        for config in monitor.scheduler.pop_due():
+            monitor.scheduler.reschedule(config)
+        monitor.set_global_variable('x', 1)
+        assert monitor.scheduler.pop_due() == []
+        monitor.set_global_variable('y', 1)
+        assert monitor.scheduler.pop_due() == [updated]
+    finally:
+        monitor.monitoring = False
+        monitor.executor.stop()
+
+
+def state(name, value):
+    return {'name': name, 'conditions': [{'type': 'variable', 'variable': 'screen', 'operator': '==', 'value': value}]}
+
+
+def screen_frame():
+    import numpy as np
+    from core.frame import Frame
+    return Frame(np.zeros((10, 10, 3), np.uint8))
+
+
+def test_classify_screen_takes_first_state_once_per_frame():
+    monitor = AutoMonitor(None, FakeController(), source=object())
+    monitor.set_screen_states([state('battle', 1), state('battle_end', 1), state('menu', 2)])
+    monitor.global_variables['screen'] = 1
+    frame = screen_frame()
+    assert monitor.classify_screen(frame) == 'battle'
+    monitor.global_variables['screen'] = 2
+    assert monitor.classify_screen(frame) == 'battle'  # 同一帧只判断一次
+    assert monitor.classify_screen(screen_frame()) == 'menu'
+    monitor.global_variables['screen'] = 3
+    assert monitor.classify_screen(screen_frame()) is None
+
+
+def test_tasks_only_evaluated_on_their_screen_states():
+    monitor = AutoMonitor(None, FakeController(), source=object())
+    fired = []
+    monitor.match_found.connect(lambda data: fired.append(data['config']['name']))
+    monitor.set_screen_states([state('battle', 1), state('menu', 2)])
+    for name, states in (('battle', ['battle']), ('menu', ['menu']), ('both', ['battle', 'menu']), ('any', [])):
+        monitor.add_monitor_config({'name': name, 'cooldown': 0, 'actions': [], 'screen_states': states})
+    try:
+        for value in (1, 2, 3):
+            monitor.global_variables['screen'] = value
+            frame = screen_frame()
+            fired.append(value)
+            for config in monitor.monitor_configs:
+                monitor._evaluate_task(monitor.plans[id(config)], frame)
+            # 等待动作执行完，下一轮照常检测
+            deadline = time.time() + 2
+            while time.time() < deadline and any(monitor.executor.is_pending(plan.lane, config_id)
+                                                 for config_id, plan in monitor.plans.items()):
+                time.sleep(0.01)
+    finally:
+        monitor.executor.stop()
+    assert fired == [1, 'battle', 'both', 'any', 2, 'menu', 'both', 'any', 3, 'any']
@@ -0,0 +1,35 @@
+"""区域变化检测：默认关闭，开启后复用未变化区域的分数"""
+
+import numpy as np
+from core.change_detector import RegionChangeDetector
+from core.frame import Frame
+
+RECT = (0, 0, 1080, 2400)  # 全屏区域
+
+
+def frame_with_indicator(size=0, contrast=50):
+    bgr = np.full((2400, 1080, 3), 100, np.uint8)
+    if size:
+        bgr[300:300 + size, 300:300 + size] += contrast
+    return Frame(bgr)
+
+
+def test_disabled_by_default():
+    detector = RegionChangeDetector()
+    assert not detector.enabled
+    detector.store('k', frame_with_indicator(), RECT, 0.5)
+    assert detector.lookup('k', frame_with_indicator(), RECT) is None
+
+
+def test_unchanged_region_reuses_score_until_refresh():
+    detector = RegionChangeDetector(enabled=True, refresh_ticks=3)
+    detector.store('k', frame_with_indicator(), RECT, 0.5)
+    assert [detector.lookup('k', frame_with_indicator(), RECT) for _ in range(4)] == [0.5, 0.5, 0.5, None]
+
+
+def test_small_indicator_in_large_region_is_missed_when_enabled():
+    # 开启后的取舍：全屏区域中10x10像素的小目标只让格子平均颜色变化约2，低于容差
+    detector = RegionChangeDetector(enabled=True)
+    detector.store('k', frame_with_indicator(), RECT, 0.1)
+    assert detector.lookup('k', frame_with_indicator(10), RECT) == 0.1
+    assert detector.lookup('k', frame_with_indicator(80), RECT) is None
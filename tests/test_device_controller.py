@@ -0,0 +1,97 @@
+"""DeviceController 回放"""
+
+import re
+import time
+import pytest
+from core.adb_manager import ADBManager
+from core.device_controller import DeviceController
+
+
+class RecordingADB(ADBManager):
+    """不连接设备，记录发送的脚本；latency 不为0时按脚本中的等待和每条输入命令的启动耗时模拟执行时间"""
+
+    def __init__(self, latency=0.0):
+        super().__init__("adb")
+        self.device_serial = "emu-1"
+        self.latency = latency
+        self.scripts = []
+        self.on_shell = None
+
+    def is_device_online(self, timeout=0):
+        return True
+
+    def shell(self, command, root=False, timeout=None):
+        self.scripts.append(command)
+        if self.latency:
+            time.sleep(sum(script_sleeps(command)) + command.count("input ") * self.latency)
+        if self.on_shell:
+            self.on_shell()
+        return ""
+
+
+def script_sleeps(script):
+    return [float(value) for value in re.findall(r"sleep ([\d.]+)", script)]
+
+
+def dense_recording(count, interval_ms=100):
+    return [{'type': 'click', 'x': 10, 'y': 20, 'start_time_ms': i * interval_ms} for i in range(count)]
+
+
+def test_dense_recording_is_sent_in_short_scripts():
+    adb = RecordingADB()
+    controller = DeviceController(adb, None)
+    assert controller.play_recording(dense_recording(40), speed=100)
+    assert sum(script.count("input tap") for script in adb.scripts) == 40
+
+    adb.scripts.clear()
+    assert controller.play_recording(dense_recording(25))
+    assert len(adb.scripts) >= 3  # 2.4秒的密集动作按约1秒一个脚本发送
+
+
+def test_stop_between_batches():
+    adb = RecordingADB()
+    controller = DeviceController(adb, None)
+
+    def stop():
+        controller.stop_playing_flag = True
+
+    adb.on_shell = stop
+    assert not controller.play_recording(dense_recording(100))
+    # 停止后不再发送剩余的动作
+    assert len(adb.scripts) == 1
+    assert adb.scripts[0].count("input tap") < 20
+
+
+def test_script_sleeps_follow_recording_timestamps():
+    adb = RecordingADB()
+    controller = DeviceController(adb, None)
+    starts = [0, 100, 250, 300, 700]
+    assert controller.play_recording([{'type': 'click', 'x': 10, 'y': 20, 'start_time_ms': start}
+                                      for start in starts])
+    assert len(adb.scripts) == 1
+    expected = [(b - a) / 1000 for a, b in zip(starts, starts[1:])]
+    assert script_sleeps(adb.scripts[0]) == pytest.approx(expected, abs=0.003)
+
+
+def test_swipe_duration_is_not_waited_twice():
+    adb = RecordingADB()
+    controller = DeviceController(adb, None)
+    controller.enable_randomization = False
+    assert controller.play_recording([
+        {'type': 'swipe', 'x1': 0, 'y1': 0, 'x2': 100, 'y2': 0, 'duration': 300, 'start_time_ms': 0},
+        {'type': 'click', 'x': 10, 'y': 20, 'start_time_ms': 500},
+    ])
+    assert script_sleeps(adb.scripts[0]) == pytest.approx([0.2], abs=0.003)
+
+
+def test_command_latency_does_not_accumulate():
+    # 每条 input 命令启动耗时40毫秒：等待不扣除时20个间隔100毫秒的点击会延后约0.8秒
+    adb = RecordingADB(latency=0.04)
+    controller = DeviceController(adb, None)
+    started = time.perf_counter()
+    assert controller.play_recording(dense_recording(20))
+    elapsed = time.perf_counter() - started
+    assert elapsed < 1.9 + 0.3
+    assert len(adb.scripts) >= 2
+    # 后续脚本按实测的启动耗时缩短等待
+    assert min(script_sleeps(adb.scripts[-1])) < 0.08
@@ -0,0 +1,118 @@
+"""设备跟踪：设备列表解析、在线状态和属性缓存"""
+
+import queue
+import threading
+from core.adb_transport import AdbTransportError
+from core.device_tracker import DeviceTracker, parse_device_info
+
+INFO_OUTPUT = ("brand=Xiaomi\nmodel=M2012K11AC \nandroid=13\n"
+               "Physical size: 1080x2400\nOverride size: 720x1600\nPhysical density: 440\n")
+
+
+class FakeSocket:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    """模拟 AdbTransport：设备列表从队列读取，队列中的 None 表示连接断开"""
+
+    def __init__(self, info_output=INFO_OUTPUT):
+        self.lists = queue.Queue()
+        self.info_output = info_output
+        self.shell_calls = []
+        self.opened = 0
+
+    def open_track_devices(self):
+        self.opened += 1
+        return FakeSocket()
+
+    def read_device_list(self, sock):
+        devices = self.lists.get()
+        if devices is None or sock.closed:
+            raise AdbTransportError("连接断开")
+        return devices
+
+    def shell(self, serial, command, timeout=None):
+        self.shell_calls.append(serial)
+        if self.info_output is None:
+            raise AdbTransportError("设备未响应")
+        return self.info_output
+
+
+def test_parse_device_info():
+    assert parse_device_info(INFO_OUTPUT) == {
+        'brand': 'Xiaomi', 'model': 'M2012K11AC', 'android': '13', 'size': (1080, 2400), 'density': 440}
+
+
+def test_parse_device_info_missing_fields():
+    assert parse_device_info("brand=\n") == {'brand': '', 'model': '', 'android': '', 'size': None, 'density': None}
+
+
+def test_update_tracks_online_state():
+    tracker = DeviceTracker(FakeTransport())
+    assert not tracker.available
+    tracker._update([('emu-1', 'device'), ('emu-2', 'offline')])
+    assert tracker.available
+    assert tracker.devices() == [('emu-1', 'device'), ('emu-2', 'offline')]
+    assert tracker.is_online('emu-1')
+    assert not tracker.is_online('emu-2')
+    assert not tracker.is_online('emu-3')
+
+    tracker._update([('emu-2', 'device')])
+    assert not tracker.is_online('emu-1')
+    assert tracker.is_online('emu-2')
+
+
+def test_is_online_waits_for_device():
+    tracker = DeviceTracker(FakeTransport())
+    tracker._update([('emu-1', 'offline')])
+    threading.Timer(0.05, tracker._update, args=([('emu-1', 'device')],)).start()
+    assert tracker.is_online('emu-1', timeout=2)
+
+
+def test_info_cached_until_device_goes_offline():
+    transport = FakeTransport()
+    tracker = DeviceTracker(transport)
+    tracker._update([('emu-1', 'device')])
+    assert tracker.info('emu-1')['size'] == (1080, 2400)
+    tracker._update([('emu-1', 'device'), ('emu-2', 'unauthorized')])
+    assert tracker.info('emu-1')['model'] == 'M2012K11AC'
+    assert transport.shell_calls == ['emu-1']
+
+    # 重新上线的可能是另一台设备，重新读取
+    tracker._update([])
+    assert tracker.info('emu-1') is None
+    tracker._update([('emu-1', 'device')])
+    assert tracker.info('emu-1') is not None
+    assert transport.shell_calls == ['emu-1', 'emu-1']
+
+
+def test_info_retried_after_failure():
+    transport = FakeTransport(info_output=None)
+    tracker = DeviceTracker(transport)
+    tracker._update([('emu-1', 'device')])
+    assert tracker.info('emu-1') is None
+    transport.info_output = INFO_OUTPUT
+    assert tracker.info('emu-1')['brand'] == 'Xiaomi'
+
+
+def test_track_loop_resubscribes_after_disconnect():
+    transport = FakeTransport()
+    tracker = DeviceTracker(transport, retry_interval=0.01)
+    transport.lists.put([('emu-1', 'device')])
+    try:
+        assert tracker.start(timeout=2)
+        assert tracker.is_online('emu-1')
+
+        transport.lists.put(None)  # ADB服务重启
+        transport.lists.put([('emu-2', 'device')])
+        assert tracker.is_online('emu-2', timeout=2)
+        assert transport.opened == 2
+        assert not tracker.is_online('emu-1')
+    finally:
+        tracker.stop()
+        transport.lists.put(None)
@@ -0,0 +1,106 @@
+"""图像匹配：非极大值抑制、金字塔匹配"""
+
+import numpy as np
+import pytest
+from core.image_matcher import match_best, non_max_suppression, pyramid_candidates, usable_pyramid_levels
+
+
+def response(*peaks, size=(60, 60)):
+    result = np.zeros(size, np.float32)
+    for x, y, score in peaks:
+        result[y, x] = score
+    return result
+
+
+def test_peaks_in_same_grid_cell_are_kept_when_far_enough():
+    # (20,20) 和 (29,29) 落在同一个10像素格子里，但相距12.7像素
+    peaks = non_max_suppression(response((20, 20, 0.9), (29, 29, 0.95)), 0.8, min_distance=10)
+    assert [(x, y) for x, y, _ in peaks] == [(29, 29), (20, 20)]
+
+
+def test_peaks_in_adjacent_cells_are_merged_when_close():
+    # (29,20) 和 (31,20) 分属相邻格子，相距2像素，只保留置信度高的
+    peaks = non_max_suppression(response((29, 20, 0.9), (31, 20, 0.95), (45, 20, 0.85)), 0.8, min_distance=10)
+    assert [(x, y) for x, y, _ in peaks] == [(31, 20), (45, 20)]
+
+
+def test_distance_threshold_is_exclusive():
+    peaks = non_max_suppression(response((20, 20, 0.9), (30, 20, 0.95)), 0.8, min_distance=10)
+    assert len(peaks) == 2
+
+
+def test_threshold_and_order():
+    peaks = non_max_suppression(response((5, 5, 0.7), (30, 30, 0.9), (50, 5, 0.95)), 0.8, min_distance=10)
+    assert peaks == [(50, 5, pytest.approx(0.95)), (30, 30, pytest.approx(0.9))]
+
+
+def test_max_results():
+    result = response((5, 5, 0.81), (25, 5, 0.82), (45, 5, 0.83), (5, 25, 0.84), (25, 25, 0.85))
+    assert [score for _, _, score in non_max_suppression(result, 0.8, 10, max_results=2)] == \
+        pytest.approx([0.85, 0.84])
+    assert len(non_max_suppression(result, 0.8, 10)) == 5
+    assert non_max_suppression(result, 0.8, 10, max_results=0) == []
+
+
+def textured_image(size=(240, 320)):
+    """平滑的随机纹理（缩小后仍可匹配）"""
+    import cv2
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (size[0] // 8, size[1] // 8), dtype=np.uint8)
+    return cv2.resize(noise, (size[1], size[0]), interpolation=cv2.INTER_CUBIC)
+
+
+def test_usable_pyramid_levels_limited_by_template_size():
+    # 模板缩小后边长不少于8像素
+    assert usable_pyramid_levels((480, 640), (64, 64), 3) == 3
+    assert usable_pyramid_levels((480, 640), (40, 64), 3) == 2
+    assert usable_pyramid_levels((480, 640), (12, 12), 2) == 0
+    assert usable_pyramid_levels((480, 640), (64, 64), 0) == 0
+    assert usable_pyramid_levels((480, 640), (64, 64), -1) == 0
+
+
+def test_usable_pyramid_levels_limited_by_image_size():
+    # 缩小后的图像不能比模板小
+    assert usable_pyramid_levels((66, 640), (64, 64), 3) == 3
+    assert usable_pyramid_levels((63, 640), (64, 64), 3) == 0
+
+
+def test_pyramid_candidates_find_template_at_full_resolution():
+    image = textured_image()
+    template = image[100:164, 150:214].copy()
+    candidates = pyramid_candidates(image, template, 2)
+    x, y, confidence = candidates[0]
+    assert (x, y) == (150, 100)
+    assert confidence == pytest.approx(1.0, abs=1e-3)
+    assert [c for _, _, c in candidates] == sorted((c for _, _, c in candidates), reverse=True)
+
+
+def test_pyramid_candidates_use_given_template_pyramid():
+    import cv2
+    image = textured_image()
+    template = image[40:104, 60:124].copy()
+    requested = []
+
+    def template_pyramid(level):
+        requested.append(level)
+        scaled = template
+        for _ in range(level):
+            scaled = cv2.pyrDown(scaled)
+        return scaled
+
+    x, y, _ = pyramid_candidates(image, template, 2, template_pyramid=template_pyramid)[0]
+    assert (x, y) == (60, 40)
+    assert requested == [2]
+
+
+@pytest.mark.parametrize('levels', [0, 1, 2, 5])
+def test_match_best_same_result_with_and_without_pyramid(levels):
+    image = textured_image()
+    template = image[120:184, 30:94].copy()
+    confidence, location = match_best(image, template, pyramid_levels=levels)
+    assert location == (30, 120)
+    assert confidence == pytest.approx(1.0, abs=1e-3)
+
+
+def test_match_best_template_larger_than_image():
+    assert match_best(np.zeros((20, 20), np.uint8), np.zeros((30, 10), np.uint8), pyramid_levels=2) == (-1.0, None)
@@ -0,0 +1,59 @@
+"""多设备监控：共享模板的登记和释放"""
+
+import base64
+from io import BytesIO
+import numpy as np
+import pytest
+from PIL import Image
+from core.multi_device_host import (MultiDeviceHost, SharedTemplates, attach_shared_templates,
+                                    release_shared_templates)
+from core.template_cache import template_cache
+
+
+def encode(image):
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_shared_templates_are_released_before_close():
+    image = Image.fromarray(np.arange(12 * 10 * 3, dtype=np.uint8).reshape(12, 10, 3))
+    scheme = {'configs': [{'name': 'a', 'unified_conditions': [{'type': 'image', 'template': encode(image)}]}]}
+    shared = SharedTemplates(scheme)
+    try:
+        shm = attach_shared_templates(shared.descriptor)
+        template = Image.open(BytesIO(base64.b64decode(encode(image))))
+        compiled = template_cache.get(template)
+        assert np.shares_memory(compiled.bgr, np.ndarray(shm.size, np.uint8, buffer=shm.buf))
+        assert compiled.get().shape == (12, 10, 3)
+        del compiled
+
+        release_shared_templates(shm)  # 缓存中的视图被移除后才能关闭，否则 BufferError
+        assert shm.buf is None
+        recompiled = template_cache.get(template)  # 之后用到时重新转换
+        assert recompiled.bgr.tolist() == np.asarray(image)[:, :, ::-1].tolist()
+    finally:
+        template_cache.clear()
+        shared.close()
+
+
+def test_unsupported_sources_are_rejected():
+    for source in ('mss', 'window'):
+        with pytest.raises(ValueError, match=source):
+            MultiDeviceHost('adb', capture_source=source)
+    host = MultiDeviceHost('adb', capture_source='adb', capture_resolution=(1080, 2400))
+    assert host.capture == {'source': 'adb', 'scale': 1.0, 'resolution': (1080, 2400)}
+
+
+def test_cli_rejects_unsupported_source_for_several_devices():
+    import threading
+    import clickzen
+
+    def run(*options):
+        args = clickzen.build_parser().parse_args(
+            ['run', 'scheme.json', '--adb', 'adb', '--serial', 'emu-1', '--serial', 'emu-2', *options])
+        return clickzen.run_scheme(args, threading.Event())
+
+    assert run('--source', 'mss') == 2
+    assert run('--source', 'window') == 2
+    assert run('--replay', 'frames') == 2
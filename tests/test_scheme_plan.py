@@ -0,0 +1,113 @@
+"""方案编译：条件组的短路求值和逻辑规则"""
+
+from types import SimpleNamespace
+from core.scheme_plan import (ConditionGroup, ImageCondition, VariableCondition, compile_group, compile_task,
+                              LOGIC_AND, LOGIC_NOT, LOGIC_OR)
+
+
+FRAME = SimpleNamespace(size=(1080, 2400))
+
+
+class Monitor:
+    def __init__(self, **variables):
+        self.global_variables = variables
+        self.matched = []
+
+    def frame_resolution(self, frame):
+        return 1080, 2400
+
+    def _get_region_rect(self, frame, region, resolution=None):
+        return None if region == (-1, -1, 0, 0) else region
+
+    def _match_score(self, frame, rect, compiled, pyramid_levels=0, gray=False, scale=1.0):
+        self.matched.append(rect)
+        return compiled
+
+
+class Templates:
+    def get(self, template):
+        return template  # 测试中模板即为匹配分数
+
+
+class Counted:
+    """记录调用次数的条件"""
+
+    def __init__(self, result, cost=(1, 0)):
+        self.result = result
+        self.cost = cost
+        self.calls = 0
+
+    def evaluate(self, monitor, frame):
+        self.calls += 1
+        return self.result
+
+
+def variable(name, value, operator='=='):
+    return VariableCondition({'variable': name, 'operator': operator, 'value': value})
+
+
+def image(score, region=(0, 0, 10, 10), expect_exist=True):
+    return ImageCondition({'template': score, 'region': region, 'expect_exist': expect_exist}, Templates())
+
+
+def test_and_stops_at_first_unmet_condition():
+    first, second = Counted(False), Counted(True)
+    assert not ConditionGroup(LOGIC_AND, [first, second]).evaluate(Monitor(), None)
+    assert (first.calls, second.calls) == (1, 0)
+
+
+def test_or_stops_at_first_met_condition():
+    first, second = Counted(True), Counted(False)
+    assert ConditionGroup(LOGIC_OR, [first, second]).evaluate(Monitor(), None)
+    assert (first.calls, second.calls) == (1, 0)
+
+
+def test_not_stops_at_first_met_condition():
+    first, second = Counted(True), Counted(False)
+    assert not ConditionGroup(LOGIC_NOT, [first, second]).evaluate(Monitor(), None)
+    assert (first.calls, second.calls) == (1, 0)
+    assert ConditionGroup(LOGIC_NOT, [Counted(False), Counted(False)]).evaluate(Monitor(), None)
+
+
+def test_cheap_conditions_run_first():
+    monitor = Monitor(x=0)
+    group = ConditionGroup(LOGIC_AND, [image(0.9), image(0.9, (0, 0, 5, 5)), variable('x', 1)])
+    assert not group.evaluate(monitor, FRAME)
+    assert monitor.matched == []  # 变量条件不满足，图像不匹配
+    monitor.global_variables['x'] = 1
+    assert group.evaluate(monitor, FRAME)
+    assert monitor.matched == [(0, 0, 5, 5), (0, 0, 10, 10)]  # 搜索面积小的先匹配
+
+
+def test_empty_group():
+    assert not ConditionGroup(LOGIC_AND, []).evaluate(Monitor(), None)
+    assert not ConditionGroup(LOGIC_OR, []).evaluate(Monitor(), None)
+    assert ConditionGroup(LOGIC_NOT, []).evaluate(Monitor(), None)
+    assert not ConditionGroup(None, [Counted(True)]).evaluate(Monitor(), None)
+
+
+def test_single_condition_ignores_logic():
+    # 单个条件直接返回该条件的结果，NOT不取反
+    assert compile_group([variable('x', 1)], LOGIC_NOT).evaluate(Monitor(x=1), None)
+    assert not compile_group([variable('x', 1)], LOGIC_NOT).evaluate(Monitor(x=0), None)
+    assert compile_group([variable('x', 1), None], LOGIC_NOT).logic == LOGIC_NOT
+
+
+def test_missing_variable_is_unmet():
+    assert not variable('x', 0).evaluate(Monitor(), None)
+    assert not variable('x', 0, operator='~').evaluate(Monitor(x=0), None)
+
+
+def test_invalid_region_is_unmet_even_when_expecting_absence():
+    monitor = Monitor()
+    assert not image(0.1, region=(-1, -1, 0, 0), expect_exist=False).evaluate(monitor, FRAME)
+    assert not compile_group([image(0.1, region=(-1, -1, 0, 0), expect_exist=False)], LOGIC_AND).evaluate(
+        monitor, FRAME)
+    assert not image(None, expect_exist=False).evaluate(monitor, FRAME)
+    assert image(0.1, expect_exist=False).evaluate(monitor, FRAME)
+
+
+def test_if_pair_without_conditions_never_fires():
+    plan = compile_task({'task_mode': 'IF', 'if_pairs': [{'conditions': [], 'actions': []}]}, Templates(), 'main')
+    _, group, _ = plan.pairs[0]
+    assert not group.evaluate(Monitor(), None)
@@ -0,0 +1,160 @@
+"""scrcpy控制通道：用本地的模拟控制socket检查消息格式"""
+
+import socket
+import struct
+import threading
+import time
+import pytest
+from core.scrcpy_control import (ScrcpyControlClient, ACTION_DOWN, ACTION_MOVE, ACTION_UP,
+                                 TYPE_INJECT_KEYCODE, TYPE_INJECT_TEXT, TYPE_INJECT_TOUCH_EVENT)
+
+
+class FakeControlServer:
+    """模拟 scrcpy-server 的控制socket：连接后发送一个字节，之后按类型解析收到的控制消息"""
+
+    def __init__(self):
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+        self.messages = []
+        self.raw_lengths = []
+        self._received = threading.Condition()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        conn.sendall(b"\x00")
+        with conn:
+            while True:
+                message = self._read_message(conn)
+                if message is None:
+                    return
+                with self._received:
+                    self.messages.append(message)
+                    self._received.notify_all()
+
+    @staticmethod
+    def _read_exact(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _read_message(self, conn):
+        header = self._read_exact(conn, 1)
+        if header is None:
+            return None
+        kind = header[0]
+        if kind == TYPE_INJECT_TOUCH_EVENT:
+            body = self._read_exact(conn, 31)
+            self.raw_lengths.append(32)
+            return ('touch',) + struct.unpack('>BqiiHHHII', body)
+        if kind == TYPE_INJECT_KEYCODE:
+            body = self._read_exact(conn, 13)
+            self.raw_lengths.append(14)
+            return ('key',) + struct.unpack('>BiiI', body)
+        if kind == TYPE_INJECT_TEXT:
+            length = struct.unpack('>I', self._read_exact(conn, 4))[0]
+            self.raw_lengths.append(5 + length)
+            return ('text', self._read_exact(conn, length).decode('utf-8'))
+        raise AssertionError(f"未知消息类型 {kind}")
+
+    def wait_for(self, count, timeout=2.0):
+        with self._received:
+            self._received.wait_for(lambda: len(self.messages) >= count, timeout)
+        return self.messages[:count]
+
+    def close(self):
+        self._server.close()
+
+
+@pytest.fixture
+def server():
+    server = FakeControlServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def size():
+    return {'value': (1080, 2400), 'calls': 0}
+
+
+@pytest.fixture
+def client(server, size):
+    def provider():
+        size['calls'] += 1
+        return size['value']
+
+    client = ScrcpyControlClient("127.0.0.1", server.port, provider)
+    assert client.connect()
+    yield client
+    client.close()
+
+
+def test_tap_sends_two_32_byte_touch_events(server, client):
+    assert client.tap(100, 200)
+    down, up = server.wait_for(2)
+    assert server.raw_lengths == [32, 32]
+    # (类型, 动作, 指针ID, x, y, 屏幕宽, 屏幕高, 压力, 动作按钮, 按钮)
+    assert down[1] == ACTION_DOWN and up[1] == ACTION_UP
+    assert down[2] == up[2]
+    assert down[3:7] == (100, 200, 1080, 2400)
+    assert down[7] == 0xffff and up[7] == 0
+    assert down[8:] == (0, 0)
+
+
+def test_swipe_sends_moves(server, client):
+    assert client.swipe(0, 0, 100, 0, duration=50)
+    deadline = time.time() + 2
+    while (not server.messages or server.messages[-1][1] != ACTION_UP) and time.time() < deadline:
+        time.sleep(0.01)
+    actions = [message[1] for message in server.messages]
+    assert actions[0] == ACTION_DOWN and actions[-1] == ACTION_UP
+    assert ACTION_MOVE in actions
+    assert server.messages[-1][3] == 100
+
+
+def test_keyevent_sends_two_14_byte_messages(server, client):
+    assert client.keyevent(4)
+    down, up = server.wait_for(2)
+    assert server.raw_lengths == [14, 14]
+    assert down == ('key', ACTION_DOWN, 4, 0, 0)
+    assert up == ('key', ACTION_UP, 4, 0, 0)
+
+
+def test_text_split_at_300_bytes(server, client):
+    text = "中" * 150 + "abc"  # 450 + 3 字节
+    assert client.text(text)
+    first, second = server.wait_for(2)
+    assert server.raw_lengths == [5 + 300, 5 + 153]
+    assert first[1] + second[1] == text
+
+
+def test_touch_uses_size_after_rotation(server, client, size):
+    assert client.tap(1, 1)
+    size['value'] = (2400, 1080)
+    client.refresh_size_async()  # 视频流尺寸变化时由ScrcpyManager调用
+    deadline = time.time() + 2
+    while client.screen_size() != (2400, 1080) and time.time() < deadline:
+        time.sleep(0.01)
+    assert client.tap(1, 1)
+    messages = server.wait_for(4)
+    assert messages[0][5:7] == (1080, 2400)
+    assert messages[2][5:7] == (2400, 1080)
+
+
+def test_size_fetched_once_without_size_events(server, client, size):
+    for _ in range(5):
+        assert client.tap(1, 1)
+    time.sleep(0.1)
+    server.wait_for(10)
+    assert size['calls'] == 1
+
+
+def test_send_after_close_fails(server, client):
+    client.close()
+    assert not client.connected
+    assert client.tap(1, 1) is False
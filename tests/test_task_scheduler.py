@@ -0,0 +1,90 @@
+"""任务调度器：到期顺序、优先级、重试和立即到期"""
+
+import pytest
+from core.task_scheduler import TaskScheduler
+
+
+def task(name, priority=0, poll_interval=None, cooldown=0, last_executed=0):
+    config = {'name': name, 'priority': priority, 'cooldown': cooldown, 'last_executed': last_executed}
+    if poll_interval is not None:
+        config['poll_interval'] = poll_interval
+    return config
+
+
+def names(configs):
+    return [config['name'] for config in configs]
+
+
+def test_pop_due_orders_by_priority_then_insertion():
+    scheduler = TaskScheduler()
+    tasks = [task('a'), task('b', priority=5), task('c'), task('d', priority=5)]
+    scheduler.reset(tasks, now=100)
+    assert names(scheduler.pop_due(now=100)) == ['b', 'd', 'a', 'c']
+    assert scheduler.pop_due(now=100) == []
+
+
+def test_each_task_uses_its_own_interval():
+    scheduler = TaskScheduler(default_interval=0.5)
+    fast, slow = task('fast', poll_interval=0.1), task('slow', poll_interval=2)
+    scheduler.reset([fast, slow], now=100)
+    for config in scheduler.pop_due(now=100):
+        scheduler.reschedule(config, now=100)
+
+    assert scheduler.next_due() == pytest.approx(100.1)
+    assert names(scheduler.pop_due(now=101)) == ['fast']
+    scheduler.reschedule(fast, now=101)
+    assert sorted(names(scheduler.pop_due(now=102))) == ['fast', 'slow']
+
+
+def test_reschedule_waits_for_cooldown():
+    scheduler = TaskScheduler(default_interval=1)
+    config = task('a', cooldown=5)
+    scheduler.reset([config], now=100)
+    assert names(scheduler.pop_due(now=100)) == ['a']
+    config['last_executed'] = 100  # 本次检测触发了任务
+    scheduler.reschedule(config, now=100)
+    assert scheduler.next_due() == 105
+
+
+def test_retry_is_due_immediately():
+    scheduler = TaskScheduler(default_interval=1)
+    config = task('a')
+    scheduler.reset([config], now=100)
+    scheduler.pop_due(now=100)
+    scheduler.reschedule(config, now=100, retry=True)
+    assert names(scheduler.pop_due(now=100)) == ['a']
+    scheduler.reschedule(config, now=100)
+    assert scheduler.pop_due(now=100.5) == []
+
+
+def test_removed_task_is_not_rescheduled():
+    scheduler = TaskScheduler()
+    kept, removed = task('kept'), task('removed')
+    scheduler.reset([kept, removed], now=100)
+    scheduler.pop_due(now=100)
+    scheduler.rebuild([kept], now=100)
+    scheduler.reschedule(kept, now=100)
+    scheduler.reschedule(removed, now=100)
+    assert names(scheduler.pop_due(now=200)) == ['kept']
+
+
+def test_make_due_only_moves_tasks_earlier():
+    scheduler = TaskScheduler()
+    a, b = task('a', poll_interval=10), task('b', poll_interval=10, cooldown=20, last_executed=100)
+    scheduler.reset([a], now=100)
+    scheduler.add(b, now=100)
+    scheduler.reschedule(scheduler.pop_due(now=100)[0], now=100)
+
+    assert scheduler.make_due([a, b], now=101)
+    assert names(scheduler.pop_due(now=101)) == ['a']  # b仍在冷却
+    assert scheduler.next_due() == 120
+    assert not scheduler.make_due([b], now=101)
+
+
+def test_make_due_ignores_running_task():
+    scheduler = TaskScheduler()
+    config = task('a', poll_interval=10)
+    scheduler.reset([config], now=100)
+    scheduler.pop_due(now=100)
+    assert not scheduler.make_due([config], now=101)
+    assert len(scheduler) == 0
@@ -0,0 +1,67 @@
+"""sendevent 触摸注入：屏幕坐标到触控坐标的换算"""
+
+import re
+import pytest
+from core.touch_injector import SendeventTouchInjector, ABS_MT_POSITION_X, ABS_MT_POSITION_Y
+
+
+class FakeADB:
+    def __init__(self, display):
+        self.display = display
+
+    def get_display_state(self, max_age=0.5):
+        return self.display
+
+
+def make_injector(display, max_x=10800, max_y=24000):
+    injector = SendeventTouchInjector(FakeADB(display))
+    injector.device = "/dev/input/event2"
+    injector.max_x, injector.max_y = max_x, max_y
+    injector.display = display
+    return injector
+
+
+def tapped_position(script):
+    x = re.search(rf'sendevent \S+ 3 {ABS_MT_POSITION_X} (\d+)', script)
+    y = re.search(rf'sendevent \S+ 3 {ABS_MT_POSITION_Y} (\d+)', script)
+    return int(x.group(1)), int(y.group(1))
+
+
+def test_portrait():
+    injector = make_injector((1080, 2400, 0))
+    assert tapped_position(injector.tap_script(540, 1200)) == (5400, 12000)
+    assert tapped_position(injector.tap_script(108, 240)) == (1080, 2400)
+
+
+@pytest.mark.parametrize("point, expected", [
+    ((0, 0), (10800, 0)),          # 屏幕左上角是自然方向的右上角
+    ((2400, 1080), (0, 24000)),    # 屏幕右下角是自然方向的左下角
+    ((1200, 540), (5400, 12000)),
+    ((240, 108), (9720, 2400)),
+])
+def test_rotation_1(point, expected):
+    injector = make_injector((1080, 2400, 1))
+    assert tapped_position(injector.tap_script(*point)) == expected
+
+
+@pytest.mark.parametrize("point, expected", [
+    ((0, 0), (0, 24000)),          # 屏幕左上角是自然方向的左下角
+    ((2400, 1080), (10800, 0)),    # 屏幕右下角是自然方向的右上角
+    ((1200, 540), (5400, 12000)),
+    ((240, 108), (1080, 21600)),
+])
+def test_rotation_3(point, expected):
+    injector = make_injector((1080, 2400, 3))
+    assert tapped_position(injector.tap_script(*point)) == expected
+
+
+def test_override_size():
+    # 分辨率覆盖为 720x1600 时，屏幕坐标按覆盖后的分辨率缩放
+    injector = make_injector((720, 1600, 0))
+    assert tapped_position(injector.tap_script(360, 800)) == (5400, 12000)
+
+
+def test_rotation_refreshed_per_gesture():
+    injector = make_injector((1080, 2400, 0))
+    injector.adb.display = (1080, 2400, 1)
+    assert tapped_position(injector.tap_script(0, 0)) == (10800, 0)
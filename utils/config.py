@@ -26,7 +26,8 @@ class Config:
             "always_on_top": True,
             "window_x": 100,
             "window_y": 100,
-            "auto_update_scrcpy": True  # 自动检查更新
+            "auto_update_scrcpy": True,  # 自动检查更新
+            "scrcpy_control": False  # Scrcpy运行时另外启动一个只控制的scrcpy-server注入点击和滑动（默认关闭）
         }
 
         self.load()